@@ -0,0 +1,166 @@
+import os
+import queue
+import smtplib
+import time
+from threading import Lock, Thread
+
+
+class SmtpTransport:
+    """Sends alert emails over one SMTP connection, opened on the first email and reused for the ones after it.
+If the server has closed the connection in the meantime, reconnects and sends again once.
+Starttls and login are skipped when turned off, so alerts can be sent to a local stand-in SMTP server.
+
+Any object with the methods send(subject, body) and close() can take the place of an SmtpTransport."""
+
+    def __init__(self, host, port, sender, password, recipient, starttls=True, timeout=30.0):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.password = password
+        self.recipient = recipient
+        self.starttls = starttls
+        self.timeout = timeout
+        self.connection = None
+
+    def connect(self):
+        connection = smtplib.SMTP(self.host, port=self.port, timeout=self.timeout)
+        if self.starttls:
+            connection.starttls()  # Make connection secure
+        if self.password:
+            connection.login(user=self.sender, password=self.password)
+        self.connection = connection
+
+    def send(self, subject, body):
+        message = f"Subject: {subject}\n\n{body}"
+        if self.connection is not None:
+            try:
+                self.connection.sendmail(from_addr=self.sender, to_addrs=self.recipient, msg=message)
+                return
+            except (smtplib.SMTPServerDisconnected, OSError):
+                self.close()
+        self.connect()
+        self.connection.sendmail(from_addr=self.sender, to_addrs=self.recipient, msg=message)
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.quit()
+            except (smtplib.SMTPException, OSError):
+                self.connection.close()
+            self.connection = None
+
+
+class AlertQueue:
+    """Sends admin alerts from one background worker thread, batched into digest emails.
+A digest is sent once it holds digest_size alerts, or digest_seconds after its first alert, whichever comes first.
+At most max_queue alerts wait to be sent. Alerts added while the queue is full are dropped and counted,
+and the next digest says how many were dropped.
+
+The worker starts on the first alert of each process, so a queue created before gunicorn forks its workers
+gets a worker in each of them."""
+
+    def __init__(self, transport, max_queue=1000, digest_size=20, digest_seconds=60.0):
+        self.transport = transport
+        self.max_queue = max_queue
+        self.digest_size = digest_size
+        self.digest_seconds = digest_seconds
+        self.lock = Lock()
+        self.alerts = None
+        self.worker = None
+        self.worker_pid = None
+        self.dropped = 0
+        self.dropped_since_digest = 0
+        self.sent_alerts = 0
+        self.sent_digests = 0
+        self.failed_digests = 0
+
+    def start(self):
+        with self.lock:
+            if self.worker is not None and self.worker_pid == os.getpid():
+                return
+            # A queue inherited through fork may have been locked by a thread that only exists in the parent.
+            self.alerts = queue.Queue(self.max_queue)
+            self.worker = Thread(target=self.run, daemon=True)
+            self.worker_pid = os.getpid()
+            self.worker.start()
+
+    def send(self, subject, message):
+        """Queues an alert without waiting for it to be sent. Returns False if the queue was full and it was dropped."""
+        self.start()
+        try:
+            self.alerts.put_nowait((subject, message))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+                self.dropped_since_digest += 1
+            return False
+        return True
+
+    def stop(self, timeout=10.0):
+        """Sends the alerts still queued, then stops the worker and closes the transport."""
+        if self.worker is None or self.worker_pid != os.getpid():
+            return
+        try:
+            self.alerts.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.worker.join(timeout=timeout)
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            alert = self.alerts.get()
+            if alert is None:
+                break
+            digest = [alert]
+            deadline = time.monotonic() + self.digest_seconds
+            while len(digest) < self.digest_size:
+                try:
+                    alert = self.alerts.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if alert is None:
+                    stopping = True
+                    break
+                digest.append(alert)
+            self.send_digest(digest)
+        self.transport.close()
+
+    def send_digest(self, digest):
+        with self.lock:
+            dropped = self.dropped_since_digest
+            self.dropped_since_digest = 0
+
+        subjects = []
+        for subject, _ in digest:
+            if subject not in subjects:
+                subjects.append(subject)
+        digest_subject = ' / '.join(subjects)
+        if len(digest) > 1:
+            digest_subject += f' ({len(digest)} alerts)'
+        body = '\n\n----------\n\n'.join(f'{subject}\n{message}' if len(digest) > 1 else message
+                                         for subject, message in digest)
+        if dropped > 0:
+            body += f'\n\n----------\n\n{dropped} alerts were dropped because the alert queue was full.'
+
+        try:
+            self.transport.send(digest_subject, body)
+        except Exception:
+            self.transport.close()
+            with self.lock:
+                self.failed_digests += 1
+            return
+        with self.lock:
+            self.sent_alerts += len(digest)
+            self.sent_digests += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'queued': 0 if self.alerts is None else self.alerts.qsize(),
+                'max_queue': self.max_queue,
+                'sent_alerts': self.sent_alerts,
+                'sent_digests': self.sent_digests,
+                'failed_digests': self.failed_digests,
+                'dropped': self.dropped,
+            }
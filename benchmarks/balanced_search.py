@@ -0,0 +1,79 @@
+"""Compares the default and balanced modes of find_connection.get_tree() on pairs with a hub word on one side.
+
+Run from anywhere after building the database with manage_database.prepare_database():
+    python benchmarks/balanced_search.py
+
+For each pair, prints the synsets visited and the time taken by both modes. Both modes must return the same tree,
+so pairs where they don't are reported, and the script then exits with status 1."""
+
+import os
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import find_connection
+import wordnet_graph
+
+
+HUB_WORDS = ['set', 'run', 'take', 'make', 'go', 'break', 'cut', 'play', 'get', 'give', 'hold', 'turn',
+             'line', 'point', 'head', 'pass', 'draw', 'charge']
+OTHER_WORDS = ['saxophone', 'glacier', 'velvet', 'insomnia', 'thimble', 'nebula', 'marzipan', 'lukewarm',
+               'meticulous', 'ferment', 'whisper', 'abdicate', 'tangerine', 'obsolete', 'hibernate', 'crimson']
+PAIRS = [(hub_word, other_word) for hub_word in HUB_WORDS for other_word in OTHER_WORDS[:8]] + \
+        [(other_word, hub_word) for hub_word in HUB_WORDS[:8] for other_word in OTHER_WORDS[8:]] + \
+        [(HUB_WORDS[index], HUB_WORDS[-1 - index]) for index in range(len(HUB_WORDS) // 2)]
+
+
+def run_pair(wordnet_data, wordnet_index, start_word, target_word, balanced):
+    start_time = time.perf_counter()
+    tree_result = find_connection.get_tree(wordnet_data, wordnet_index, start_word, target_word, balanced)
+    return tree_result, time.perf_counter() - start_time
+
+
+def main():
+    sections = wordnet_graph.open_database(os.path.join(REPO_DIR, 'wordnet-graph.bin'))
+    wordnet_data = wordnet_graph.WordnetGraph(sections)
+    wordnet_index = wordnet_graph.WordIndex(sections)
+
+    totals = {False: [0, 0.0], True: [0, 0.0]}
+    pair_count = 0
+    different_count = 0
+
+    print(f'{"start":>12} {"target":>12} {"visited":>9} {"balanced":>9} {"ms":>8} {"balanced":>9}')
+    for start_word, target_word in PAIRS:
+        if start_word not in wordnet_index or target_word not in wordnet_index:
+            continue
+        default_result, default_seconds = run_pair(wordnet_data, wordnet_index, start_word, target_word, False)
+        balanced_result, balanced_seconds = run_pair(wordnet_data, wordnet_index, start_word, target_word, True)
+        if default_result.get('data') != balanced_result.get('data') \
+                or default_result['status'] != balanced_result['status']:
+            different_count += 1
+            print(f'{start_word:>12} {target_word:>12} different results!')
+            continue
+        if default_result['status'] != 'ok':
+            continue
+
+        pair_count += 1
+        totals[False][0] += default_result['synsets_visited']
+        totals[False][1] += default_seconds
+        totals[True][0] += balanced_result['synsets_visited']
+        totals[True][1] += balanced_seconds
+        print(f'{start_word:>12} {target_word:>12} {default_result["synsets_visited"]:>9} '
+              f'{balanced_result["synsets_visited"]:>9} {default_seconds * 1000:>8.1f} {balanced_seconds * 1000:>9.1f}')
+
+    if pair_count > 0:
+        print(f'\n{pair_count} connected pairs.')
+        print(f'Synsets visited: default {totals[False][0]}, balanced {totals[True][0]} '
+              f'({100 * (1 - totals[True][0] / totals[False][0]):.1f}% fewer).')
+        print(f'Total time: default {totals[False][1]:.2f}s, balanced {totals[True][1]:.2f}s.')
+    else:
+        print('No pairs found in the database.')
+    print(f'Different results: {different_count}.')
+    if different_count > 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
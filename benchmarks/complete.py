@@ -0,0 +1,83 @@
+"""Measures the latency of word completion, alone and through the /api/complete endpoint, and the memory it uses.
+
+Run from anywhere after building the database with manage_database.prepare_database():
+    python benchmarks/complete.py [--prefixes 2000] [--seed 0]
+
+Prefixes are the first 1 to 6 characters of random index words, typed with spaces for underscores, plus prefixes
+no word starts with. Reports p50, p99 and max time of find_connection.complete_word() and of requests through the
+Flask test client, with /healthz for the time every request takes. Completion searches the sorted word sections of
+the index, so the memory it adds is none beyond them; their size is reported, and the peak memory allocated while
+completing."""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+os.chdir(REPO_DIR)
+
+import find_connection
+import main
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of values."""
+    ordered_values = sorted(values)
+    rank = max(0, min(len(ordered_values) - 1, round(fraction * len(ordered_values) + 0.5) - 1))
+    return ordered_values[rank]
+
+
+def report(label, seconds):
+    print(f'{label:<16} {percentile(seconds, 0.5) * 1000:>8.3f} {percentile(seconds, 0.99) * 1000:>8.3f} '
+          f'{max(seconds) * 1000:>8.3f}')
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description='Measure word completion latency and memory.')
+    parser.add_argument('--prefixes', type=int, default=2000, help='Random prefixes to complete.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random prefixes.')
+    args = parser.parse_args()
+
+    main.database_thread.join()
+    wordnet_index = main.wordnet_index
+    randomizer = random.Random(args.seed)
+    prefixes = []
+    for _ in range(args.prefixes):
+        word = wordnet_index.word(randomizer.randrange(len(wordnet_index))).replace('_', ' ')
+        prefixes.append(word[:randomizer.randint(1, 6)])
+    prefixes += ['zzq', 'qx', 'xylophonez', '9z']
+
+    seconds = []
+    for prefix in prefixes:
+        start_time = time.perf_counter()
+        find_connection.complete_word(wordnet_index, prefix, main.COMPLETE_LIMIT)
+        seconds.append(time.perf_counter() - start_time)
+    print(f'{len(prefixes)} prefixes, up to {main.COMPLETE_LIMIT} words each.')
+    print(f'{"completed by":<16} {"p50 ms":>8} {"p99 ms":>8} {"max ms":>8}')
+    report('complete_word()', seconds)
+
+    client = main.app.test_client()
+    for url in ('/healthz', '/api/complete'):
+        seconds = []
+        for prefix in prefixes:
+            start_time = time.perf_counter()
+            client.get(url, query_string={'prefix': prefix})
+            seconds.append(time.perf_counter() - start_time)
+        report(url, seconds)
+
+    index_bytes = wordnet_index.word_offsets.nbytes + wordnet_index.word_text.nbytes
+    tracemalloc.start()
+    for prefix in prefixes:
+        find_connection.complete_word(wordnet_index, prefix, main.COMPLETE_LIMIT)
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f'\nSorted word sections searched: {index_bytes / 1024:.0f} KiB, already part of the index.')
+    print(f'Extra memory: none kept; peak allocated while completing {peak_bytes / 1024:.1f} KiB.')
+
+
+if __name__ == '__main__':
+    main_benchmark()
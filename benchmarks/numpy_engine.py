@@ -0,0 +1,123 @@
+"""Checks that the NumPy search engine returns the same trees as the pointer-at-a-time search, and compares their speed.
+
+Run from anywhere after building the database with manage_database.prepare_database(), with NumPy installed:
+    python benchmarks/numpy_engine.py [--random-pairs 300] [--repetitions 5] [--seed 0]
+
+Compares the results of find_connection.get_tree() for every connect query of benchmarks/corpus.json and
+--random-pairs random word pairs, with a synset and a generation limit, and of
+find_opposite.get_tree_to_nearest_antonyms() for every sense of the corpus words and the first random words.
+Then reports p50 and p95 search time of both engines for each connect corpus category; "hub" queries
+have the largest frontiers. Exits with status 1 if any result differs."""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import find_connection
+import find_opposite
+import numpy_search
+import search_budget
+import wordnet_graph
+
+
+CORPUS_PATH = os.path.join(REPO_DIR, 'benchmarks', 'corpus.json')
+# Budgets the results are also compared under, so too_large results are checked too.
+COMPARED_BUDGETS = ((0, 0), (500, 0), (0, 3))
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of values."""
+    ordered_values = sorted(values)
+    rank = max(0, min(len(ordered_values) - 1, round(fraction * len(ordered_values) + 0.5) - 1))
+    return ordered_values[rank]
+
+
+def compare_connect(wordnet_data, wordnet_index, engine, pairs):
+    differences = 0
+    for start_word, target_word in pairs:
+        for max_synsets, max_generations in COMPARED_BUDGETS:
+            results = []
+            for search_engine in (None, engine):
+                budget = search_budget.SearchBudget(max_synsets, max_generations)
+                results.append(find_connection.get_tree(
+                    wordnet_data, wordnet_index, start_word, target_word, budget=budget, engine=search_engine))
+            if results[0] != results[1]:
+                differences += 1
+                print(f'Different connect result: {start_word} -> {target_word}, '
+                      f'budget={max_synsets, max_generations}')
+    return differences
+
+
+def compare_opposite(wordnet_data, wordnet_index, engine, words):
+    differences = 0
+    for word in words:
+        for synset_id in wordnet_index[word]:
+            for max_synsets, max_generations in COMPARED_BUDGETS:
+                results = []
+                for search_engine in (None, engine):
+                    budget = search_budget.SearchBudget(max_synsets, max_generations)
+                    results.append(find_opposite.get_tree_to_nearest_antonyms(
+                        wordnet_data, word, [synset_id], budget, search_engine))
+                if results[0] != results[1]:
+                    differences += 1
+                    print(f'Different opposite result: {word} ({synset_id}), budget={max_synsets, max_generations}')
+    return differences
+
+
+def time_searches(wordnet_data, wordnet_index, search_engine, pairs, repetitions):
+    seconds = []
+    for start_word, target_word in pairs:
+        for _ in range(repetitions):
+            start_time = time.perf_counter()
+            find_connection.get_tree(wordnet_data, wordnet_index, start_word, target_word, engine=search_engine)
+            seconds.append(time.perf_counter() - start_time)
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the NumPy search engine with the default search.')
+    parser.add_argument('--random-pairs', type=int, default=300, help='Random word pairs to compare results for.')
+    parser.add_argument('--repetitions', type=int, default=5, help='Timed runs of each corpus query.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random word pairs.')
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH) as file:
+        corpus = json.load(file)
+    sections = wordnet_graph.open_database(os.path.join(REPO_DIR, 'wordnet-graph.bin'))
+    wordnet_data = wordnet_graph.WordnetGraph(sections)
+    wordnet_index = wordnet_graph.WordIndex(sections)
+    engine = numpy_search.NumpySearchEngine(wordnet_data)
+
+    corpus_pairs = {category: [tuple(pair) for pair in pairs if pair[0] in wordnet_index and pair[1] in wordnet_index]
+                    for category, pairs in corpus['connect'].items()}
+    randomizer = random.Random(args.seed)
+    random_words = [wordnet_index.word(randomizer.randrange(len(wordnet_index))) for _ in range(2 * args.random_pairs)]
+    pairs = [pair for category_pairs in corpus_pairs.values() for pair in category_pairs]
+    pairs += list(zip(random_words[::2], random_words[1::2]))
+    words = [word for category_words in corpus['opposite'].values() for word in category_words if word in wordnet_index]
+    words += random_words[:args.random_pairs]
+
+    differences = compare_connect(wordnet_data, wordnet_index, engine, pairs)
+    differences += compare_opposite(wordnet_data, wordnet_index, engine, words)
+    print(f'Compared {len(pairs)} connect queries and {len(words)} opposite words: {differences} differences.')
+
+    print(f'\n{"connect search":<16} {"python p50":>11} {"python p95":>11} {"numpy p50":>11} {"numpy p95":>11}')
+    for category, category_pairs in corpus_pairs.items():
+        figures = []
+        for search_engine in (None, engine):
+            seconds = time_searches(wordnet_data, wordnet_index, search_engine, category_pairs, args.repetitions)
+            figures += [percentile(seconds, 0.5) * 1000, percentile(seconds, 0.95) * 1000]
+        print(f'{category:<16} ' + ' '.join(f'{figure:>8.2f} ms' for figure in figures))
+
+    if differences > 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
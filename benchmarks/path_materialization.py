@@ -0,0 +1,292 @@
+"""Compares find_connection.get_paths_from_tree() and find_opposite.get_paths_from_antonym_tree() against
+the implementations they replaced, which built every path node as a dictionary of pointer data and then spliced
+the lists into shape.
+
+Run from anywhere after building the database with manage_database.prepare_database():
+    python benchmarks/path_materialization.py
+
+Trees are searched once for a fixed set of queries, then the path functions are timed alone over them,
+and their results are checked to be identical."""
+
+import os
+import random
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import find_connection
+import find_opposite
+import wordnet_graph
+
+POINTER_SYMBOL_KEY = find_connection.POINTER_SYMBOL_KEY
+
+CONNECT_PAIRS = [('dog', 'cat'), ('hot', 'cold'), ('run', 'walk'), ('love', 'hate'), ('set', 'glacier'),
+                 ('happy', 'sad'), ('make', 'break'), ('light', 'heavy'), ('music', 'silence'), ('fast', 'slow'),
+                 ('green', 'envy'), ('king', 'pawn'), ('ocean', 'desert'), ('bright', 'obscure'), ('take', 'give')]
+OPPOSITE_WORDS = ['dog', 'tree', 'run', 'blue', 'cloud', 'make', 'quick', 'gentle', 'heavy', 'bright',
+                  'loud', 'melt', 'build', 'ancient', 'smooth']
+REPETITIONS = 20
+
+
+def reference_get_paths_from_tree(wordnet_data, tree):
+    """The function as it was before path materialization was rewritten, kept for comparison."""
+
+    paths_by_connector = {}
+
+    for direction in range(2):
+        latest_generation = tree[direction][-1]
+        for node_index in range(len(latest_generation)):
+
+            connecting_synset_id = latest_generation[node_index][0][1]
+
+            if direction == 0:
+                paths_by_connector[connecting_synset_id] = []
+
+            insert_index = len(paths_by_connector[connecting_synset_id])
+            this_path = paths_by_connector[connecting_synset_id]
+
+            # Populate this_path.
+            for this_pointer in find_connection.get_genealogy_line(tree, direction, node_index):
+
+                pointer_node = {
+                    'pointer_source': this_pointer[2],
+                    'pointer_target': this_pointer[3],
+                    'pointer_phrase': POINTER_SYMBOL_KEY[this_pointer[0]]['phrase'],
+                }
+                synset_node = {'synset_id': this_pointer[1]}
+                if direction == 0:
+                    this_path.append(pointer_node)
+                    this_path.append(synset_node)
+                else:
+                    this_path.insert(insert_index, pointer_node)
+                    this_path.insert(insert_index, synset_node)
+
+            # Remove connecting synset (last) in direction 0. Redundant; will be added in direction 1.
+            if direction == 0:
+                this_path.pop(-1)
+
+    for connecting_synset_id in paths_by_connector:
+        path = paths_by_connector[connecting_synset_id]
+        for node_index in range(len(path) - 2, 0, -2):
+
+            this_node = path[node_index]
+            prev_node = path[node_index - 1]
+            next_node = path[node_index + 1]
+            synset_id = this_node['synset_id']
+            this_node['pointer_phrase'] = next_node['pointer_phrase']
+            this_node['pos'] = wordnet_data.pos(synset_id)
+            this_node['gloss'] = wordnet_data.gloss(synset_id)
+
+            all_words_underscored = wordnet_data.words(synset_id)
+            all_words = []
+            for word in all_words_underscored:
+                formatted_word = word.replace('_', ' ').split('(')[0]
+                all_words.append(formatted_word)
+
+            key_words = []
+            target_word_index = prev_node['pointer_target']
+            if target_word_index != -1:
+                target_word = all_words[target_word_index]
+                key_words.append(target_word)
+            source_word_index = next_node['pointer_source']
+            if source_word_index != -1:
+                source_word = all_words[source_word_index]
+                if source_word not in key_words:
+                    key_words.append(source_word)
+            if len(key_words) == 0:
+                key_words.append(all_words[0])
+            this_node['key_words'] = key_words
+            this_node['two_kw'] = len(key_words) == 2
+
+            this_node['other_words'] = ''
+            for word in all_words:
+                if word not in key_words:
+                    this_node['other_words'] += word
+                    this_node['other_words'] += ', '
+            this_node['other_words'] = this_node['other_words'][:-2]
+
+            del this_node['synset_id']
+
+        for node_index in range(len(path) - 1, -1, -2):
+            del path[node_index]
+
+        this_node_hue = find_connection.START_HUE
+        for node in path:
+            node['color_a'] = f'hsl({this_node_hue}, 100%, 75%)'  # main background
+            node['color_b'] = f'hsl({this_node_hue}, 100%, 78%)'  # ligher background for pointer between synsets
+            node['color_c'] = f'hsl({this_node_hue}, 100%, 28%)'  # non-black text: part of speech,
+            # pointer phrase, arrows
+            this_node_hue = (this_node_hue + find_connection.HUE_STEP) % 360
+
+    return paths_by_connector
+
+
+def reference_get_paths_from_antonym_tree(wordnet_data, tree):
+    """The function as it was before path materialization was rewritten, kept for comparison."""
+
+    paths_by_connector = {}
+
+    latest_generation = tree[0][-1]
+    for node_index in range(len(latest_generation)):
+
+        connecting_synset_id = latest_generation[node_index][0][1]
+
+        paths_by_connector[connecting_synset_id] = []
+
+        this_path = paths_by_connector[connecting_synset_id]
+
+        # Populate this_path.
+        for this_pointer in find_connection.get_genealogy_line(tree, 0, node_index):
+
+            pointer_node = {
+                'pointer_source': this_pointer[2],
+                'pointer_target': this_pointer[3],
+                'pointer_phrase': POINTER_SYMBOL_KEY[this_pointer[0]]['phrase'],
+            }
+            synset_node = {'synset_id': this_pointer[1]}
+            this_path.append(pointer_node)
+            this_path.append(synset_node)
+
+        # Add end pointer.
+        end_pointer = {
+            'pointer_source': -1,
+            'pointer_target': -1,
+            'pointer_phrase': POINTER_SYMBOL_KEY['__end']['phrase'],
+        }
+        this_path.append(end_pointer)
+
+    this_path_hue = random.randint(0, 360)
+
+    for connecting_synset_id in paths_by_connector:
+        path = paths_by_connector[connecting_synset_id]
+        for node_index in range(len(path) - 2, 0, -2):
+
+            this_node = path[node_index]
+            prev_node = path[node_index - 1]
+            next_node = path[node_index + 1]
+            synset_id = this_node['synset_id']
+            this_node['pointer_phrase'] = next_node['pointer_phrase']
+            this_node['pos'] = wordnet_data.pos(synset_id)
+            this_node['gloss'] = wordnet_data.gloss(synset_id)
+
+            all_words_underscored = wordnet_data.words(synset_id)
+            all_words = []
+            for word in all_words_underscored:
+                formatted_word = word.replace('_', ' ').split('(')[0]
+                all_words.append(formatted_word)
+
+            key_words = []
+            target_word_index = prev_node['pointer_target']
+            if target_word_index != -1:
+                target_word = all_words[target_word_index]
+                key_words.append(target_word)
+            source_word_index = next_node['pointer_source']
+            if source_word_index != -1:
+                source_word = all_words[source_word_index]
+                if source_word not in key_words:
+                    key_words.append(source_word)
+            if len(key_words) == 0:
+                key_words.append(all_words[0])
+            this_node['key_words'] = key_words
+            this_node['two_kw'] = len(key_words) == 2
+
+            this_node['other_words'] = ''
+            for word in all_words:
+                if word not in key_words:
+                    this_node['other_words'] += word
+                    this_node['other_words'] += ', '
+            this_node['other_words'] = this_node['other_words'][:-2]
+
+            del this_node['synset_id']
+
+        for node_index in range(len(path) - 1, -1, -2):
+            del path[node_index]
+
+        this_path_hue = (this_path_hue - 110) % 360
+        soft_text_value = 35
+        start_lightness = 50
+        end_lightness = 100
+        lightness_change_relative = len(path) * 2 - 4
+        lightness_change_absolute = (end_lightness - start_lightness) / max(lightness_change_relative, 1)
+
+        for node_index in range(len(path)):
+            node = path[node_index]
+
+            if node_index + 1 == len(path):  # final node
+                node['color_a'] = f'hsl(0, 0%, 30%)'  # main background
+                node['color_c'] = f'hsl(0, 0%, {100 - soft_text_value + 15}%)'  # softer text: part of speech,
+                # pointer phrase, arrows
+                node['color_d'] = f'hsl(0, 0%, 100%)'  # main text: words, gloss
+            elif len(path) == 2:  # first node in 2-node path
+                c_saturation = 200 - end_lightness * 2
+                c_hsl = find_opposite.hsv_to_hsl([this_path_hue, c_saturation, soft_text_value])
+                node['color_a'] = f'hsl({this_path_hue}, 100%, {end_lightness}%)'  # main background
+                node['color_c'] = f'hsl({c_hsl[0]}, {c_hsl[1]}%, {c_hsl[2]}%)'  # softer text: part of speech,
+                # pointer phrase, arrows
+                node['color_d'] = f'hsl({this_path_hue}, 100%, 0%)'  # main text: words, gloss
+            else:  # not final node
+                a_lightness = start_lightness + lightness_change_absolute * (node_index * 2)
+                c_saturation = 200 - a_lightness * 2
+                c_hsl = find_opposite.hsv_to_hsl([this_path_hue, c_saturation, soft_text_value])
+                node['color_a'] = f'hsl({this_path_hue}, 100%, {a_lightness}%)'  # main background
+                node['color_c'] = f'hsl({c_hsl[0]}, {c_hsl[1]}%, {c_hsl[2]}%)'  # softer text: part of speech,
+                # pointer phrase, arrows
+                node['color_d'] = f'hsl({this_path_hue}, 100%, 0%)'  # main text: words, gloss
+
+            # ligher background for pointer between synsets
+            if node_index + 2 == len(path):  # penultimate node
+                node['color_b'] = f'hsl({(this_path_hue - 10) % 360}, 0%, 75%)'
+            else:  # not penultimate node
+                b_lightness = start_lightness + lightness_change_absolute * (node_index * 2 + 1)
+                node['color_b'] = f'hsl({(this_path_hue - 10) % 360}, 100%, {b_lightness}%)'
+
+    return paths_by_connector
+
+
+def time_function(function, wordnet_data, trees):
+    random.seed(0)
+    start_time = time.perf_counter()
+    for repetition in range(REPETITIONS):
+        results = [function(wordnet_data, tree) for tree in trees]
+    return (time.perf_counter() - start_time) / REPETITIONS / len(trees), results
+
+
+def main():
+    sections = wordnet_graph.open_database(os.path.join(REPO_DIR, 'wordnet-graph.bin'))
+    wordnet_data = wordnet_graph.WordnetGraph(sections)
+    wordnet_index = wordnet_graph.WordIndex(sections)
+
+    connect_trees = []
+    for start_word, target_word in CONNECT_PAIRS:
+        if start_word in wordnet_index and target_word in wordnet_index:
+            tree_result = find_connection.get_tree(wordnet_data, wordnet_index, start_word, target_word)
+            if tree_result['status'] == 'ok':
+                connect_trees.append(tree_result['data'])
+    opposite_trees = []
+    for word in OPPOSITE_WORDS:
+        if word in wordnet_index:
+            tree_result = find_opposite.get_tree_to_nearest_antonyms(wordnet_data, word, wordnet_index[word])
+            if tree_result['status'] == 'ok':
+                opposite_trees.append(tree_result['data'])
+
+    comparisons = (
+        ('connect', reference_get_paths_from_tree, find_connection.get_paths_from_tree, connect_trees),
+        ('opposite', reference_get_paths_from_antonym_tree, find_opposite.get_paths_from_antonym_tree,
+         opposite_trees),
+    )
+    for name, reference_function, function, trees in comparisons:
+        if len(trees) == 0:
+            print(f'{name}: no queries found in the database.')
+            continue
+        reference_seconds, reference_results = time_function(reference_function, wordnet_data, trees)
+        seconds, results = time_function(function, wordnet_data, trees)
+        path_count = sum(len(paths) for paths in results)
+        print(f'{name}: {len(trees)} queries, {path_count} paths. '
+              f'Before {reference_seconds * 1000:.3f} ms, after {seconds * 1000:.3f} ms per query '
+              f'({reference_seconds / seconds:.1f}x). Identical: {results == reference_results}')
+
+
+if __name__ == '__main__':
+    main()
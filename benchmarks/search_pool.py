@@ -0,0 +1,94 @@
+"""Compares concurrent connect queries searched in the request threads and in search_executor.SearchExecutor pools.
+
+Run from anywhere after building the database with manage_database.prepare_database():
+    python benchmarks/search_pool.py [--threads 8] [--processes 1 2 4] [--repetitions 3]
+
+Each run sends every connect query of benchmarks/corpus.json --repetitions times from --threads threads at once,
+through find_connection.web_app_inquiry() without a cache, and reports queries per second and p50 and p95 latency.
+Searches in threads share one interpreter lock, so only the pools can use more than one CPU core.
+Before timing, checks that every query gets the same result from each pool as in the request thread."""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import find_connection
+import search_executor
+import wordnet_graph
+
+
+CORPUS_PATH = os.path.join(REPO_DIR, 'benchmarks', 'corpus.json')
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of values."""
+    ordered_values = sorted(values)
+    rank = max(0, min(len(ordered_values) - 1, round(fraction * len(ordered_values) + 0.5) - 1))
+    return ordered_values[rank]
+
+
+def query_result(wordnet_data, wordnet_index, pair, search_pool):
+    result = find_connection.web_app_inquiry(wordnet_data, wordnet_index, pair[0], pair[1], search_pool=search_pool)
+    result.pop('timings', None)
+    return result
+
+
+def run_queries(wordnet_data, wordnet_index, pairs, threads, search_pool):
+    def timed_query(pair):
+        start_time = time.perf_counter()
+        status = query_result(wordnet_data, wordnet_index, pair, search_pool)['status']
+        return time.perf_counter() - start_time, status
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(threads) as thread_pool:
+        query_results = list(thread_pool.map(timed_query, pairs))
+    total_seconds = time.perf_counter() - start_time
+    seconds = [query_seconds for query_seconds, _ in query_results]
+    not_ok = sum(1 for _, status in query_results if status != 'ok')
+    return len(pairs) / total_seconds, percentile(seconds, 0.5), percentile(seconds, 0.95), not_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare searches in request threads and in process pools.')
+    parser.add_argument('--threads', type=int, default=8, help='Queries sent at once.')
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4], help='Pool sizes to compare.')
+    parser.add_argument('--repetitions', type=int, default=3, help='Times each query is sent per run.')
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH) as file:
+        corpus = json.load(file)
+    database_path = os.path.join(REPO_DIR, 'wordnet-graph.bin')
+    sections = wordnet_graph.open_database(database_path)
+    wordnet_data = wordnet_graph.WordnetGraph(sections)
+    wordnet_index = wordnet_graph.WordIndex(sections)
+    pairs = [tuple(pair) for category_pairs in corpus['connect'].values() for pair in category_pairs]
+    in_thread_results = [query_result(wordnet_data, wordnet_index, pair, None) for pair in pairs]
+
+    print(f'{len(pairs) * args.repetitions} queries from {args.threads} threads, {os.cpu_count()} CPU cores.')
+    print(f'{"searched in":<16} {"queries/s":>10} {"p50 ms":>9} {"p95 ms":>9} {"not ok":>7}')
+    for processes in [0] + args.processes:
+        search_pool = None
+        label = 'request threads'
+        if processes > 0:
+            # Room for every thread's query, so none are turned away as busy.
+            search_pool = search_executor.SearchExecutor(database_path, processes, max(args.threads, 4 * processes))
+            label = f'{processes} processes'
+            for pair, in_thread_result in zip(pairs, in_thread_results):
+                if query_result(wordnet_data, wordnet_index, pair, search_pool) != in_thread_result:
+                    print(f'{label}: different result for {pair[0]} -> {pair[1]}')
+        queries_per_second, p50_seconds, p95_seconds, not_ok = run_queries(
+            wordnet_data, wordnet_index, pairs * args.repetitions, args.threads, search_pool)
+        print(f'{label:<16} {queries_per_second:>10.1f} {p50_seconds * 1000:>9.1f} {p95_seconds * 1000:>9.1f} '
+              f'{not_ok:>7}')
+        if search_pool is not None:
+            search_pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
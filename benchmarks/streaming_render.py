@@ -0,0 +1,72 @@
+"""Compares time to first byte and total time of connect result pages rendered whole and streamed.
+
+Run from anywhere after building the database with manage_database.prepare_database():
+    python benchmarks/streaming_render.py
+
+Requests go through the Flask test client without buffering, so the first byte is timed when the first chunk of
+the response body is generated. The query cache is disabled, so every request runs its search."""
+
+import os
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+os.chdir(REPO_DIR)
+os.environ['QUERY_CACHE_SIZE'] = '0'
+
+import main
+
+
+CONNECT_PAIRS = [('tangerine', 'set'), ('dog', 'cat'), ('hot', 'cold'), ('run', 'walk'), ('love', 'hate'),
+                 ('set', 'glacier'), ('happy', 'sad'), ('make', 'break'), ('light', 'heavy'), ('music', 'silence'),
+                 ('fast', 'slow'), ('green', 'envy'), ('ocean', 'desert'), ('bright', 'obscure'), ('take', 'give'),
+                 ('crimson', 'run'), ('saxophone', 'line'), ('whisper', 'charge')]
+REPETITIONS = 5
+
+
+def time_request(client, url):
+    start_time = time.perf_counter()
+    response = client.get(url, buffered=False)
+    first_byte_seconds = None
+    byte_count = 0
+    for chunk in response.response:
+        if first_byte_seconds is None and len(chunk) > 0:
+            first_byte_seconds = time.perf_counter() - start_time
+        byte_count += len(chunk)
+    total_seconds = time.perf_counter() - start_time
+    response.close()
+    return first_byte_seconds, total_seconds, byte_count
+
+
+def main_benchmark():
+    main.database_thread.join()
+    main.admin_alert = lambda subject, message: None  # Don't queue an alert per request.
+    client = main.app.test_client()
+
+    totals = {False: [0.0, 0.0], True: [0.0, 0.0]}
+    print(f'{"start":>10} {"target":>10} {"kB":>6} {"ttfb ms":>8} {"total ms":>9} {"streamed":>9} {"total ms":>9}')
+    for start_word, target_word in CONNECT_PAIRS:
+        url = f'/connect/query?source={start_word}&target={target_word}'
+        timings = {}
+        for stream in (False, True):
+            main.STREAM_CONNECT_RESULTS = stream
+            best = None
+            for _ in range(REPETITIONS):
+                timing = time_request(client, url)
+                if best is None or timing[1] < best[1]:
+                    best = timing
+            timings[stream] = best
+            totals[stream][0] += best[0]
+            totals[stream][1] += best[1]
+        print(f'{start_word:>10} {target_word:>10} {timings[False][2] / 1000:>6.1f} '
+              f'{timings[False][0] * 1000:>8.1f} {timings[False][1] * 1000:>9.1f} '
+              f'{timings[True][0] * 1000:>9.1f} {timings[True][1] * 1000:>9.1f}')
+
+    print(f'\nBest of {REPETITIONS} for each of {len(CONNECT_PAIRS)} queries, summed:')
+    for stream, label in ((False, 'whole'), (True, 'streamed')):
+        print(f'{label:>9}: first byte {totals[stream][0] * 1000:.1f} ms, total {totals[stream][1] * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main_benchmark()
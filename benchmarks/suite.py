@@ -0,0 +1,210 @@
+"""Benchmark suite for the connect and opposite searches and the database build.
+
+Run from anywhere after building the database with manage_database.prepare_database():
+    python benchmarks/suite.py [--output results.json] [--baseline old_results.json] [--repetitions 5] [--skip-build]
+
+Runs each query of benchmarks/corpus.json through the search, the path materialization function and
+web_app_inquiry() (without a cache), and reports p50 and p95 latency, mean synsets visited and peak traced memory
+for each operation and corpus category. Opposite words with several senses are run once per sense.
+Then times each stage of manage_database.prepare_database(), building into a temporary directory.
+
+Writes the results as JSON to --output. With --baseline, also prints the change of every figure against
+a results file written earlier, e.g. on the commit before a change."""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import find_connection
+import find_opposite
+import manage_database
+import wordnet_graph
+
+
+CORPUS_PATH = os.path.join(REPO_DIR, 'benchmarks', 'corpus.json')
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of values."""
+    ordered_values = sorted(values)
+    rank = max(0, min(len(ordered_values) - 1, round(fraction * len(ordered_values) + 0.5) - 1))
+    return ordered_values[rank]
+
+
+def measure(function, repetitions):
+    """Returns the result of function(), its run times in seconds, and its peak traced memory in bytes.
+Memory is traced on a separate run, since tracing slows everything it traces."""
+
+    seconds = []
+    result = None
+    for _ in range(repetitions):
+        start_time = time.perf_counter()
+        result = function()
+        seconds.append(time.perf_counter() - start_time)
+    tracemalloc.start()
+    function()
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak_bytes
+
+
+def connect_cases(wordnet_data, wordnet_index, corpus):
+    for category, pairs in corpus['connect'].items():
+        for start_word, target_word in pairs:
+            if start_word not in wordnet_index or target_word not in wordnet_index:
+                print(f'Skipped {start_word} -> {target_word}: not in the database.')
+                continue
+            yield category, {
+                'search': lambda: find_connection.get_tree(wordnet_data, wordnet_index, start_word, target_word),
+                'paths': lambda tree: find_connection.get_paths_from_tree(wordnet_data, tree),
+                'web_app_inquiry': lambda: find_connection.web_app_inquiry(
+                    wordnet_data, wordnet_index, start_word, target_word),
+            }
+
+
+def opposite_cases(wordnet_data, wordnet_index, corpus):
+    for category, words in corpus['opposite'].items():
+        for word in words:
+            if word not in wordnet_index:
+                print(f'Skipped {word}: not in the database.')
+                continue
+            for synset_id in wordnet_index[word]:
+                yield category, {
+                    'search': lambda: find_opposite.get_tree_to_nearest_antonyms(wordnet_data, word, [synset_id]),
+                    'paths': lambda tree: find_opposite.get_paths_from_antonym_tree(wordnet_data, tree),
+                    'web_app_inquiry': lambda: find_opposite.web_app_inquiry(
+                        wordnet_data, wordnet_index, word, str(synset_id)),
+                }
+
+
+def run_queries(cases, repetitions):
+    """Returns {operation: {category: figures}} for the search, paths and web_app_inquiry functions of cases."""
+
+    samples = {}
+    for category, functions in cases:
+        tree_result, seconds, peak_bytes = measure(functions['search'], repetitions)
+        operation_results = [('search', seconds, peak_bytes, tree_result.get('synsets_visited'))]
+        if tree_result['status'] == 'ok':
+            _, seconds, peak_bytes = measure(lambda: functions['paths'](tree_result['data']), repetitions)
+            operation_results.append(('paths', seconds, peak_bytes, None))
+        _, seconds, peak_bytes = measure(functions['web_app_inquiry'], repetitions)
+        operation_results.append(('web_app_inquiry', seconds, peak_bytes, None))
+
+        for operation, seconds, peak_bytes, synsets_visited in operation_results:
+            category_samples = samples.setdefault(operation, {}).setdefault(
+                category, {'seconds': [], 'peak_bytes': [], 'synsets_visited': []})
+            category_samples['seconds'].extend(seconds)
+            category_samples['peak_bytes'].append(peak_bytes)
+            if synsets_visited is not None:
+                category_samples['synsets_visited'].append(synsets_visited)
+
+    figures = {}
+    for operation in samples:
+        figures[operation] = {}
+        for category, category_samples in samples[operation].items():
+            category_figures = {
+                'p50_ms': percentile(category_samples['seconds'], 0.5) * 1000,
+                'p95_ms': percentile(category_samples['seconds'], 0.95) * 1000,
+                'peak_kib': max(category_samples['peak_bytes']) / 1024,
+            }
+            if len(category_samples['synsets_visited']) > 0:
+                synsets_visited = category_samples['synsets_visited']
+                category_figures['synsets_visited_mean'] = sum(synsets_visited) / len(synsets_visited)
+            figures[operation][category] = category_figures
+    return figures
+
+
+def time_build():
+    stage_timings = {}
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        start_time = time.perf_counter()
+        manage_database.prepare_database(os.path.join(directory, 'wordnet-graph.bin'), stage_timings)
+        stage_timings['total'] = time.perf_counter() - start_time
+    return stage_timings
+
+
+def flatten(results, prefix=''):
+    figures = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            figures.update(flatten(value, f'{prefix}{key}.'))
+        elif isinstance(value, (int, float)):
+            figures[f'{prefix}{key}'] = value
+    return figures
+
+
+def print_results(results):
+    for query in ('connect', 'opposite'):
+        print(f'\n{query:<16} {"category":<16} {"p50 ms":>9} {"p95 ms":>9} {"synsets":>9} {"peak KiB":>9}')
+        for operation, categories in results[query].items():
+            for category, figures in categories.items():
+                synsets_visited = figures.get('synsets_visited_mean')
+                synsets_text = '' if synsets_visited is None else f'{synsets_visited:.0f}'
+                print(f'{operation:<16} {category:<16} {figures["p50_ms"]:>9.2f} {figures["p95_ms"]:>9.2f} '
+                      f'{synsets_text:>9} {figures["peak_kib"]:>9.0f}')
+    if 'build_seconds' in results:
+        print(f'\n{"build stage":<32} {"seconds":>9}')
+        for stage, seconds in results['build_seconds'].items():
+            print(f'{stage:<32} {seconds:>9.2f}')
+
+
+def print_comparison(results, baseline):
+    figures = flatten(results)
+    baseline_figures = flatten(baseline)
+    print(f'\n{"figure":<60} {"baseline":>10} {"current":>10} {"change":>8}')
+    for name, value in figures.items():
+        if name not in baseline_figures or name == 'repetitions':
+            continue
+        baseline_value = baseline_figures[name]
+        change = '' if baseline_value == 0 else f'{100 * (value - baseline_value) / baseline_value:+.1f}%'
+        print(f'{name:<60} {baseline_value:>10.2f} {value:>10.2f} {change:>8}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the searches and the database build.')
+    parser.add_argument('--output', default='benchmark-results.json', help='Where to write the results as JSON.')
+    parser.add_argument('--baseline', help='Results file of an earlier run to compare against.')
+    parser.add_argument('--repetitions', type=int, default=5, help='Timed runs of each query and operation.')
+    parser.add_argument('--skip-build', action='store_true', help="Don't time prepare_database().")
+    args = parser.parse_args()
+    output_path = os.path.abspath(args.output)
+    baseline_path = None if args.baseline is None else os.path.abspath(args.baseline)
+
+    os.chdir(REPO_DIR)  # prepare_database() reads the WordNet files from the working directory.
+    with open(CORPUS_PATH) as file:
+        corpus = json.load(file)
+    sections = wordnet_graph.open_database(os.path.join(REPO_DIR, 'wordnet-graph.bin'))
+    wordnet_data = wordnet_graph.WordnetGraph(sections)
+    wordnet_index = wordnet_graph.WordIndex(sections)
+
+    results = {
+        'python': platform.python_version(),
+        'repetitions': args.repetitions,
+        'connect': run_queries(connect_cases(wordnet_data, wordnet_index, corpus), args.repetitions),
+        'opposite': run_queries(opposite_cases(wordnet_data, wordnet_index, corpus), args.repetitions),
+    }
+    if not args.skip_build:
+        results['build_seconds'] = time_build()
+
+    print_results(results)
+    with open(output_path, 'w') as file:
+        json.dump(results, file, indent=4)
+    print(f'\nWrote {output_path}')
+
+    if baseline_path is not None:
+        with open(baseline_path) as file:
+            print_comparison(results, json.load(file))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Compares looking up the position of a search's word in each of its synsets through the index postings
+(wordnet_graph.WordIndex.senses()) and the lower case word forms (wordnet_graph.WordnetGraph.word_num()) against
+lower-casing and stripping every word of each synset on each request, as the searches did before.
+
+Run from anywhere after building the database with manage_database.prepare_database():
+    python benchmarks/word_positions.py [--repetitions 200]
+
+For every word of the queries of benchmarks/corpus.json, finds the position of the word in each of its synsets
+all three ways, checks they agree, and reports the mean time per query, for the two words of a connect query."""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import wordnet_graph
+
+
+CORPUS_PATH = os.path.join(REPO_DIR, 'benchmarks', 'corpus.json')
+
+
+def reference_word_nums(wordnet_data, wordnet_index, word):
+    """The positions as find_connection.get_tree() and find_opposite.get_tree_to_nearest_antonyms() found them
+before, kept for comparison."""
+    word_nums = {}
+    for synset_id in wordnet_index[word]:
+        lower_case_words = [synset_word.lower().split('(')[0] for synset_word in wordnet_data.words(synset_id)]
+        word_nums[synset_id] = lower_case_words.index(word)
+    return word_nums
+
+
+def posting_word_nums(wordnet_data, wordnet_index, word):
+    return dict(wordnet_index.senses(word))
+
+
+def lower_word_nums(wordnet_data, wordnet_index, word):
+    return {synset_id: wordnet_data.word_num(synset_id, word) for synset_id in wordnet_index[word]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare ways of finding the position of a word in its synsets.')
+    parser.add_argument('--repetitions', type=int, default=200, help='Timed runs over all the words.')
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH) as file:
+        corpus = json.load(file)
+    sections = wordnet_graph.open_database(os.path.join(REPO_DIR, 'wordnet-graph.bin'))
+    wordnet_data = wordnet_graph.WordnetGraph(sections)
+    wordnet_index = wordnet_graph.WordIndex(sections)
+
+    words = [word for category_pairs in corpus['connect'].values() for pair in category_pairs for word in pair]
+    words += [word for category_words in corpus['opposite'].values() for word in category_words]
+    words = [word for word in words if word in wordnet_index]
+
+    functions = (('lower-cased per request', reference_word_nums), ('index postings', posting_word_nums),
+                 ('lower case forms', lower_word_nums))
+    for word in words:
+        reference = reference_word_nums(wordnet_data, wordnet_index, word)
+        for label, function in functions[1:]:
+            if function(wordnet_data, wordnet_index, word) != reference:
+                print(f'{label}: different positions for {word}')
+
+    print(f'{len(words)} words, {sum(len(wordnet_index[word]) for word in words)} senses.')
+    print(f'{"found by":<24} {"us per query":>13}')
+    for label, function in functions:
+        start_time = time.perf_counter()
+        for _ in range(args.repetitions):
+            for word in words:
+                function(wordnet_data, wordnet_index, word)
+        seconds = (time.perf_counter() - start_time) / args.repetitions / len(words)
+        print(f'{label:<24} {seconds * 2 * 1e6:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Measures the unique memory (USS) of each gunicorn worker for 1, 2, 4 and 8 workers, with and without preload mode.
+
+Run from anywhere after building the database with manage_database.prepare_database(), on Linux:
+    python benchmarks/worker_memory.py
+
+For each mode and worker count, starts gunicorn with gunicorn.conf.py on a local port, waits for /healthz to report
+the database ready, sends the queries of benchmarks/corpus.json so every worker has searched, then reads each
+worker's /proc/<pid>/smaps_rollup. USS is its private clean and dirty memory, the memory only that worker uses.
+PSS, which splits shared pages between the processes sharing them, is reported alongside."""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER_COUNTS = (1, 2, 4, 8)
+PORT = 8765
+STARTUP_SECONDS = 60
+
+
+def read_memory(pid):
+    """Returns (uss_kib, pss_kib) of process pid."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields['Private_Clean'] + fields['Private_Dirty'], fields['Pss']
+
+
+def child_pids(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as file:
+        return [int(child_pid) for child_pid in file.read().split()]
+
+
+def fetch(path):
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{PORT}{path}', timeout=30) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+    except OSError:
+        return None
+
+
+def send_queries(corpus, rounds):
+    for _ in range(rounds):
+        for pairs in corpus['connect'].values():
+            for start_word, target_word in pairs:
+                fetch('/api/connect?' + urllib.parse.urlencode({'source': start_word, 'target': target_word}))
+        for words in corpus['opposite'].values():
+            for word in words:
+                fetch('/api/opposite?' + urllib.parse.urlencode({'word': word}))
+
+
+def measure(worker_count, preload, corpus):
+    environment = dict(os.environ, GUNICORN_PRELOAD='1' if preload else '0', QUERY_CACHE_SIZE='0',
+                       ALERT_DIGEST_SECONDS='3600')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--workers', str(worker_count),
+         '--bind', f'127.0.0.1:{PORT}', 'main:app'],
+        cwd=REPO_DIR, env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + STARTUP_SECONDS
+        while fetch('/healthz') != 200 or len(child_pids(server.pid)) < worker_count:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f'gunicorn with {worker_count} workers did not become ready.')
+            time.sleep(0.2)
+        send_queries(corpus, rounds=worker_count)  # Requests go to whichever worker accepts first.
+        workers = [read_memory(pid) for pid in child_pids(server.pid)]
+        return read_memory(server.pid), workers
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main():
+    with open(os.path.join(REPO_DIR, 'benchmarks', 'corpus.json')) as file:
+        corpus = json.load(file)
+
+    print(f'{"mode":>10} {"workers":>8} {"USS KiB/worker":>15} {"PSS KiB/worker":>15} {"master USS":>11} '
+          f'{"total USS KiB":>14}')
+    for preload in (False, True):
+        for worker_count in WORKER_COUNTS:
+            master, workers = measure(worker_count, preload, corpus)
+            worker_uss = sum(uss for uss, _ in workers) / len(workers)
+            worker_pss = sum(pss for _, pss in workers) / len(workers)
+            total_uss = master[0] + sum(uss for uss, _ in workers)
+            mode = 'preload' if preload else 'separate'
+            print(f'{mode:>10} {worker_count:>8} {worker_uss:>15.0f} {worker_pss:>15.0f} {master[0]:>11} '
+                  f'{total_uss:>14}')
+
+
+if __name__ == '__main__':
+    main()
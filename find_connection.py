@@ -1,6 +1,9 @@
+import heapq
+import itertools
 import random
+import time
 import manage_database
-from copy import deepcopy
+import search_budget
 
 
 START_HUE = 280
@@ -10,6 +13,23 @@ POINTER_SYMBOL_KEY = manage_database.POINTER_SYMBOL_KEY
 POINTER_TYPES_TO_IGNORE = manage_database.POINTER_TYPES_TO_IGNORE
 IGNORE_ANTONYMS = manage_database.IGNORE_ANTONYMS
 POINTER_SEQUENCES_TO_IGNORE = manage_database.POINTER_SEQUENCES_TO_IGNORE
+POINTER_REFLEXES = manage_database.POINTER_REFLEXES
+POINTER_SYMBOLS = manage_database.POINTER_SYMBOLS
+POINTER_CODES = manage_database.POINTER_CODES
+SEQUENCE_MASKS = manage_database.SEQUENCE_MASKS
+WORD_PIVOT_CODE = POINTER_CODES['?p']
+# Pointer types the connect search never follows (see manage_database.SEARCH_VIEWS).
+CONNECT_TYPES_TO_IGNORE = manage_database.SEARCH_VIEWS['connect'][1]
+# Word pivots are followed through word nodes, unless the connect search view ignores them.
+FOLLOW_WORD_PIVOTS = '?p' not in CONNECT_TYPES_TO_IGNORE
+
+# Paths are ranked by cost, lowest first. Each synset on a path costs its sense rank, capped at MAX_SENSE_RANK_COST,
+# so paths through common senses come first. Each pointer costs its type's POINTER_RANK_COSTS entry, or 0 if unlisted.
+MAX_SENSE_RANK_COST = 4
+POINTER_RANK_COSTS = {
+    '^': 1, '?p': 1, '+': 1,
+    ';c': 2, '-c': 2, ';r': 2, '-r': 2, ';u': 2, '-u': 2,
+}
 
 
 def remove_non_wordnet_chars(string):
@@ -52,90 +72,68 @@ def clean_string(string):
     return cleaned_string
 
 
+def complete_word(wordnet_index, string, limit):
+    """Returns up to limit words of wordnet_index that start with string once it is cleaned like a query word
+(see clean_string()), with spaces for underscores, as they would be typed. A space typed after the last word is kept,
+so that only collocations of it are completed. An empty prefix completes to nothing."""
+
+    prefix = clean_string(string)
+    if prefix == '':
+        return []
+    if string[-1].isspace():
+        prefix += '_'
+    return [word.replace('_', ' ') for word in wordnet_index.complete(prefix, limit)]
+
+
 def random_main_group_word(wordnet_data):
     while True:
         rand_synset_id = random.randint(0, len(wordnet_data))
-        if wordnet_data[rand_synset_id][0] == -1:
-            word = random.choice(wordnet_data[rand_synset_id][3])
-            formatted_word = word.replace('_', ' ').split('(')[0]
-            return formatted_word
+        if wordnet_data.group(rand_synset_id) == -1:
+            return random.choice(wordnet_data.display_words(rand_synset_id))
 
 
-def get_tree(wordnet_data, wordnet_index, group_map, start_word, target_word):
+def get_tree(wordnet_data, wordnet_index, start_word, target_word, balanced=False, budget=None, engine=None):
     """Returns a "tree", or a list of recursively nested lists encoding various paths from start to end synsets.
 
 Start_word and target_word should be lower case, and spaces should be replaced with underscores.
 
-Returns dictionary with keys "status" and "data". Status can be "ok" or "error".
-If status is ok, data is path_memory tree. If status is error, data is a string describing the error.
+Returns dictionary with keys "status" and "data". Status can be "ok", "error" or "too_large".
+If status is ok, data is path_memory tree. Otherwise, data is a string describing the error.
+Status is too_large if budget is a search_budget.SearchBudget and the search exceeded it.
+If status is ok or too_large, the dictionary also has the key "synsets_visited".
 
-TREE DATA STRUCTURE: tree[direction][generation][sibling_group_index][sibling_index]
+TREE DATA STRUCTURE: tree[direction][generation][node_index] is a tuple (pointer, parent_index).
     DIRECTION: 0 for direction branching from start, 1 for direction branching from end.
     GENERATION: 0 is the first/oldest generation where branching begins at start and end synsets.
     -1 is last/newest generation where connecting synsets are found in common for both directions.
-    SIBLING GROUP INDEX: Index of sibling group, containing pointers from the same parent synset in previous generation.
-    SIBLING_INDEX: Index of pointer within sibling group."""
-
-    def prune_tree(directions_to_prune, synset_connectors):
-        """Removes pointers not part of synset_connectors paths, empty pointer child groups,
-and parent pointers with no children from path_memory.
-Directions_to_prune is list (valid directions are integers 0 and 1).
-Synset_connectors is list of synset_ids to keep in last generation.
-Pass in empty list to synset_connectors if no connection found yet."""
-
-        # If connection found this iteration, delete any non-connecting pointers from last generation.
-        if len(synset_connectors) > 0:
-            for both_directions in range(2):
-                for sibling_group_index in range(len(path_memory[both_directions][-1])):
-                    sibling_indices_to_delete = []
-                    for sibling_index in range(len(path_memory[both_directions][-1][sibling_group_index])):
-                        if path_memory[both_directions][-1][sibling_group_index][sibling_index][1] \
-                                not in synset_connectors:
-                            # Add non-connecting synsets to delete queue.
-                            sibling_indices_to_delete.insert(0, sibling_index)
-                    for sibling_index in sibling_indices_to_delete:
-                        # Delete synsets in queue.
-                        del path_memory[both_directions][-1][sibling_group_index][sibling_index]
-
-        for direction_to_prune in directions_to_prune:
-
-            # Prune empty sibling groups and parents of empty sibling groups.
-            for generation in range(len(path_memory[direction_to_prune]) - 1):
-
-                # Initialize delete queues.
-                empty_sibling_groups = []  # List of sibling group indices to delete in current generation.
-                parents_without_children = []  # List of parent coordinates to delete in previous generation.
-                # Each coordinate is encoded as a list: [parent_group_index, parent_index_within_group]
-
-                # Add empty sibling groups and parents without children to delete queues.
-                for sibling_group_index in range(len(path_memory[direction_to_prune][-1 - generation])):
-                    if len(path_memory[direction_to_prune][-1 - generation][sibling_group_index]) == 0:
-                        # Run if sibling group is empty.
-                        empty_sibling_groups.insert(0, sibling_group_index)  # Add sibling group to delete queue.
-                        sibling_group_coords = [direction_to_prune, -1 - generation, sibling_group_index]
-                        parent_coords = get_parent_coords(sibling_group_coords, path_memory)[2:]
-                        parents_without_children.insert(0, parent_coords)
-
-                # Delete empty sibling groups and parents without children listed in delete queues.
-                for sibling_group_index in empty_sibling_groups:
-                    del path_memory[direction_to_prune][-1 - generation][sibling_group_index]
-                for parent_coords in parents_without_children:
-                    parent_group_index = parent_coords[0]
-                    parent_index_within_group = parent_coords[1]
-                    del path_memory[direction_to_prune][-2 - generation][parent_group_index][parent_index_within_group]
+    NODE INDEX: Index of node within its generation. Nodes are in the order the search found them.
+    POINTER: Pointer tuple of the form (pointer_symbol, synset_id, source_word_index, target_word_index).
+    PARENT INDEX: Node index of the parent node in the previous generation, or -1 in generation 0.
+
+Word pivots are followed through the word nodes of each synset, where manage_database.add_word_pivots() added them
+among its pointers, and only to synsets it had no pointer to before. They are '?p' pointers in the tree like any other
+(see manage_database.collect_word_nodes()).
+
+The two directions take turns adding a generation. If balanced is True, a direction whose last generation has more
+pointers pending than the other direction has visited synsets, such as the side of a hub word, doesn't add its next
+generation at its turn. Instead, the synsets the other direction visited are checked for a parent in that last
+generation (see find_first_parents()), which finds the same connecting synsets and first parents at a fraction
+of the cost. The generation is only added at the direction's next turn, if the search gets that far, so a balanced
+search returns the same tree while visiting fewer synsets. The NumPy engine has no balanced mode, so balanced searches
+run pointer at a time.
+
+If engine is a numpy_search.NumpySearchEngine, the breadth-first search runs in it, a generation at a time.
+Its results are identical."""
 
     # Check which start synsets connect with which end synsets, if any.
-    start_synset_ids = wordnet_index[start_word]
-    target_synset_ids = wordnet_index[target_word]
+    # Keyed by each synset of the word, with the position of the word in the synset.
+    start_word_nums = dict(wordnet_index.senses(start_word))
+    target_word_nums = dict(wordnet_index.senses(target_word))
     pruned_start_synset_ids = set()
     pruned_target_synset_ids = set()
-    for start_synset_id in start_synset_ids:
-        for target_synset_id in target_synset_ids:
-            target_group = wordnet_data[target_synset_id][0]
-            start_group = wordnet_data[start_synset_id][0]
-            adjacent_groups = group_map[start_group][0]
-            distant_groups = group_map[start_group][1]
-            if target_group == start_group or target_group in adjacent_groups or target_group in distant_groups:
+    for start_synset_id in start_word_nums:
+        for target_synset_id in target_word_nums:
+            if wordnet_data.reaches(start_synset_id, target_synset_id):
                 pruned_start_synset_ids.add(start_synset_id)
                 pruned_target_synset_ids.add(target_synset_id)
     if len(pruned_start_synset_ids) == 0 or len(pruned_target_synset_ids) == 0:
@@ -146,243 +144,536 @@ Pass in empty list to synset_connectors if no connection found yet."""
     search_directions = [0, 1]
 
     for synset_id in pruned_start_synset_ids:
-        lower_case_words = [word.lower().split('(')[0] for word in wordnet_data[synset_id][3]]
-        word_index = lower_case_words.index(start_word)
+        word_index = start_word_nums[synset_id]
         child_pointer = ('__start', synset_id, word_index, word_index)
         start_pointers_list.append(child_pointer)
 
     for synset_id in pruned_target_synset_ids:
-        lower_case_words = [word.lower().split('(')[0] for word in wordnet_data[synset_id][3]]
-        word_index = lower_case_words.index(target_word)
+        word_index = target_word_nums[synset_id]
         child_pointer = ('__end', synset_id, word_index, word_index)
         end_pointers_list.append(child_pointer)
 
-    path_memory = [[[start_pointers_list]], [[end_pointers_list]]]
+    path_memory = [[[(pointer, -1) for pointer in start_pointers_list]],
+                   [[(pointer, -1) for pointer in end_pointers_list]]]
     visited_synsets = [pruned_start_synset_ids, pruned_target_synset_ids]
-    found_connection = False
     connecting_synsets = set()
+    deadline = None
+    if budget is not None:
+        deadline = budget.start()
 
     for parent_synset_id in pruned_start_synset_ids:
         if parent_synset_id in pruned_target_synset_ids:
-            found_connection = True
             connecting_synsets.add(parent_synset_id)
-    if found_connection:
-        prune_tree([0, 1], connecting_synsets)
+    if len(connecting_synsets) > 0:
+        for direction in range(2):
+            prune_tree(path_memory, direction, connecting_synsets)
         return {
             'status': 'ok',
             'data': path_memory,
             'synsets_visited': len(visited_synsets[0]) + len(visited_synsets[1])
         }
 
-    while True:  # Each loop is one layer in a breadth-first search.
-
-        for direction in search_directions:
-
-            next_generation = []
-
-            for parent_group in path_memory[direction][-1]:  # Getting pointer groupings from previous generation.
-                for parent_pointer in parent_group:  # Find neighbor_synsets of synsets_currently_visiting.
-
-                    sibling_group = []
-
-                    parent_synset_id = parent_pointer[1]
-                    for child_pointer in wordnet_data[parent_synset_id][direction + 4]:
-
-                        child_pointer_symbol = child_pointer[0]
-                        if child_pointer_symbol in POINTER_TYPES_TO_IGNORE:
-                            continue  # Ignore specified pointer types.
-                        if IGNORE_ANTONYMS and child_pointer_symbol == '!':
-                            continue  # Ignore antonyms.
-                        if parent_pointer[0] in POINTER_SEQUENCES_TO_IGNORE:
-                            if POINTER_SEQUENCES_TO_IGNORE[parent_pointer[0]] == child_pointer_symbol:
-                                continue  # Ignore specified pointer type sequences.
+    if engine is not None and not balanced:
+        return engine.get_tree(start_pointers_list, end_pointers_list, budget, deadline)
 
-                        child_pointer_id = child_pointer[1]
+    expanded_word_nodes = [set(), set()]
+    # Whether each direction's next generation was checked for connecting synsets at its last turn, but not added.
+    skipped_generations = [False, False]
 
-                        if child_pointer_id in visited_synsets[direction * -1 + 1]:
-                            found_connection = True
-                            connecting_synsets.add(child_pointer_id)
-
-                        # Add pointer only if it refers to a synset not already marked to skip.
-                        if child_pointer_id not in visited_synsets[direction]:
-                            visited_synsets[direction].add(child_pointer_id)
-                            sibling_group.append(child_pointer)
-
-                    next_generation.append(sibling_group)
-
-            path_memory[direction].append(next_generation)
+    while True:  # Each loop is one layer in a breadth-first search.
 
-            prune_directions = [direction]
-            if found_connection:
-                prune_directions = [0, 1]
-            prune_tree(prune_directions, connecting_synsets)
+        for direction in search_directions:
 
-            if found_connection:
+            other_direction = direction * -1 + 1
+            if skipped_generations[direction]:
+                # Its synsets were already checked against every synset the other direction had visited then,
+                # and the other direction has since checked its new synsets against them.
+                next_generation, exceeded_limit = expand_generation(
+                    wordnet_data, path_memory, direction, visited_synsets, (), connecting_synsets,
+                    expanded_word_nodes[direction], budget, deadline)
+                if exceeded_limit is not None:
+                    return search_budget.too_large_result(
+                        exceeded_limit, len(visited_synsets[0]) + len(visited_synsets[1]))
+                path_memory[direction].append(next_generation)
+                skipped_generations[direction] = False
+
+            if balanced and not skipped_generations[other_direction] \
+                    and len(path_memory[direction][-1]) > len(visited_synsets[other_direction]):
+                unvisited_synsets = [synset_id for synset_id in visited_synsets[other_direction]
+                                     if synset_id not in visited_synsets[direction]]
+                first_parents = find_first_parents(wordnet_data, path_memory[direction][-1], direction,
+                                                   unvisited_synsets)
+                if len(first_parents) > 0:
+                    path_memory[direction].append(first_parents)
+                    for node in first_parents:
+                        visited_synsets[direction].add(node[0][1])
+                        connecting_synsets.add(node[0][1])
+                elif not has_unvisited_child(wordnet_data, path_memory[direction][-1], direction,
+                                             visited_synsets[direction]):
+                    return {'status': 'error', 'data': 'No connection found.'}
+                else:
+                    skipped_generations[direction] = True
+                    continue
+
+            else:
+                next_generation, exceeded_limit = expand_generation(
+                    wordnet_data, path_memory, direction, visited_synsets, visited_synsets[other_direction],
+                    connecting_synsets, expanded_word_nodes[direction], budget, deadline)
+                if exceeded_limit is not None:
+                    return search_budget.too_large_result(
+                        exceeded_limit, len(visited_synsets[0]) + len(visited_synsets[1]))
+                path_memory[direction].append(next_generation)
+
+                if skipped_generations[other_direction]:
+                    # The other direction's next generation wasn't added, so new synsets are checked against it.
+                    new_synset_ids = [node[0][1] for node in next_generation
+                                      if node[0][1] not in visited_synsets[other_direction]]
+                    first_parents = find_first_parents(wordnet_data, path_memory[other_direction][-1],
+                                                       other_direction, new_synset_ids)
+                    if len(first_parents) > 0 or len(connecting_synsets) > 0:
+                        # The other direction's last generation, as it would be once pruned.
+                        path_memory[other_direction].append(first_parents)
+                        for node in first_parents:
+                            visited_synsets[other_direction].add(node[0][1])
+                            connecting_synsets.add(node[0][1])
+
+                if len(connecting_synsets) == 0 and len(next_generation) == 0:
+                    return {'status': 'error', 'data': 'No connection found.'}
+
+            if len(connecting_synsets) > 0:
+                for both_directions in range(2):
+                    prune_tree(path_memory, both_directions, connecting_synsets)
                 return {
                     'status': 'ok',
                     'data': path_memory,
                     'synsets_visited': len(visited_synsets[0]) + len(visited_synsets[1])
                 }
 
-            empty_generation = True
-            for sibling_group in next_generation:
-                if len(sibling_group) > 0:
-                    empty_generation = False
+
+def expand_generation(wordnet_data, path_memory, direction, visited_synsets, other_visited_synsets, connecting_synsets,
+                      expanded_word_nodes, budget=None, deadline=None):
+    """Returns (next_generation, exceeded_limit) for the last generation of path_memory[direction], the way get_tree()
+grows each generation: the children of each node, in order, that direction hasn't visited, with the node's index.
+Adds them to visited_synsets[direction], and every child in other_visited_synsets to connecting_synsets.
+Exceeded_limit is None, unless budget is a search_budget.SearchBudget the search exceeded, in which case
+next_generation is incomplete. Expanded_word_nodes is the set of word nodes direction no longer follows."""
+
+    pivot_offsets, pivot_word_nodes, pivot_word_nums, word_node_offsets, word_node_synsets, word_node_word_nums = \
+        wordnet_data.word_pivot_columns()
+    offsets, targets, types, source_words, target_words, pivot_starts = wordnet_data.search_view('connect', direction)
+    skip_offsets, skips = wordnet_data.pivot_skip_columns(direction)
+
+    next_generation = []
+    last_generation = path_memory[direction][-1]
+    for parent_index in range(len(last_generation)):  # Find neighbor_synsets of synsets_currently_visiting.
+
+        if budget is not None:
+            synsets_visited = len(visited_synsets[0]) + len(visited_synsets[1])
+            generations = len(path_memory[0]) + len(path_memory[1]) - 1
+            exceeded_limit = budget.check(synsets_visited, generations, deadline)
+            if exceeded_limit is not None:
+                return next_generation, exceeded_limit
+
+        # The search view has no pointers of ignored types. Pointer types ignored after the parent's type
+        # are the set bits of its sequence mask.
+        parent_pointer = last_generation[parent_index][0]
+        sequence_mask = SEQUENCE_MASKS[POINTER_CODES[parent_pointer[0]]]
+        parent_synset_id = parent_pointer[1]
+
+        # The pointers from before the parent's word pivots, its word pivots, then the pointers after them.
+        pivot_start = pivot_starts[parent_synset_id]
+        pointer_ranges = ((offsets[parent_synset_id], pivot_start),
+                          (pivot_start, offsets[parent_synset_id + 1]))
+        for range_num, (range_start, range_end) in enumerate(pointer_ranges):
+            for pointer_index in range(range_start, range_end):
+
+                child_pointer_code = types[pointer_index]
+                if sequence_mask >> child_pointer_code & 1:
+                    continue  # Ignore specified pointer type sequences.
+
+                child_pointer_id = targets[pointer_index]
+
+                if child_pointer_id in other_visited_synsets:
+                    connecting_synsets.add(child_pointer_id)
+
+                # Add pointer only if it refers to a synset not already marked to skip.
+                if child_pointer_id not in visited_synsets[direction]:
+                    visited_synsets[direction].add(child_pointer_id)
+                    child_pointer = (POINTER_SYMBOLS[child_pointer_code], child_pointer_id,
+                                     source_words[pointer_index], target_words[pointer_index])
+                    next_generation.append((child_pointer, parent_index))
+
+            if range_num == 1 or not FOLLOW_WORD_PIVOTS or sequence_mask >> WORD_PIVOT_CODE & 1:
+                continue
+
+            # Word pivots, through each word node of the parent to the word's other synsets, except the ones
+            # the pivot skips, which the parent already had a pointer to. A synset sharing two words with
+            # the parent is visited through the first word node, as add_word_pivots() added no second pivot
+            # to it. Once all the synsets of a word node are visited in this direction, following it again
+            # finds nothing new, so it is skipped after that.
+            for pivot_index in range(pivot_offsets[parent_synset_id], pivot_offsets[parent_synset_id + 1]):
+
+                word_node = pivot_word_nodes[pivot_index]
+                if word_node in expanded_word_nodes:
+                    continue
+                skipped_senses = skips[skip_offsets[pivot_index]:skip_offsets[pivot_index + 1]]
+                parent_word_num = pivot_word_nums[pivot_index]
+                left_unvisited = False
+
+                for sense_index in range(word_node_offsets[word_node], word_node_offsets[word_node + 1]):
+
+                    child_pointer_id = word_node_synsets[sense_index]
+                    if child_pointer_id == parent_synset_id:
+                        continue
+                    if sense_index in skipped_senses:
+                        if child_pointer_id not in visited_synsets[direction]:
+                            left_unvisited = True
+                        continue
+
+                    if child_pointer_id in other_visited_synsets:
+                        connecting_synsets.add(child_pointer_id)
+
+                    if child_pointer_id not in visited_synsets[direction]:
+                        visited_synsets[direction].add(child_pointer_id)
+                        if direction == 0:
+                            child_pointer = ('?p', child_pointer_id, parent_word_num,
+                                             word_node_word_nums[sense_index])
+                        else:
+                            child_pointer = ('?p', child_pointer_id, word_node_word_nums[sense_index],
+                                             parent_word_num)
+                        next_generation.append((child_pointer, parent_index))
+
+                if not left_unvisited:
+                    expanded_word_nodes.add(word_node)
+
+    return next_generation, None
+
+
+def iter_child_pointers(wordnet_data, direction, parent_pointer):
+    """Yields the pointers expand_generation() follows from the synset of parent_pointer, in the order it follows them,
+whether or not their synsets were visited."""
+
+    pivot_offsets, pivot_word_nodes, pivot_word_nums, word_node_offsets, word_node_synsets, word_node_word_nums = \
+        wordnet_data.word_pivot_columns()
+    offsets, targets, types, source_words, target_words, pivot_starts = wordnet_data.search_view('connect', direction)
+    skip_offsets, skips = wordnet_data.pivot_skip_columns(direction)
+
+    sequence_mask = SEQUENCE_MASKS[POINTER_CODES[parent_pointer[0]]]
+    parent_synset_id = parent_pointer[1]
+    pivot_start = pivot_starts[parent_synset_id]
+
+    for pointer_index in range(offsets[parent_synset_id], pivot_start):
+        if not sequence_mask >> types[pointer_index] & 1:
+            yield (POINTER_SYMBOLS[types[pointer_index]], targets[pointer_index],
+                   source_words[pointer_index], target_words[pointer_index])
+
+    if FOLLOW_WORD_PIVOTS and not sequence_mask >> WORD_PIVOT_CODE & 1:
+        for pivot_index in range(pivot_offsets[parent_synset_id], pivot_offsets[parent_synset_id + 1]):
+            word_node = pivot_word_nodes[pivot_index]
+            skipped_senses = skips[skip_offsets[pivot_index]:skip_offsets[pivot_index + 1]]
+            parent_word_num = pivot_word_nums[pivot_index]
+            for sense_index in range(word_node_offsets[word_node], word_node_offsets[word_node + 1]):
+                child_pointer_id = word_node_synsets[sense_index]
+                if child_pointer_id == parent_synset_id or sense_index in skipped_senses:
+                    continue
+                if direction == 0:
+                    yield '?p', child_pointer_id, parent_word_num, word_node_word_nums[sense_index]
+                else:
+                    yield '?p', child_pointer_id, word_node_word_nums[sense_index], parent_word_num
+
+    for pointer_index in range(pivot_start, offsets[parent_synset_id + 1]):
+        if not sequence_mask >> types[pointer_index] & 1:
+            yield (POINTER_SYMBOLS[types[pointer_index]], targets[pointer_index],
+                   source_words[pointer_index], target_words[pointer_index])
+
+
+def find_first_parents(wordnet_data, last_generation, direction, synset_ids):
+    """Returns the generation expand_generation() would find after last_generation, in direction, keeping only
+the synsets of synset_ids, which direction hasn't visited. Each synset's node has the first parent that points to it,
+through the first of the parent's pointers to it, so it is the node expand_generation() would add.
+Only the synsets with a pointer to each of synset_ids are checked, found through the pointers of the opposite
+direction, which mirror them, and through the synset's word nodes."""
+
+    pivot_offsets, pivot_word_nodes, _, word_node_offsets, word_node_synsets, _ = wordnet_data.word_pivot_columns()
+    offsets, targets = wordnet_data.search_view('connect', direction * -1 + 1)[:2]
+    parent_indices = {node[0][1]: parent_index for parent_index, node in enumerate(last_generation)}
+
+    first_parents = []
+    for synset_id in synset_ids:
+        parent_synset_ids = set(targets[offsets[synset_id]:offsets[synset_id + 1]])
+        if FOLLOW_WORD_PIVOTS:
+            for pivot_index in range(pivot_offsets[synset_id], pivot_offsets[synset_id + 1]):
+                word_node = pivot_word_nodes[pivot_index]
+                parent_synset_ids.update(word_node_synsets[word_node_offsets[word_node]:
+                                                           word_node_offsets[word_node + 1]])
+
+        first_parent = None
+        for parent_synset_id in parent_synset_ids:
+            parent_index = parent_indices.get(parent_synset_id)
+            if parent_index is None or (first_parent is not None and first_parent[0][0] < parent_index):
+                continue
+            child_pointers = iter_child_pointers(wordnet_data, direction, last_generation[parent_index][0])
+            for pointer_num, child_pointer in enumerate(child_pointers):
+                if child_pointer[1] == synset_id:
+                    if first_parent is None or (parent_index, pointer_num) < first_parent[0]:
+                        first_parent = ((parent_index, pointer_num), (child_pointer, parent_index))
                     break
-            if empty_generation:
-                return {'status': 'error', 'data': 'No connection found.'}
+        if first_parent is not None:
+            first_parents.append(first_parent)
 
+    first_parents.sort()
+    return [node for _, node in first_parents]
 
-def get_parent_coords(sibling_group_coords, tree):
-    """Sibling_group_coords is a list of the form [direction, generation, sibling_group_index].
-Returns parent_coords as a list of the form [direction, generation, parent_group_index, parent_index_within_group].
-Generation values are negative integers which index starting from last generation at -1.
-TREE DATA STRUCTURE: tree[direction][generation][sibling_group_index][sibling_index]
-(see get_tree() docstring for more info on tree data structure.)"""
 
-    direction = sibling_group_coords[0]
-    generation_index = sibling_group_coords[1]
-    sibling_group_index = sibling_group_coords[2]
+def has_unvisited_child(wordnet_data, last_generation, direction, visited_synsets):
+    """Returns whether expand_generation() would find any synset after last_generation in direction that isn't in
+visited_synsets."""
 
-    parent_count_in_prev_groups = 0
-    for parent_group_index in range(len(tree[direction][generation_index - 1])):
-        parent_count_in_this_group = len(tree[direction][generation_index - 1][parent_group_index])
-        if parent_count_in_this_group + parent_count_in_prev_groups < sibling_group_index + 1:
-            parent_count_in_prev_groups += parent_count_in_this_group
-        else:
-            parent_index_within_group = sibling_group_index - parent_count_in_prev_groups
-            parent_coords = [direction, generation_index - 1, parent_group_index, parent_index_within_group]
-            return parent_coords
+    for node in last_generation:
+        for child_pointer in iter_child_pointers(wordnet_data, direction, node[0]):
+            if child_pointer[1] not in visited_synsets:
+                return True
+    return False
 
 
-def get_genealogy_line(sibling_group_coords, tree):
-    """Sibling_group_coords is a list of the form [direction, generation, sibling_group_index].
-Returns genealogy_line as an ordered list of coordinates within tree for each generation.
-Coordinates in genealogy_line are of the form [direction, generation, sibling_group_index, sibling_index_within_group].
-Generation values are negative integers which index starting from last generation at -1.
-TREE DATA STRUCTURE: tree[direction][generation][sibling_group_index][sibling_index]
+def prune_tree(tree, direction, synset_connectors=None):
+    """Removes nodes from tree[direction] with no descendants in its last generation, keeping node order.
+If synset_connectors is a set of synset_ids, first removes nodes in the last generation not pointing to one of them.
+Each generation is visited once, so pruning takes time linear in the size of the tree.
+TREE DATA STRUCTURE: tree[direction][generation][node_index] is a tuple (pointer, parent_index)
 (see get_tree() docstring for more info on tree data structure.)"""
 
-    direction = sibling_group_coords[0]
-    sibling_generation_index = sibling_group_coords[1]
-    num_prev_generations = len(tree[direction]) + sibling_generation_index
-    genealogy_line = [sibling_group_coords]
-
-    for generation_index in range(num_prev_generations, 0, -1):
-        parent_of_child = get_parent_coords(sibling_group_coords, tree)
-        genealogy_line.insert(0, parent_of_child)
-        sibling_group_coords = parent_of_child[:-1]
+    generations = tree[direction]
+    if synset_connectors is not None:
+        generations[-1] = [node for node in generations[-1] if node[0][1] in synset_connectors]
+
+    for generation_num in range(len(generations) - 1, 0, -1):
+        has_children = [False] * len(generations[generation_num - 1])
+        for node in generations[generation_num]:
+            has_children[node[1]] = True
+
+        # Keep parents with children, and renumber children to the kept parents' new node indices.
+        new_parent_indices = []
+        kept_parents = []
+        for parent_index in range(len(has_children)):
+            new_parent_indices.append(len(kept_parents))
+            if has_children[parent_index]:
+                kept_parents.append(generations[generation_num - 1][parent_index])
+        generations[generation_num] = [(node[0], new_parent_indices[node[1]]) for node in generations[generation_num]]
+        generations[generation_num - 1] = kept_parents
+
+
+def get_genealogy_line(tree, direction, node_index):
+    """Returns genealogy_line as an ordered list of the pointers from generation 0 to the node at node_index
+in the last generation of tree[direction], following parent indices back through each generation.
+TREE DATA STRUCTURE: tree[direction][generation][node_index] is a tuple (pointer, parent_index)
+(see get_tree() docstring for more info on tree data structure.)"""
 
+    genealogy_line = []
+    for generation in reversed(tree[direction]):
+        pointer, node_index = generation[node_index]
+        genealogy_line.append(pointer)
+    genealogy_line.reverse()
     return genealogy_line
 
 
-def get_paths_from_tree(wordnet_data, tree):
+def get_path_node(wordnet_data, synset_id, target_word_index, source_word_index, next_pointer_symbol):
+    """Returns a path node dictionary for synset_id with these data_keys:
+'pointer_phrase', 'pos', 'gloss', 'key_words', 'two_kw', 'other_words'.
+Target_word_index is the word the pointer into the synset points to, source_word_index is the word the pointer out of
+the synset points from, and next_pointer_symbol is the type of the pointer out of the synset.
+Either word index is -1 if its pointer isn't from or to a specific word."""
+
+    all_words = wordnet_data.display_words(synset_id)
+
+    key_words = []
+    if target_word_index != -1:
+        key_words.append(all_words[target_word_index])
+    if source_word_index != -1:
+        source_word = all_words[source_word_index]
+        if source_word not in key_words:
+            key_words.append(source_word)
+    if len(key_words) == 0:
+        key_words.append(all_words[0])
+
+    return {
+        'pointer_phrase': POINTER_SYMBOL_KEY[next_pointer_symbol]['phrase'],
+        'pos': wordnet_data.pos(synset_id),
+        'gloss': wordnet_data.gloss(synset_id),
+        'key_words': key_words,
+        'two_kw': len(key_words) == 2,
+        'other_words': ', '.join([word for word in all_words if word not in key_words]),
+    }
+
+
+def get_path_chains(tree):
+    """Returns path_chains as a dictionary where each key is the connecting synset_id of its path.
+Each key-value is a path chain: the ordered list of pointers leading to each synset on the path, from start to end.
+Pointers are tuples of the form (pointer_symbol, synset_id, source_word_index, target_word_index), where synset_id is
+the synset pointed to, and the word indices are of the word pointed from in the previous synset and the word pointed to.
+The chain starts with the '__start' pointer to the start synset and ends with an '__end' pointer to synset_id -1,
+whose source_word_index is the target word's index in the last synset.
+PATH CHAIN DATA STRUCTURE: path_chains[connecting_synset_id][chain_index][pointer_element]"""
+
+    path_chains = {}
+    for node_index in range(len(tree[0][-1])):
+        genealogy_line = get_genealogy_line(tree, 0, node_index)
+        path_chains[genealogy_line[-1][1]] = genealogy_line
+
+    # Direction 1 pointers point back along the path, so each one becomes a pointer to the synset before it.
+    for node_index in range(len(tree[1][-1])):
+        genealogy_line = get_genealogy_line(tree, 1, node_index)
+        path_chain = path_chains[genealogy_line[-1][1]]
+        for line_index in range(len(genealogy_line) - 1, 0, -1):
+            pointer = genealogy_line[line_index]
+            path_chain.append((pointer[0], genealogy_line[line_index - 1][1], pointer[2], pointer[3]))
+        end_pointer = genealogy_line[0]
+        path_chain.append((end_pointer[0], -1, end_pointer[2], -1))
+
+    return path_chains
+
+
+def reverse_path_chains(path_chains):
+    """Returns path_chains for the same paths walked from end to start, with each pointer replaced by its reflex
+(see manage_database.POINTER_REFLEXES).
+Returns None if any path chain is missing its start or end pointer, or has a pointer the reversed search couldn't
+follow: one with no reflex type, such as also see ('^'), one whose reflex type the connect search view ignores,
+or one that POINTER_SEQUENCES_TO_IGNORE ignores after the pointer before it in either order."""
+
+    reversed_path_chains = {}
+    for connecting_synset_id in path_chains:
+        path_chain = path_chains[connecting_synset_id]
+        if path_chain[0][0] != '__start' or path_chain[-1][0] != '__end':
+            return None
+
+        end_pointer = path_chain[-1]
+        reversed_path_chain = [('__start', path_chain[-2][1], end_pointer[2], end_pointer[2])]
+        for chain_index in range(len(path_chain) - 2, 0, -1):
+            pointer = path_chain[chain_index]
+            reflex_symbol = POINTER_REFLEXES.get(pointer[0])
+            if reflex_symbol is None or reflex_symbol in CONNECT_TYPES_TO_IGNORE:
+                return None
+            reflex_code = POINTER_CODES[reflex_symbol]
+            parent_code = POINTER_CODES[reversed_path_chain[-1][0]]
+            if (SEQUENCE_MASKS[parent_code] >> reflex_code | SEQUENCE_MASKS[reflex_code] >> parent_code) & 1:
+                return None
+            reversed_path_chain.append((reflex_symbol, path_chain[chain_index - 1][1], pointer[3], pointer[2]))
+        reversed_path_chain.append(('__end', -1, path_chain[0][2], -1))
+
+        reversed_path_chains[connecting_synset_id] = reversed_path_chain
+
+    return reversed_path_chains
+
+
+def get_path_rank_cost(wordnet_data, path_chain):
+    """Returns the ranking cost of the path of path_chain. See MAX_SENSE_RANK_COST and POINTER_RANK_COSTS."""
+    cost = 0
+    for chain_index in range(len(path_chain) - 1):
+        pointer = path_chain[chain_index]
+        cost += min(wordnet_data.sense_rank(pointer[1]), MAX_SENSE_RANK_COST)
+        cost += POINTER_RANK_COSTS.get(pointer[0], 0)
+    return cost
+
+
+def iter_ranked_connectors(wordnet_data, path_chains):
+    """Yields the connecting synset ids of path_chains from the lowest path ranking cost to the highest,
+with ties in path_chains order. Paths are ordered as they are taken, so taking the first k of n costs O(n + k log n)."""
+
+    ranked_connectors = []
+    for chain_position, connecting_synset_id in enumerate(path_chains):
+        cost = get_path_rank_cost(wordnet_data, path_chains[connecting_synset_id])
+        ranked_connectors.append((cost, chain_position, connecting_synset_id))
+    heapq.heapify(ranked_connectors)
+    while len(ranked_connectors) > 0:
+        yield heapq.heappop(ranked_connectors)[2]
+
+
+def get_paths_from_chains(wordnet_data, path_chains):
     """Returns paths_by_connector as a dictionary where each key is the connecting synset_id of its path.
 Each key-value is a path represented as an ordered list containing the path nodes.
 Each path node is a dictionary with these data_keys:
 'color_a', 'color_b', 'two_kw', 'key_words', 'other_words', 'pos', 'gloss', 'pointer_phrase'.
-PATHS DATA STRUCTURE: paths_by_connector[connecting_synset_id][path_node_index][data_key]"""
+PATHS DATA STRUCTURE: paths_by_connector[connecting_synset_id][path_node_index][data_key]
+(see get_path_chains() docstring for path_chains data structure.)"""
+    return dict(iter_paths_from_chains(wordnet_data, path_chains))
 
-    paths_by_connector = {}
 
-    for direction in range(2):
-        latest_generation = tree[direction][-1]
-        for sibling_group_index in range(len(latest_generation)):
-            genealogy_line = get_genealogy_line([direction, -1, sibling_group_index], tree)
-            sibling_group = latest_generation[sibling_group_index]
-
-            for sibling_index in range(len(sibling_group)):
-
-                connecting_synset_id = sibling_group[sibling_index][1]
-
-                if direction == 0:
-                    paths_by_connector[connecting_synset_id] = []
-
-                insert_index = len(paths_by_connector[connecting_synset_id])
-                this_path = paths_by_connector[connecting_synset_id]
-                gene_line_plus_sibling_index = deepcopy(genealogy_line)
-                gene_line_plus_sibling_index[-1].append(sibling_index)
-
-                # Populate this_path.
-                for node_coords in gene_line_plus_sibling_index:
-                    # Node_coords are of the form [direction, generation, sibling_group_index, sibling_index].
-                    this_pointer = tree[node_coords[0]][node_coords[1]][node_coords[2]][node_coords[3]]
-
-                    pointer_node = {
-                        'pointer_source': this_pointer[2],
-                        'pointer_target': this_pointer[3],
-                        'pointer_phrase': POINTER_SYMBOL_KEY[this_pointer[0]]['phrase'],
-                    }
-                    synset_node = {'synset_id': this_pointer[1]}
-                    if direction == 0:
-                        this_path.append(pointer_node)
-                        this_path.append(synset_node)
-                    else:
-                        this_path.insert(insert_index, pointer_node)
-                        this_path.insert(insert_index, synset_node)
-
-                # Remove connecting synset (last) in direction 0. Redundant; will be added in direction 1.
-                if direction == 0:
-                    this_path.pop(-1)
-
-    for connecting_synset_id in paths_by_connector:
-        path = paths_by_connector[connecting_synset_id]
-        for node_index in range(len(path) - 2, 0, -2):
-
-            this_node = path[node_index]
-            prev_node = path[node_index - 1]
-            next_node = path[node_index + 1]
-            synset_id = this_node['synset_id']
-            this_node['pointer_phrase'] = next_node['pointer_phrase']
-            wordnet_data_this_synset = wordnet_data[synset_id]
-            this_node['pos'] = wordnet_data_this_synset[1]
-            this_node['gloss'] = wordnet_data_this_synset[2]
-
-            all_words_underscored = wordnet_data_this_synset[3]
-            all_words = []
-            for word in all_words_underscored:
-                formatted_word = word.replace('_', ' ').split('(')[0]
-                all_words.append(formatted_word)
-
-            key_words = []
-            target_word_index = prev_node['pointer_target']
-            if target_word_index != -1:
-                target_word = all_words[target_word_index]
-                key_words.append(target_word)
-            source_word_index = next_node['pointer_source']
-            if source_word_index != -1:
-                source_word = all_words[source_word_index]
-                if source_word not in key_words:
-                    key_words.append(source_word)
-            if len(key_words) == 0:
-                key_words.append(all_words[0])
-            this_node['key_words'] = key_words
-            this_node['two_kw'] = len(key_words) == 2
-
-            this_node['other_words'] = ''
-            for word in all_words:
-                if word not in key_words:
-                    this_node['other_words'] += word
-                    this_node['other_words'] += ', '
-            this_node['other_words'] = this_node['other_words'][:-2]
-
-            del this_node['synset_id']
-
-        for node_index in range(len(path) - 1, -1, -2):
-            del path[node_index]
+def iter_paths_from_chains(wordnet_data, path_chains):
+    """Yields (connecting_synset_id, path) for each path in path_chains, in order, building each path only when
+it is reached. See get_paths_from_chains() for the path data structure."""
 
+    for connecting_synset_id in path_chains:
+        path_chain = path_chains[connecting_synset_id]
+        path = []
         this_node_hue = START_HUE
-        for node in path:
+        for node_index in range(len(path_chain) - 1):
+            pointer_in = path_chain[node_index]
+            pointer_out = path_chain[node_index + 1]
+            node = get_path_node(wordnet_data, pointer_in[1], pointer_in[3], pointer_out[2], pointer_out[0])
             node['color_a'] = f'hsl({this_node_hue}, 100%, 75%)'  # main background
             node['color_b'] = f'hsl({this_node_hue}, 100%, 78%)'  # ligher background for pointer between synsets
             node['color_c'] = f'hsl({this_node_hue}, 100%, 28%)'  # non-black text: part of speech,
             # pointer phrase, arrows
             this_node_hue = (this_node_hue + HUE_STEP) % 360
+            path.append(node)
+        yield connecting_synset_id, path
+
 
-    return paths_by_connector
+def get_paths_from_tree(wordnet_data, tree):
+    """Returns paths_by_connector for the paths in tree. See get_paths_from_chains()."""
+    return get_paths_from_chains(wordnet_data, get_path_chains(tree))
+
+
+def reverse_search_result(search_result):
+    """Returns the search result web_app_inquiry() caches for the reversed query, or None if it can't be reversed."""
+    if search_result['status'] != 'ok':
+        return None  # Some pointers only point one way, so a failed search may succeed reversed.
+    reversed_path_chains = reverse_path_chains(search_result['path_chains'])
+    if reversed_path_chains is None:
+        return None
+    reversed_search_result = {
+        'status': 'ok',
+        'path_chains': reversed_path_chains,
+        'synsets_visited': search_result['synsets_visited'],
+    }
+    return reversed_search_result
+
+
+def format_count(count):
+    if count >= 1000:
+        return f'{int(count / 1000)}K'
+    return count
+
+
+def get_search_result(wordnet_data, wordnet_index, start_word, target_word, balanced=False, budget=None, engine=None):
+    """Runs get_tree() and returns the part of its result web_app_inquiry() needs and caches: a dictionary with the key
+"status", the key "synsets_visited" if the tree result has it, and the key "path_chains" if status is ok."""
 
+    tree_result = get_tree(wordnet_data, wordnet_index, start_word, target_word, balanced, budget, engine)
+    search_result = {'status': tree_result['status']}
+    if tree_result['status'] == 'ok':
+        search_result['path_chains'] = get_path_chains(tree_result['data'])
+    if 'synsets_visited' in tree_result:
+        search_result['synsets_visited'] = tree_result['synsets_visited']
+    return search_result
 
-def web_app_inquiry(wordnet_data, wordnet_index, group_map, start_word, target_word):
+
+def web_app_inquiry(wordnet_data, wordnet_index, start_word, target_word, balanced=False, cache=None, budget=None,
+                    lazy_paths=False, limit=0, cursor=0, search_pool=None, engine=None):
+    """If cache is a query_cache.QueryCache, reuses the search results cached in it for this query or the reverse
+query, and caches the search result for this query. Searches stopped by budget are not cached.
+If search_pool is a search_executor.SearchExecutor, the search runs in one of its processes. If it is too busy,
+the result is an error asking to try again, which is not cached either. Otherwise the search runs in engine
+(see get_tree()).
+If lazy_paths is True and status is ok, data is an iterator of (connecting_synset_id, path) from
+iter_paths_from_chains() instead of paths_by_connector, so the paths can be sent as they are built.
+
+Paths are in the order of iter_ranked_connectors(). If limit is more than 0, only the limit paths from position
+cursor on are built, and "next_cursor" in the result is the cursor of the next paths, or None if there are none.
+A cursor past the last path is an error.
+
+Results of queries that got as far as the search have the key "timings", a dictionary of the seconds spent on the
+stages "search" (unless the result was cached) and "paths" (unless lazy_paths is True)."""
 
     formatted_start_word = clean_string(start_word)
     formatted_target_word = clean_string(target_word)
@@ -401,28 +692,78 @@ def web_app_inquiry(wordnet_data, wordnet_index, group_map, start_word, target_w
         message = 'Your start and target words are too similar to yield anything interesting.'
         return {'status': 'error', 'message': message}
 
-    tree_result = get_tree(wordnet_data, wordnet_index, group_map, formatted_start_word, formatted_target_word)
-    if tree_result['status'] != 'ok':
+    cache_key = (formatted_start_word, formatted_target_word)
+    search_result = None
+    if cache is not None:
+        search_result = cache.get(cache_key, (formatted_target_word, formatted_start_word), reverse_search_result)
+
+    timings = {}
+    if search_result is None:
+        search_start_time = time.perf_counter()
+        if search_pool is None:
+            search_result = get_search_result(
+                wordnet_data, wordnet_index, formatted_start_word, formatted_target_word, balanced, budget, engine)
+        else:
+            search_result = search_pool.get_search_result(
+                formatted_start_word, formatted_target_word, balanced, budget)
+        if cache is not None and search_result['status'] not in ('too_large', 'busy'):
+            cache.put(cache_key, search_result)
+        timings['search'] = time.perf_counter() - search_start_time
+
+    if search_result['status'] == 'busy':
+        message = "I'm sorry, but I'm too busy to search right now. Please try again in a moment."
+        return {'status': 'error', 'message': message, 'timings': timings}
+
+    if search_result['status'] == 'too_large':
+        message = f"""I'm sorry, but the search from "{start_word}" to "{target_word}" grew too large to finish. """ \
+                  f"""Evaluated {format_count(search_result['synsets_visited'])} definitions."""
+        return {'status': 'error', 'message': message, 'timings': timings}
+
+    if search_result['status'] != 'ok':
         message = f"""I'm sorry, but I couldn't find a path from "{start_word}" to "{target_word}"."""
-        return {'status': 'error', 'message': message}
-
-    result_paths = get_paths_from_tree(wordnet_data, tree_result['data'])
+        return {'status': 'error', 'message': message, 'timings': timings}
+
+    path_chains = search_result['path_chains']
+    if cursor >= len(path_chains):
+        message = f"""I'm sorry, but the search from "{start_word}" to "{target_word}" found fewer than """ \
+                  f"""{cursor + 1} paths."""
+        return {'status': 'error', 'message': message, 'timings': timings}
+    page_end = None
+    if limit > 0:
+        page_end = cursor + limit
+    page_path_chains = {}
+    for connecting_synset_id in itertools.islice(iter_ranked_connectors(wordnet_data, path_chains), cursor, page_end):
+        page_path_chains[connecting_synset_id] = path_chains[connecting_synset_id]
+    next_cursor = None
+    if page_end is not None and page_end < len(path_chains):
+        next_cursor = page_end
+
+    if lazy_paths:
+        result_paths = iter_paths_from_chains(wordnet_data, page_path_chains)
+    else:
+        paths_start_time = time.perf_counter()
+        result_paths = get_paths_from_chains(wordnet_data, page_path_chains)
+        timings['paths'] = time.perf_counter() - paths_start_time
 
     path_length = 0
-    for path in result_paths:
-        path_length = len(result_paths[path])
+    for path in path_chains:
+        path_length = len(path_chains[path]) - 1  # Each path has a node per pointer, except the end pointer.
         break
 
     path_s = 'paths'
-    if len(result_paths) == 1:
+    if len(path_chains) == 1:
         path_s = 'path'
-    synsets_evaluated = tree_result["synsets_visited"]
-    if synsets_evaluated >= 1000:
-        synsets_evaluated = f'{int(synsets_evaluated / 1000)}K'
-    message = f'Found {len(result_paths)} {path_s} of length {path_length}. Evaluated {synsets_evaluated} definitions.'
+    synsets_evaluated = format_count(search_result["synsets_visited"])
+    message = f'Found {len(path_chains)} {path_s} of length {path_length}. Evaluated {synsets_evaluated} definitions.'
+    if 0 < len(page_path_chains) < len(path_chains):
+        message += f' Showing paths {cursor + 1} to {cursor + len(page_path_chains)}.'
     result = {
         'status': 'ok',
         'message': message,
         'data': result_paths,
+        'synsets_visited': search_result['synsets_visited'],
+        'path_count': len(path_chains),
+        'next_cursor': next_cursor,
+        'timings': timings,
     }
     return result
@@ -1,14 +1,24 @@
 import colorsys
 import random
+import time
 import manage_database
 import find_connection
-from copy import deepcopy
+import search_budget
 
 
 POINTER_SYMBOL_KEY = manage_database.POINTER_SYMBOL_KEY
 POINTER_TYPES_TO_IGNORE = manage_database.POINTER_TYPES_TO_IGNORE
 IGNORE_ANTONYMS = manage_database.IGNORE_ANTONYMS
 POINTER_SEQUENCES_TO_IGNORE = manage_database.POINTER_SEQUENCES_TO_IGNORE
+UNREACHABLE_DISTANCE = manage_database.UNREACHABLE_DISTANCE
+POINTER_SYMBOLS = manage_database.POINTER_SYMBOLS
+POINTER_CODES = manage_database.POINTER_CODES
+SEQUENCE_MASKS = manage_database.SEQUENCE_MASKS
+ANTONYM_CODE = POINTER_CODES['!']
+
+# Number of extra generations a guided search may try past the nearest antonym distance of the start synsets
+# before falling back to the unguided search. See get_tree_to_nearest_antonyms().
+GUIDED_SEARCH_EXTRA_GENERATIONS = 2
 
 
 def hsv_to_hsl(hsv):
@@ -19,102 +29,37 @@ def hsv_to_hsl(hsv):
     return h*360, s*100, l*100
 
 
-def get_tree_to_nearest_antonyms(wordnet_data, groups_without_opposites, start_word, start_synset_ids):
+def get_tree_to_nearest_antonyms(wordnet_data, start_word, start_synset_ids, budget=None, engine=None):
     """Returns a "tree", or a list of recursively nested lists encoding various paths from start to end synsets.
 
 Start_word should be lower case, and spaces should be replaced with underscores.
 
-Returns dictionary with keys "status" and "data". Status can be "ok" or "error".
-If status is ok, data is path_memory tree. If status is error, data is a string describing the error.
+Returns dictionary with keys "status" and "data". Status can be "ok", "error" or "too_large".
+If status is ok, data is path_memory tree. Otherwise, data is a string describing the error.
+Status is too_large if budget is a search_budget.SearchBudget and the search exceeded it.
+If status is ok, the dictionary also has the key "synsets_visited", counted for the search that found the antonyms.
+Each guided search counts against the same deadline, but the synset and generation limits apply to each separately.
 
-TREE DATA STRUCTURE: tree[direction][generation][sibling_group_index][sibling_index]
+TREE DATA STRUCTURE: tree[direction][generation][node_index] is a tuple (pointer, parent_index).
     DIRECTION: Always 0. Vestigial from find_connection, and needed to be compatible with other functions.
-    GENERATION: 0 is the first/oldest generation where branching begins at start and end synsets.
-    -1 is last/newest generation where connecting synsets are found in common for both directions.
-    SIBLING GROUP INDEX: Index of sibling group, containing pointers from the same parent synset in previous generation.
-    SIBLING_INDEX: Index of pointer within sibling group."""
-
-    def prune_tree(synset_connectors):
-        """Removes pointers not part of synset_connectors paths, empty pointer child groups,
-and parent pointers with no children from path_memory.
-Synset_connectors is list of synset_ids to keep in last generation.
-Pass in empty list to synset_connectors if no connection found yet."""
-
-        connection_after_prune = False
-
-        # If connection found this iteration, delete any non-connecting pointers from last generation.
-        if len(synset_connectors) > 0:
-            connection_after_prune = True
-
-            # Log all antonyms of synsets to see if any antonym pairs exist to delete both.
-            antonyms_of_antonyms = []
-            for sibling_group_index in range(len(path_memory[0][-1])):
-                for sibling_index in range(len(path_memory[0][-1][sibling_group_index])):
-                    pointer = path_memory[0][-1][sibling_group_index][sibling_index]
-                    if pointer[1] in synset_connectors and pointer[0] == '!':
-                        possible_antonym = wordnet_data[pointer[1]][4][0]
-                        if possible_antonym[0] == '!':
-                            # Add antonym of antonym to list.
-                            antonyms_of_antonyms.insert(0, possible_antonym[1])
-
-            sibling_indices_to_delete = []
-            num_synsets_this_generation = 0
-            for sibling_group_index in range(len(path_memory[0][-1])):
-                for sibling_index in range(len(path_memory[0][-1][sibling_group_index])):
-                    num_synsets_this_generation += 1
-                    pointer = path_memory[0][-1][sibling_group_index][sibling_index]
-                    if pointer[1] not in synset_connectors or pointer[0] != '!' or pointer[1] in antonyms_of_antonyms:
-                        # Add non-antonym pointers to delete queue.
-                        sibling_indices_to_delete.insert(0, [sibling_group_index, sibling_index])
-
-            if len(sibling_indices_to_delete) >= num_synsets_this_generation:
-                # Prevents deleting entire generation.
-                connection_after_prune = False
-                sibling_indices_to_delete = []
-                for sibling_group_index in range(len(path_memory[0][-1])):
-                    for sibling_index in range(len(path_memory[0][-1][sibling_group_index])):
-                        if path_memory[0][-1][sibling_group_index][sibling_index][0] == '!':
-                            # Add antonym pointers to delete queue.
-                            sibling_indices_to_delete.insert(0, [sibling_group_index, sibling_index])
-
-            # Delete pointers in queue. Either all antonym or all non-antonym pointers.
-            for sibling_index in sibling_indices_to_delete:
-                del path_memory[0][-1][sibling_index[0]][sibling_index[1]]
-
-        # Prune empty sibling groups and parents of empty sibling groups.
-        for generation in range(len(path_memory[0]) - 1):
-
-            # Initialize delete queues.
-            empty_sibling_groups = []  # List of sibling group indices to delete in current generation.
-            parents_without_children = []  # List of parent coordinates to delete in previous generation.
-            # Each coordinate is encoded as a list: [parent_group_index, parent_index_within_group]
-
-            # Add empty sibling groups and parents without children to delete queues.
-            for sibling_group_index in range(len(path_memory[0][-1 - generation])):
-                if len(path_memory[0][-1 - generation][sibling_group_index]) == 0:
-                    # Run if sibling group is empty.
-                    empty_sibling_groups.insert(0, sibling_group_index)  # Add sibling group to delete queue.
-                    sibling_group_coords = [0, -1 - generation, sibling_group_index]
-                    parent_coords = find_connection.get_parent_coords(sibling_group_coords, path_memory)[2:]
-                    parents_without_children.insert(0, parent_coords)
-
-            # Delete empty sibling groups and parents without children listed in delete queues.
-            for sibling_group_index in empty_sibling_groups:
-                del path_memory[0][-1 - generation][sibling_group_index]
-            for parent_coords in parents_without_children:
-                parent_group_index = parent_coords[0]
-                parent_index_within_group = parent_coords[1]
-                del path_memory[0][-2 - generation][parent_group_index][parent_index_within_group]
-
-        return connection_after_prune
+    GENERATION: 0 is the first/oldest generation where branching begins at start synsets.
+    -1 is last/newest generation where antonym pointers to the nearest antonyms are found.
+    NODE INDEX, POINTER, PARENT INDEX: See find_connection.get_tree() docstring.
+
+The search is guided by the antonym distances stored in the database
+(see manage_database.calculate_antonym_distances()). Each distance is the fewest generations a synset could possibly need to reach an antonym, so a search limited to
+depth_limit generations can skip every pointer to a synset farther than that from an antonym. The pointers it keeps are
+exactly the ones on paths the unguided search would return, and they are found in the same order. Starting with the
+nearest distance of the start synsets, the limit is raised one generation at a time, and if no antonym is found within
+GUIDED_SEARCH_EXTRA_GENERATIONS of it, the unguided search is run instead.
+
+If engine is a numpy_search.NumpySearchEngine, the searches run in it, as in find_connection.get_tree()."""
 
     start_pointers_list = []
     for synset_id in start_synset_ids:
-        group_num = wordnet_data[synset_id][0]
-        if group_num in groups_without_opposites:
+        if not wordnet_data.reaches_antonym(synset_id):
             continue
-        lower_case_words = [word.lower().split('(')[0] for word in wordnet_data[synset_id][3]]
-        word_index = lower_case_words.index(start_word)
+        word_index = wordnet_data.word_num(synset_id, start_word)
         child_pointer = ('__start', synset_id, word_index, word_index)
         start_pointers_list.append(child_pointer)
 
@@ -122,7 +67,68 @@ Pass in empty list to synset_connectors if no connection found yet."""
         message = 'No reachable antonyms exist.'
         return {'status': 'error', 'data': message}
 
-    path_memory = [[[start_pointers_list]]]
+    nearest_distance = min(wordnet_data.antonym_distance(pointer[1]) for pointer in start_pointers_list)
+    if nearest_distance == UNREACHABLE_DISTANCE:
+        message = 'Reached dead-end in path. No start synset has a distance to an antonym.'
+        return {'status': 'error', 'data': message}
+
+    deadline = None
+    if budget is not None:
+        deadline = budget.start()
+
+    for depth_limit in range(nearest_distance, nearest_distance + GUIDED_SEARCH_EXTRA_GENERATIONS + 1):
+        tree_result = search_tree_to_nearest_antonyms(
+            wordnet_data, start_synset_ids, start_pointers_list, depth_limit, budget, deadline, engine)
+        if tree_result is not None:
+            return tree_result
+    return search_tree_to_nearest_antonyms(
+        wordnet_data, start_synset_ids, start_pointers_list, None, budget, deadline, engine)
+
+
+def search_tree_to_nearest_antonyms(wordnet_data, start_synset_ids, start_pointers_list, depth_limit,
+                                    budget=None, deadline=None, engine=None):
+    """Runs the breadth-first search for get_tree_to_nearest_antonyms() and returns its result dictionary.
+If depth_limit is an integer, skips pointers to synsets too far from an antonym to be reached within depth_limit
+generations, and returns None if no antonym is reached within depth_limit generations.
+If depth_limit is None, the search is unguided and runs until it finds an antonym or a dead-end."""
+
+    if engine is not None:
+        return engine.search_tree_to_nearest_antonyms(start_synset_ids, start_pointers_list, depth_limit, budget,
+                                                      deadline)
+
+    def prune_last_generation(synset_connectors):
+        """Removes pointers not part of synset_connectors paths from the last generation of path_memory.
+Synset_connectors is set of synset_ids to keep in last generation.
+Returns True if any antonym pointers are left, or if none would be, removes the antonym pointers instead
+so the search can continue past them, and returns False."""
+
+        # Log all antonyms of synsets to see if any antonym pairs exist to delete both.
+        antonyms_of_antonyms = set()
+        for node in path_memory[0][-1]:
+            pointer = node[0]
+            if pointer[1] in synset_connectors and pointer[0] == '!':
+                possible_antonym = wordnet_data.pointers(pointer[1], 0, word_pivots=False)[0]
+                if possible_antonym[0] == '!':
+                    # Add antonym of antonym to set.
+                    antonyms_of_antonyms.add(possible_antonym[1])
+
+        connecting_nodes = []
+        for node in path_memory[0][-1]:
+            pointer = node[0]
+            if pointer[1] in synset_connectors and pointer[0] == '!' and pointer[1] not in antonyms_of_antonyms:
+                connecting_nodes.append(node)
+
+        if len(connecting_nodes) > 0:
+            path_memory[0][-1] = connecting_nodes
+            return True
+
+        # Prevents deleting entire generation. Delete antonym pointers instead.
+        path_memory[0][-1] = [node for node in path_memory[0][-1] if node[0][0] != '!']
+        return False
+
+    offsets, targets, types, source_words, target_words, _ = wordnet_data.search_view('antonym', 0)
+    antonym_distance = wordnet_data.antonym_distance
+    path_memory = [[[(pointer, -1) for pointer in start_pointers_list]]]
     visited_synsets = set(start_synset_ids)
     found_connection = False
     connecting_synsets = set()
@@ -130,152 +136,106 @@ Pass in empty list to synset_connectors if no connection found yet."""
     while True:  # Each loop is one layer in a breadth-first search.
 
         next_generation = []
-
-        for parent_group in path_memory[0][-1]:  # Getting pointer groupings from previous generation.
-            for parent_pointer in parent_group:  # Find neighbor_synsets of synsets_currently_visiting.
-
-                sibling_group = []
-
-                parent_synset_id = parent_pointer[1]
-                for child_pointer in wordnet_data[parent_synset_id][4]:
-
-                    child_pointer_symbol = child_pointer[0]
-                    if child_pointer_symbol in POINTER_TYPES_TO_IGNORE or child_pointer_symbol == '?p':
-                        continue  # Ignore specified pointers and word pivots.
-
-                    if parent_pointer[0] in POINTER_SEQUENCES_TO_IGNORE:
-                        if POINTER_SEQUENCES_TO_IGNORE[parent_pointer[0]] == child_pointer_symbol:
-                            continue  # Ignore specified pointer type sequences.
-
-                    child_pointer_id = child_pointer[1]
-
-                    if child_pointer_symbol == '!' and child_pointer_id not in connecting_synsets:
-                        found_connection = True
-                        connecting_synsets.add(child_pointer_id)
-
-                    # Add pointer to tree if not yet visited OR if it's an antonym.
-                    if child_pointer_id not in visited_synsets or child_pointer_id in connecting_synsets:
-                        sibling_group.append(child_pointer)
-
-                    # Add pointer to visited_synsets.
-                    visited_synsets.add(child_pointer_id)
-
-                next_generation.append(sibling_group)
-
-        empty_generation = True
-        for sibling_group in next_generation:
-            if len(sibling_group) > 0:
-                empty_generation = False
-                break
-        if empty_generation:
+        if depth_limit is not None:
+            distance_limit = depth_limit - len(path_memory[0])
+
+        last_generation = path_memory[0][-1]
+        for parent_index in range(len(last_generation)):  # Find neighbor_synsets of synsets_currently_visiting.
+
+            if budget is not None:
+                exceeded_limit = budget.check(len(visited_synsets), len(path_memory[0]), deadline)
+                if exceeded_limit is not None:
+                    return search_budget.too_large_result(exceeded_limit, len(visited_synsets))
+
+            # The search view has no pointers of ignored types. Pointer types ignored after the parent's type
+            # are the set bits of its sequence mask. See find_connection.get_tree().
+            parent_pointer = last_generation[parent_index][0]
+            sequence_mask = SEQUENCE_MASKS[POINTER_CODES[parent_pointer[0]]]
+            parent_synset_id = parent_pointer[1]
+            for pointer_index in range(offsets[parent_synset_id], offsets[parent_synset_id + 1]):
+
+                child_pointer_code = types[pointer_index]
+                if sequence_mask >> child_pointer_code & 1:
+                    continue  # Ignore specified pointer type sequences.
+
+                child_pointer_id = targets[pointer_index]
+
+                if depth_limit is not None and child_pointer_code != ANTONYM_CODE:
+                    if antonym_distance(child_pointer_id) > distance_limit:
+                        continue  # Ignore synsets too far from an antonym to reach one within depth_limit.
+
+                if child_pointer_code == ANTONYM_CODE and child_pointer_id not in connecting_synsets:
+                    found_connection = True
+                    connecting_synsets.add(child_pointer_id)
+
+                # Add pointer to tree if not yet visited OR if it's an antonym.
+                if child_pointer_id not in visited_synsets or child_pointer_id in connecting_synsets:
+                    child_pointer = (POINTER_SYMBOLS[child_pointer_code], child_pointer_id,
+                                     source_words[pointer_index], target_words[pointer_index])
+                    next_generation.append((child_pointer, parent_index))
+
+                # Add pointer to visited_synsets.
+                visited_synsets.add(child_pointer_id)
+
+        if len(next_generation) == 0:
+            if depth_limit is not None:
+                return None
             message = 'Reached dead-end in path. Failure in either earlier check for existence ' \
                       'of reachable antonym, or failure in iterating paths.'
             return {'status': 'error', 'data': message}
 
         path_memory[0].append(next_generation)
 
-        after_prune_found_connection = prune_tree(connecting_synsets)
-        if found_connection and not after_prune_found_connection:
+        if found_connection and not prune_last_generation(connecting_synsets):
             found_connection = False
             connecting_synsets = set()
 
         if found_connection:
-            return {'status': 'ok', 'data': path_memory}
+            find_connection.prune_tree(path_memory, 0)
+            return {'status': 'ok', 'data': path_memory, 'synsets_visited': len(visited_synsets)}
 
+        if depth_limit is not None and len(path_memory[0]) > depth_limit:
+            return None
 
-def get_paths_from_antonym_tree(wordnet_data, tree):
+
+def get_antonym_path_chains(tree):
+    """Returns path_chains as a dictionary where each key is the connecting synset_id of its path.
+Each path chain ends with an '__end' pointer to synset_id -1 after the antonym.
+A connecting synset can be in the last generation more than once. Its last path is kept.
+PATH CHAIN DATA STRUCTURE: See find_connection.get_path_chains() docstring."""
+
+    end_pointer = ('__end', -1, -1, -1)
+    path_chains = {}
+    for node_index in range(len(tree[0][-1])):
+        genealogy_line = find_connection.get_genealogy_line(tree, 0, node_index)
+        genealogy_line.append(end_pointer)
+        path_chains[genealogy_line[-2][1]] = genealogy_line
+    return path_chains
+
+
+def get_paths_from_antonym_chains(wordnet_data, path_chains):
     """Returns paths_by_connector as a dictionary where each key is the connecting synset_id of its path.
 Each key-value is a path represented as an ordered list containing the path nodes.
 Each path node is a dictionary with these data_keys:
 'color_a', 'color_b', 'two_kw', 'key_words', 'other_words', 'pos', 'gloss', 'pointer_phrase'.
-PATHS DATA STRUCTURE: paths_by_connector[connecting_synset_id][path_node_index][data_key]"""
+PATHS DATA STRUCTURE: paths_by_connector[connecting_synset_id][path_node_index][data_key]
+Each call picks a new random hue for the paths."""
 
     paths_by_connector = {}
-
-    latest_generation = tree[0][-1]
-    for sibling_group_index in range(len(latest_generation)):
-        genealogy_line = find_connection.get_genealogy_line([0, -1, sibling_group_index], tree)
-        sibling_group = latest_generation[sibling_group_index]
-
-        for sibling_index in range(len(sibling_group)):
-
-            connecting_synset_id = sibling_group[sibling_index][1]
-
-            paths_by_connector[connecting_synset_id] = []
-
-            this_path = paths_by_connector[connecting_synset_id]
-            gene_line_plus_sibling_index = deepcopy(genealogy_line)
-            gene_line_plus_sibling_index[-1].append(sibling_index)
-
-            # Populate this_path.
-            for node_coords in gene_line_plus_sibling_index:
-                # Node_coords are of the form [direction, generation, sibling_group_index, sibling_index].
-                this_pointer = tree[node_coords[0]][node_coords[1]][node_coords[2]][node_coords[3]]
-
-                pointer_node = {
-                    'pointer_source': this_pointer[2],
-                    'pointer_target': this_pointer[3],
-                    'pointer_phrase': POINTER_SYMBOL_KEY[this_pointer[0]]['phrase'],
-                }
-                synset_node = {'synset_id': this_pointer[1]}
-                this_path.append(pointer_node)
-                this_path.append(synset_node)
-
-            # Add end pointer.
-            end_pointer = {
-                'pointer_source': -1,
-                'pointer_target': -1,
-                'pointer_phrase': POINTER_SYMBOL_KEY['__end']['phrase'],
-            }
-            this_path.append(end_pointer)
+    for connecting_synset_id in path_chains:
+        path_chain = path_chains[connecting_synset_id]
+        path = []
+        for node_index in range(len(path_chain) - 1):
+            pointer_in = path_chain[node_index]
+            pointer_out = path_chain[node_index + 1]
+            path.append(find_connection.get_path_node(
+                wordnet_data, pointer_in[1], pointer_in[3], pointer_out[2], pointer_out[0]))
+        paths_by_connector[connecting_synset_id] = path
 
     this_path_hue = random.randint(0, 360)
 
     for connecting_synset_id in paths_by_connector:
         path = paths_by_connector[connecting_synset_id]
-        for node_index in range(len(path) - 2, 0, -2):
-
-            this_node = path[node_index]
-            prev_node = path[node_index - 1]
-            next_node = path[node_index + 1]
-            synset_id = this_node['synset_id']
-            this_node['pointer_phrase'] = next_node['pointer_phrase']
-            wordnet_data_this_synset = wordnet_data[synset_id]
-            this_node['pos'] = wordnet_data_this_synset[1]
-            this_node['gloss'] = wordnet_data_this_synset[2]
-
-            all_words_underscored = wordnet_data_this_synset[3]
-            all_words = []
-            for word in all_words_underscored:
-                formatted_word = word.replace('_', ' ').split('(')[0]
-                all_words.append(formatted_word)
-
-            key_words = []
-            target_word_index = prev_node['pointer_target']
-            if target_word_index != -1:
-                target_word = all_words[target_word_index]
-                key_words.append(target_word)
-            source_word_index = next_node['pointer_source']
-            if source_word_index != -1:
-                source_word = all_words[source_word_index]
-                if source_word not in key_words:
-                    key_words.append(source_word)
-            if len(key_words) == 0:
-                key_words.append(all_words[0])
-            this_node['key_words'] = key_words
-            this_node['two_kw'] = len(key_words) == 2
-
-            this_node['other_words'] = ''
-            for word in all_words:
-                if word not in key_words:
-                    this_node['other_words'] += word
-                    this_node['other_words'] += ', '
-            this_node['other_words'] = this_node['other_words'][:-2]
-
-            del this_node['synset_id']
-
-        for node_index in range(len(path) - 1, -1, -2):
-            del path[node_index]
 
         this_path_hue = (this_path_hue - 110) % 360
         soft_text_value = 35
@@ -318,7 +278,29 @@ PATHS DATA STRUCTURE: paths_by_connector[connecting_synset_id][path_node_index][
     return paths_by_connector
 
 
-def web_app_inquiry(wordnet_data, wordnet_index, groups_without_opposites, start_word, start_synset):
+def get_paths_from_antonym_tree(wordnet_data, tree):
+    """Returns paths_by_connector for the paths in tree. See get_paths_from_antonym_chains()."""
+    return get_paths_from_antonym_chains(wordnet_data, get_antonym_path_chains(tree))
+
+
+def get_antonym_search_result(wordnet_data, start_word, start_synset_ids, budget=None, engine=None):
+    """Runs get_tree_to_nearest_antonyms() and returns the part of its result web_app_inquiry() needs and caches:
+a dictionary with the key "status", and the keys "path_chains" and "synsets_visited" if status is ok."""
+
+    tree_result = get_tree_to_nearest_antonyms(wordnet_data, start_word, start_synset_ids, budget, engine)
+    search_result = {'status': tree_result['status']}
+    if tree_result['status'] == 'ok':
+        search_result['path_chains'] = get_antonym_path_chains(tree_result['data'])
+        search_result['synsets_visited'] = tree_result['synsets_visited']
+    return search_result
+
+
+def web_app_inquiry(wordnet_data, wordnet_index, start_word, start_synset, cache=None, budget=None, search_pool=None,
+                    engine=None):
+    """If cache is a query_cache.QueryCache, reuses the search result cached in it for this query,
+and caches the search result for this query. Paths are colored anew each time. Searches stopped by budget
+are not cached. Results of queries that got as far as the search have the key "timings", and search_pool and engine
+are used, as in find_connection.web_app_inquiry()."""
 
     formatted_start_word = find_connection.clean_string(start_word)
 
@@ -336,18 +318,12 @@ def web_app_inquiry(wordnet_data, wordnet_index, groups_without_opposites, start
             data = {}
             none_have_path = True
             for synset_id in start_synsets:
-                synset_data = wordnet_data[synset_id]
-                if synset_data[0] not in groups_without_opposites:
+                if wordnet_data.reaches_antonym(synset_id):
                     none_have_path = False
-                key_words = ''
-                for word in synset_data[3]:
-                    formatted_word = word.replace('_', ' ').split('(')[0]
-                    key_words += f'{formatted_word}, '
-                key_words = key_words[:-2]
                 data[synset_id] = {
-                    'key_words': key_words,
-                    'pos': synset_data[1],
-                    'gloss': synset_data[2],
+                    'key_words': ', '.join(wordnet_data.display_words(synset_id)),
+                    'pos': wordnet_data.pos(synset_id),
+                    'gloss': wordnet_data.gloss(synset_id),
                 }
             if none_have_path:
                 message = f"""I'm sorry, but I couldn't find a quasi-opposite for "{start_word}"."""
@@ -360,18 +336,41 @@ def web_app_inquiry(wordnet_data, wordnet_index, groups_without_opposites, start
                 }
             return result
 
-        tree_result = get_tree_to_nearest_antonyms(
-            wordnet_data, groups_without_opposites, formatted_start_word, start_synsets)
-
     else:
-        tree_result = get_tree_to_nearest_antonyms(
-            wordnet_data, groups_without_opposites, formatted_start_word, [int(start_synset)])
-
-    if tree_result['status'] != 'ok':
+        start_synsets = [int(start_synset)]
+
+    cache_key = (formatted_start_word, tuple(start_synsets))
+    search_result = None
+    if cache is not None:
+        search_result = cache.get(cache_key)
+
+    timings = {}
+    if search_result is None:
+        search_start_time = time.perf_counter()
+        if search_pool is None:
+            search_result = get_antonym_search_result(
+                wordnet_data, formatted_start_word, start_synsets, budget, engine)
+        else:
+            search_result = search_pool.get_antonym_search_result(formatted_start_word, start_synsets, budget)
+        if cache is not None and search_result['status'] not in ('too_large', 'busy'):
+            cache.put(cache_key, search_result)
+        timings['search'] = time.perf_counter() - search_start_time
+
+    if search_result['status'] == 'busy':
+        message = "I'm sorry, but I'm too busy to search right now. Please try again in a moment."
+        return {'status': 'error', 'message': message, 'timings': timings}
+
+    if search_result['status'] == 'too_large':
+        message = f"I'm sorry, but the search for a quasi-opposite of that meaning grew too large to finish."
+        return {'status': 'error', 'message': message, 'timings': timings}
+
+    if search_result['status'] != 'ok':
         message = f"I'm sorry, but I couldn't find a quasi-opposite for that meaning."
-        return {'status': 'error', 'message': message}
+        return {'status': 'error', 'message': message, 'timings': timings}
 
-    result_paths = get_paths_from_antonym_tree(wordnet_data, tree_result['data'])
+    paths_start_time = time.perf_counter()
+    result_paths = get_paths_from_antonym_chains(wordnet_data, search_result['path_chains'])
+    timings['paths'] = time.perf_counter() - paths_start_time
 
     path_length = 0
     for path in result_paths:
@@ -389,5 +388,8 @@ def web_app_inquiry(wordnet_data, wordnet_index, groups_without_opposites, start
         'status': 'ok',
         'message': message,
         'data': result_paths,
+        'synsets_visited': search_result['synsets_visited'],
+        'path_count': len(result_paths),
+        'timings': timings,
     }
     return result
@@ -0,0 +1,44 @@
+# Gunicorn settings, read automatically by "gunicorn main:app" (see Procfile) when started from this directory.
+#
+# Preload mode (opt-in, GUNICORN_PRELOAD=1): the master process imports main and loads the database once,
+# then forks the workers, so they share its memory pages copy-on-write instead of each importing and loading their own.
+# To keep those pages shared after the fork:
+#   - Garbage collection is disabled in the master from when_ready() until gc.freeze(), so no collection runs
+#     between the end of the database load and the freeze. That only guards the freeze itself: gunicorn imports
+#     the preloaded app before any server hook runs, so main's import, and the part of the load that runs before
+#     when_ready(), are collected as usual.
+#   - gc.freeze() moves every object the master created to a permanent generation just before the workers are
+#     forked, so the collections the workers run never write to those objects' headers.
+#   - The graph itself is memory-mapped (see wordnet_graph.open_database()), and its columns are read as
+#     memoryviews, so searches create new ints but don't write to the shared data.
+# By default each worker imports main and maps the database itself, as gunicorn does without preload, which also
+# lets HUP reload code.
+#
+# The number of workers is gunicorn's usual WEB_CONCURRENCY setting.
+# benchmarks/worker_memory.py measures the unique memory of each worker in both modes.
+
+import gc
+import os
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "0") == "1"
+
+
+def on_starting(server):
+    # Metrics snapshots left by workers of an earlier run would otherwise be counted again. See metrics.py.
+    metrics_dir = os.getenv("METRICS_DIR")
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        for file_name in os.listdir(metrics_dir):
+            if file_name.startswith('metrics-'):
+                os.remove(os.path.join(metrics_dir, file_name))
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    gc.disable()
+    import main
+    main.database_thread.join()  # No thread should be running at the fork, and workers should start ready.
+    server.log.info(f'Preloaded the database: {main.database_state}.')
+    gc.freeze()
+    gc.enable()  # Workers inherit it. Frozen objects are never collected, and the master creates few new ones.
@@ -1,13 +1,22 @@
-from flask import Flask, render_template, request, url_for, redirect
+from flask import Flask, render_template, request, url_for, redirect, stream_with_context, g
 from threading import Thread
 from datetime import datetime
 from pytz import timezone
 import time
-import smtplib
 import os
-import pickle
+import traceback
+import atexit
+import gzip
+import json
+import admin_alerts
 import find_connection
 import find_opposite
+import metrics
+import profiling
+import query_cache
+import search_budget
+import search_executor
+import wordnet_graph
 
 
 # Copyright 2021 Johnathan Pennington | All rights reserved.
@@ -15,13 +24,18 @@ import find_opposite
 
 wordnet_index = None
 wordnet_data = None
-group_map = None
-groups_without_opposites = None
+search_engine = None  # A numpy_search.NumpySearchEngine if SEARCH_ENGINE is "numpy", or None for the default search.
 
-wordnet_index_thread = None
-wordnet_data_thread = None
-group_map_thread = None
-groups_without_opposites_thread = None
+# Database lifecycle: "loading" until load_database() finishes, then "ready", or "failed" with database_error set.
+# Handlers check database_state instead of waiting for database_thread, and answer with unavailable_page() until ready.
+database_thread = None
+database_state = 'loading'
+database_error = ''
+database_load_seconds = None
+
+RETRY_AFTER_SECONDS = 5
+WARMING_UP_MESSAGE = 'Wordplay is warming up. Please try again in a few seconds.'
+LOAD_FAILED_MESSAGE = "I'm sorry, but Wordplay couldn't load its database. Please try again later."
 
 
 def tab_classes(active_tab=''):
@@ -33,59 +47,215 @@ def tab_classes(active_tab=''):
     return tab_class_dict
 
 
-def load_index():
+def load_database():
+    # Memory-mapped read-only, so all gunicorn workers share one page-cache copy of the file.
     global wordnet_index
-    with open('wordnet-index.pkl', 'rb') as file:
-        wordnet_index = pickle.load(file)
-
-
-def load_data():
     global wordnet_data
-    with open('wordnet-data-0.pkl', 'rb') as file:
-        wordnet_data = pickle.load(file)
+    global search_engine
+    global database_state
+    global database_error
+    global database_load_seconds
+
+    start_time = time.perf_counter()
+    try:
+        sections = wordnet_graph.open_database('wordnet-graph.bin')
+        log_load_time('database file', start_time)
+        graph_start_time = time.perf_counter()
+        loaded_wordnet_data = wordnet_graph.WordnetGraph(sections)
+        log_load_time('graph', graph_start_time)
+        index_start_time = time.perf_counter()
+        loaded_wordnet_index = wordnet_graph.WordIndex(sections)
+        log_load_time('index', index_start_time)
+        loaded_search_engine = None
+        if SEARCH_ENGINE == 'numpy':
+            engine_start_time = time.perf_counter()
+            import numpy_search  # NumPy is only needed for this engine.
+            loaded_search_engine = numpy_search.NumpySearchEngine(loaded_wordnet_data)
+            log_load_time('search engine', engine_start_time)
+    # Any error, such as a missing section (KeyError) or NumPy not installed for the numpy engine (ImportError), leaves
+    # the app in the failed state, instead of ending this thread with the state still "loading".
+    except Exception as error:
+        database_error = f'{type(error).__name__}: {error}'
+        database_state = 'failed'
+        print(f'Database failed to load: {database_error}', flush=True)
+        traceback.print_exc()
+        admin_alert('Web App - ERROR', f'Database failed to load.\n{traceback.format_exc()}')
+        return
+
+    wordnet_data = loaded_wordnet_data
+    wordnet_index = loaded_wordnet_index
+    search_engine = loaded_search_engine
+    database_load_seconds = time.perf_counter() - start_time
+    database_state = 'ready'
+    log_load_time('database', start_time)
+    metrics_registry.set('wordplay_database_load_seconds', database_load_seconds)
+
+
+def log_load_time(artifact, start_time):
+    print(f'Loaded {artifact} in {time.perf_counter() - start_time:.3f} seconds.', flush=True)
 
 
-def load_group_map():
-    global group_map
-    with open('group-map.pkl', 'rb') as file:
-        group_map = pickle.load(file)
+def start_load_database_thread():
+    global database_thread
+    if database_thread is None and wordnet_data is None:
+        database_thread = Thread(target=load_database)
+        database_thread.start()
 
 
-def load_groups_without_opposites():
-    global groups_without_opposites
-    with open('groups-without-opposites.pkl', 'rb') as file:
-        groups_without_opposites = pickle.load(file)
+def database_unavailable_message():
+    # Returns the message to show instead of results while the database isn't ready, or None once it is.
+    if database_state == 'loading':
+        return WARMING_UP_MESSAGE
+    if database_state == 'failed':
+        return LOAD_FAILED_MESSAGE
+    return None
 
 
-def start_load_database_thread():
-    global wordnet_data_thread
-    global wordnet_index_thread
-    global group_map_thread
-    global groups_without_opposites_thread
-    if wordnet_data_thread is None and wordnet_data is None:
-        wordnet_data_thread = Thread(target=load_data)
-        wordnet_data_thread.start()
-    if wordnet_index_thread is None and wordnet_index is None:
-        wordnet_index_thread = Thread(target=load_index)
-        wordnet_index_thread.start()
-    if group_map_thread is None and group_map is None:
-        group_map_thread = Thread(target=load_group_map)
-        group_map_thread.start()
-    if groups_without_opposites_thread is None and groups_without_opposites is None:
-        groups_without_opposites_thread = Thread(target=load_groups_without_opposites)
-        groups_without_opposites_thread.start()
-
-
-def join_thread(thread):
-    if thread is not None:
-        if thread.is_alive():
-            thread.join(timeout=10.0)
+def unavailable_page(tab, message, **context):
+    # The query page of tab, with message as its error, for requests that need the database before it is ready.
+    page = render_template(f'{tab}.html', error=message, tab_classes=tab_classes(tab), **context)
+    response = app.make_response((page, 503))
+    if database_state == 'loading':
+        response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+    return response
 
 
 SENDER = os.getenv("SENDER")
 SENDER_PASS = os.getenv("SENDER_PASS")
 RECIPIENT = os.getenv("RECIPIENT")
 
+# Admin alerts are sent from one background thread per worker, batched into digests of up to ALERT_DIGEST_SIZE alerts
+# sent at most ALERT_DIGEST_SECONDS after their first alert. Alerts beyond ALERT_QUEUE_SIZE waiting are dropped.
+# Set ALERT_SMTP_STARTTLS to "0" and leave SENDER_PASS unset to send alerts to a local stand-in SMTP server.
+ALERT_SMTP_HOST = os.getenv("ALERT_SMTP_HOST", "smtp.mail.yahoo.com")
+ALERT_SMTP_PORT = int(os.getenv("ALERT_SMTP_PORT", "587"))  # or port=465
+ALERT_SMTP_STARTTLS = os.getenv("ALERT_SMTP_STARTTLS", "1") == "1"
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", "1000"))
+ALERT_DIGEST_SIZE = int(os.getenv("ALERT_DIGEST_SIZE", "20"))
+ALERT_DIGEST_SECONDS = float(os.getenv("ALERT_DIGEST_SECONDS", "60"))
+alert_transport = admin_alerts.SmtpTransport(ALERT_SMTP_HOST, ALERT_SMTP_PORT, SENDER, SENDER_PASS, RECIPIENT,
+                                             ALERT_SMTP_STARTTLS)
+alert_queue = admin_alerts.AlertQueue(alert_transport, ALERT_QUEUE_SIZE, ALERT_DIGEST_SIZE, ALERT_DIGEST_SECONDS)
+atexit.register(alert_queue.stop)
+
+# Set to "numpy" to run searches a generation at a time with NumPy, which must be installed then. Results are the same.
+# See numpy_search.NumpySearchEngine and benchmarks/numpy_engine.py.
+SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "python")
+
+# Set to "1" to check the other side's synsets for connections instead of expanding the larger side of connect searches,
+# such as a hub word's. Results are the same, with fewer synsets visited. See find_connection.get_tree().
+BALANCED_CONNECT_SEARCH = os.getenv("BALANCED_CONNECT_SEARCH") == "1"
+
+# Set to "1" to send connect result pages while their paths are built, instead of after. See stream_template().
+STREAM_CONNECT_RESULTS = os.getenv("STREAM_CONNECT_RESULTS") == "1"
+
+# Paths shown per connect result page, best ranked first, with a link to the next page. Unset or "0" shows all paths.
+# Requests can choose their own with the limit parameter. See find_connection.iter_ranked_connectors().
+RESULT_PATH_LIMIT = int(os.getenv("RESULT_PATH_LIMIT", "0"))
+
+# Number of search results each query cache keeps per worker. Set to "0" to disable the caches.
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "512"))
+connect_cache = query_cache.QueryCache(QUERY_CACHE_SIZE)
+opposite_cache = query_cache.QueryCache(QUERY_CACHE_SIZE)
+
+# Most words /api/complete returns for a prefix, and how long browsers may cache them, since the index only changes
+# when the database is rebuilt.
+COMPLETE_LIMIT = int(os.getenv("COMPLETE_LIMIT", "10"))
+COMPLETE_CACHE_SECONDS = int(os.getenv("COMPLETE_CACHE_SECONDS", "3600"))
+
+# Limits on each search, so one query can't tie up a worker. Unset or "0" means no limit.
+SEARCH_MAX_SYNSETS = int(os.getenv("SEARCH_MAX_SYNSETS", "0"))
+SEARCH_MAX_GENERATIONS = int(os.getenv("SEARCH_MAX_GENERATIONS", "0"))
+SEARCH_MAX_SECONDS = float(os.getenv("SEARCH_MAX_SECONDS", "0"))
+connect_budget = search_budget.SearchBudget(SEARCH_MAX_SYNSETS, SEARCH_MAX_GENERATIONS, SEARCH_MAX_SECONDS)
+opposite_budget = search_budget.SearchBudget(SEARCH_MAX_SYNSETS, SEARCH_MAX_GENERATIONS, SEARCH_MAX_SECONDS)
+
+# Number of processes each worker runs searches in, off its request threads, so the searches of a worker's threads
+# (gunicorn --threads) run in parallel. Unset or "0" runs searches in the request thread. Searches beyond
+# SEARCH_QUEUE_SIZE waiting or running per worker, and searches not done in SEARCH_TASK_SECONDS, get a "too busy" error.
+# Each search process is replaced after SEARCH_TASKS_PER_PROCESS searches, on Python 3.11 and later.
+# See search_executor.SearchExecutor.
+SEARCH_PROCESSES = int(os.getenv("SEARCH_PROCESSES", "0"))
+SEARCH_QUEUE_SIZE = int(os.getenv("SEARCH_QUEUE_SIZE", "0"))  # "0" means 4 per search process.
+SEARCH_TASK_SECONDS = float(os.getenv("SEARCH_TASK_SECONDS", "30"))
+SEARCH_TASKS_PER_PROCESS = int(os.getenv("SEARCH_TASKS_PER_PROCESS", "1000"))
+search_pool = None
+if SEARCH_PROCESSES > 0:
+    search_pool = search_executor.SearchExecutor('wordnet-graph.bin', SEARCH_PROCESSES, SEARCH_QUEUE_SIZE,
+                                                 SEARCH_TASK_SECONDS, SEARCH_TASKS_PER_PROCESS, SEARCH_ENGINE)
+    atexit.register(search_pool.shutdown)
+
+# Directory where each gunicorn worker writes its metrics, so /metrics can report all of them. Clear it on startup.
+# Unset means /metrics only reports the worker that serves it.
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+metrics_registry = metrics.MetricsRegistry(METRICS_DIR)
+metrics_registry.histogram('wordplay_request_seconds', 'Request latency by route and status.', metrics.LATENCY_BUCKETS)
+metrics_registry.histogram('wordplay_query_stage_seconds', 'Query time by stage: search, paths and render.',
+                           metrics.LATENCY_BUCKETS)
+metrics_registry.histogram('wordplay_synsets_visited', 'Synsets visited by each search that found paths.',
+                           metrics.SYNSETS_VISITED_BUCKETS)
+metrics_registry.histogram('wordplay_path_count', 'Paths found by each search that found paths.',
+                           metrics.PATH_COUNT_BUCKETS)
+metrics_registry.counter('wordplay_query_cache_lookups_total', 'Query cache lookups by result.')
+metrics_registry.gauge('wordplay_database_load_seconds', 'Time taken to open the database.')
+
+
+# Requests with an X-Profile header equal to PROFILE_SECRET get a cProfile report instead of their page. Unset means
+# no request can ask for one. With PROFILE_SAMPLE_EVERY set, every Nth request of each worker is profiled too, and its
+# stats are written to PROFILE_DIR, which keeps the newest PROFILE_KEEP. See profiling.ProfilingMiddleware.
+PROFILE_SECRET = os.getenv("PROFILE_SECRET") or None
+PROFILE_SAMPLE_EVERY = int(os.getenv("PROFILE_SAMPLE_EVERY", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "40"))
+
+
+def collect_cache_metrics():
+    samples = []
+    for query, cache in (('connect', connect_cache), ('opposite', opposite_cache)):
+        cache_stats = cache.stats()
+        for lookup_result in ('hits', 'reverse_hits', 'misses'):
+            samples.append(('wordplay_query_cache_lookups_total',
+                            (('query', query), ('result', lookup_result)), cache_stats[lookup_result]))
+    return samples
+
+
+metrics_registry.add_collector(collect_cache_metrics)
+metrics_registry.counter('wordplay_search_budget_hits_total', 'Searches stopped by a search budget limit.')
+
+
+def collect_budget_metrics():
+    samples = []
+    for query, budget in (('connect', connect_budget), ('opposite', opposite_budget)):
+        budget_hits = budget.stats()['hits']
+        for limit in search_budget.SearchBudget.LIMITS:
+            samples.append(('wordplay_search_budget_hits_total', (('query', query), ('limit', limit)),
+                            budget_hits[limit]))
+    return samples
+
+
+metrics_registry.add_collector(collect_budget_metrics)
+
+if search_pool is not None:
+    metrics_registry.counter('wordplay_search_pool_tasks_total', 'Searches sent to the search processes, by outcome.')
+
+    def collect_search_pool_metrics():
+        pool_stats = search_pool.stats()
+        return [('wordplay_search_pool_tasks_total', (('outcome', outcome),), pool_stats[outcome])
+                for outcome in ('submitted', 'rejected', 'timed_out')]
+
+    metrics_registry.add_collector(collect_search_pool_metrics)
+
+
+def record_query_metrics(query, data):
+    # Stage timings also go in the Server-Timing header of the response.
+    g.stage_timings.update(data.get('timings', {}))
+    for stage, seconds in data.get('timings', {}).items():
+        metrics_registry.observe('wordplay_query_stage_seconds', seconds, (('query', query), ('stage', stage)))
+    if data['status'] == 'ok' and 'search' in data['timings']:  # Cached results would count their search again.
+        metrics_registry.observe('wordplay_synsets_visited', data['synsets_visited'], (('query', query),))
+        metrics_registry.observe('wordplay_path_count', data['path_count'], (('query', query),))
+
 
 def admin_alert(subject, message):
     pacific_tz = timezone("US/Pacific")
@@ -93,26 +263,110 @@ def admin_alert(subject, message):
     second = round(float(time_to_format.strftime("%S.%f")), 2)
     formatted_datetime = time_to_format.strftime(f"%Y-%m-%d %H:%M:{second}")
     message = f'{formatted_datetime}\nWORDPLAY\n{message}\n{time.time()}'
+    alert_queue.send(subject, message)
+
+
+STREAM_BUFFER_SIZE = 40  # Template output pieces sent per chunk, roughly one path node each.
+
+
+def render_result(query, template_name, stream=False, **context):
+    # Renders a result page, timed as the render stage of query.
+    # If stream is True, returns a response that sends the page in chunks as the template generates it, so the page
+    # header goes out before lazily built context, such as lazy_paths results, is ready. Streamed pages are timed
+    # until their last chunk is sent, so their render stage includes building those paths.
+    render_labels = (('query', query), ('stage', 'render'))
+    start_time = time.perf_counter()
+    if not stream:
+        page = render_template(template_name, **context)
+        g.stage_timings['render'] = time.perf_counter() - start_time
+        metrics_registry.observe('wordplay_query_stage_seconds', g.stage_timings['render'], render_labels)
+        return page
+
+    def timed_chunks(chunks):
+        yield from chunks
+        metrics_registry.observe('wordplay_query_stage_seconds', time.perf_counter() - start_time, render_labels)
+
+    app.update_template_context(context)
+    template_stream = app.jinja_env.get_template(template_name).stream(context)
+    template_stream.enable_buffering(STREAM_BUFFER_SIZE)
+    return app.response_class(stream_with_context(timed_chunks(template_stream)))
+
+
+GZIP_MIN_SIZE = 1024  # Smaller JSON responses are sent uncompressed.
+
+
+def json_response(data, status=200):
+    # Compressed with gzip when the client accepts it, since path data is repetitive and compresses well.
+    body = json.dumps(data).encode()
+    response = app.response_class(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if len(body) >= GZIP_MIN_SIZE and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response.set_data(gzip.compress(body))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def unavailable_json(data):
+    # JSON counterpart of unavailable_page().
+    response = json_response(data, 503)
+    if database_state == 'loading':
+        response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+    return response
+
+
+def get_page_args():
+    # The limit and cursor request parameters of paged connect results. See find_connection.web_app_inquiry().
+    limit = max(0, request.args.get('limit', RESULT_PATH_LIMIT, type=int))
+    cursor = max(0, request.args.get('cursor', 0, type=int))
+    return limit, cursor
+
+
+def api_result(data):
+    # Same keys as the result data of web_app_inquiry(), without the colors only the result pages need.
+    result = {'status': data['status'], 'message': data['message']}
+    if data['status'] == 'choose_synset':
+        result['synsets'] = data['data']
+    elif data['status'] == 'ok':
+        result['synsets_visited'] = data['synsets_visited']
+        if 'next_cursor' in data:
+            result['next_cursor'] = data['next_cursor']
+        result['paths'] = {}
+        for connecting_synset_id in data['data']:
+            result['paths'][connecting_synset_id] = [
+                {data_key: node[data_key] for data_key in node if not data_key.startswith('color_')}
+                for node in data['data'][connecting_synset_id]
+            ]
+    return result
 
-    connection = smtplib.SMTP("smtp.mail.yahoo.com", port=587)  # or port=465
-    connection.starttls()  # Make connection secure
-    connection.login(user=SENDER, password=SENDER_PASS)
-    connection.sendmail(
-        from_addr=SENDER,
-        to_addrs=RECIPIENT,
-        msg=f"Subject: {subject}\n\n{message}"
-    )
-    connection.close()
 
+start_load_database_thread()
+app = Flask(__name__)
+if PROFILE_SECRET is not None or PROFILE_SAMPLE_EVERY > 0:
+    app.wsgi_app = profiling.ProfilingMiddleware(app.wsgi_app, PROFILE_SECRET, 'X-Profile', PROFILE_SAMPLE_EVERY,
+                                                 PROFILE_DIR, PROFILE_KEEP, PROFILE_TOP_N)
 
-def admin_alert_thread(subject, message):
-    alert_args = [subject, message]
-    alert_thread = Thread(target=admin_alert, args=alert_args)
-    alert_thread.start()
 
+@app.before_request
+def start_request_timer():
+    g.request_start_time = time.perf_counter()
+    g.stage_timings = {}
 
-start_load_database_thread()
-app = Flask(__name__)
+
+@app.after_request
+def record_request_metrics(response):
+    # Streamed responses are timed to their first chunk, and their render stage isn't in the Server-Timing header.
+    request_seconds = time.perf_counter() - g.request_start_time
+    route = 'unmatched'
+    if request.url_rule is not None:
+        route = request.url_rule.rule
+    request_labels = (('route', route), ('status', str(response.status_code)))
+    metrics_registry.observe('wordplay_request_seconds', request_seconds, request_labels)
+    metrics_registry.maybe_write()
+
+    server_timings = [f'{stage};dur={seconds * 1000:.2f}' for stage, seconds in g.stage_timings.items()]
+    server_timings.append(f'total;dur={request_seconds * 1000:.2f}')
+    response.headers['Server-Timing'] = ', '.join(server_timings)
+    return response
 
 
 @app.errorhandler(404)
@@ -120,17 +374,17 @@ def page_not_found(e):
     error = 'That URL does not compute.'
     if request.path.startswith(url_for('about')):
         message_body = f'404 Redirect\n{request.url}\nPage not found. Rendered about.html.'
-        admin_alert_thread('Web App - ERROR', message_body)
+        admin_alert('Web App - ERROR', message_body)
         tab_class = tab_classes('about')
         return render_template('about.html', tab_classes=tab_class), 404
     elif request.path.startswith(url_for('opposite')):
         message_body = f'404 Redirect\n{request.url}\nPage not found. Rendered opposite.html.'
-        admin_alert_thread('Web App - ERROR', message_body)
+        admin_alert('Web App - ERROR', message_body)
         tab_class = tab_classes('opposite')
         return render_template('opposite.html', source='', error=error, tab_classes=tab_class), 404
     elif not request.path.startswith('/favicon.ico') and not request.path.startswith('/robots'):
         message_body = f'404 Redirect\n{request.url}\nPage not found. Rendered connect.html.'
-        admin_alert_thread('Web App - ERROR', message_body)
+        admin_alert('Web App - ERROR', message_body)
         tab_class = tab_classes('connect')
         return render_template('connect.html', source='', target='', error=error, tab_classes=tab_class), 404
 
@@ -158,28 +412,25 @@ def opposite():
 
 @app.route('/opposite/random')
 def opposite_random():
-    global wordnet_data_thread
+    global database_state
     global wordnet_data
-    join_thread(wordnet_data_thread)
+    unavailable_message = database_unavailable_message()
+    if unavailable_message is not None:
+        return unavailable_page('opposite', unavailable_message, source='')
     word = find_connection.random_main_group_word(wordnet_data)
     destination = url_for('opposite', word=word)
-    admin_alert_thread('Web App - Log', f'Opposite page random button click.\n'
-                                        f'Request: {request.url}\nRedirect to: {request.url_root}{destination[1:]}\n'
-                                        f'WORD: {word}')
+    admin_alert('Web App - Log', f'Opposite page random button click.\n'
+                                 f'Request: {request.url}\nRedirect to: {request.url_root}{destination[1:]}\n'
+                                 f'WORD: {word}')
     return redirect(destination)
 
 
 @app.route('/opposite/query')
 def opposite_result():
 
-    global wordnet_index_thread
+    global database_state
     global wordnet_index
-    global wordnet_data_thread
     global wordnet_data
-    global group_map_thread
-    global group_map
-    global groups_without_opposites_thread
-    global groups_without_opposites
 
     if 'synset' in request.args:
         synset = request.args['synset']
@@ -190,29 +441,32 @@ def opposite_result():
     else:
         word = ''
 
-    join_thread(groups_without_opposites_thread)
-    join_thread(wordnet_index_thread)
-    join_thread(wordnet_data_thread)
-    data = find_opposite.web_app_inquiry(wordnet_data, wordnet_index, groups_without_opposites, word, synset)
+    unavailable_message = database_unavailable_message()
+    if unavailable_message is not None:
+        return unavailable_page('opposite', unavailable_message, source=word)
+
+    data = find_opposite.web_app_inquiry(wordnet_data, wordnet_index, word, synset, opposite_cache, opposite_budget,
+                                         search_pool, search_engine)
+    record_query_metrics('opposite', data)
 
     if data['status'] == 'error':
         tab_class = tab_classes('opposite')
-        admin_alert_thread('Web App - ERROR',
-                           f'{request.url}\nWORD: {word}\nSYNSET: {synset}\n{data["message"]}')
+        admin_alert('Web App - ERROR',
+                    f'{request.url}\nWORD: {word}\nSYNSET: {synset}\n{data["message"]}')
         return render_template('opposite.html', source=word, error=data['message'], tab_classes=tab_class)
     else:
         tab_class = tab_classes()
         cleaned_word = find_connection.remove_non_wordnet_chars(word)
         if data['status'] == 'choose_synset':
-            admin_alert_thread('Web App - Log',
-                               f'{request.url}\nRendered opposite choose-synset page.\nWORD: {word}\nSYNSET: {synset}')
+            admin_alert('Web App - Log',
+                        f'{request.url}\nRendered opposite choose-synset page.\nWORD: {word}\nSYNSET: {synset}')
             return render_template('choose_synset.html', source=cleaned_word, synsets=data['data'],
                                    message=data['message'], tab_classes=tab_class)
         else:
-            admin_alert_thread('Web App - Log',
-                               f'{request.url}\nRendered opposite result page.\nWORD: {word}\nSYNSET: {synset}')
-            return render_template('opposite_result.html', source=cleaned_word, info=data['message'],
-                                   paths=data['data'], tab_classes=tab_class)
+            admin_alert('Web App - Log',
+                        f'{request.url}\nRendered opposite result page.\nWORD: {word}\nSYNSET: {synset}')
+            return render_result('opposite', 'opposite_result.html', source=cleaned_word, info=data['message'],
+                                 paths=data['data'], tab_classes=tab_class)
 
 
 @app.route('/')
@@ -231,27 +485,26 @@ def connect():
 
 @app.route('/connect/random')
 def connect_random():
-    global wordnet_data_thread
+    global database_state
     global wordnet_data
-    join_thread(wordnet_data_thread)
+    unavailable_message = database_unavailable_message()
+    if unavailable_message is not None:
+        return unavailable_page('connect', unavailable_message, source='', target='')
     source = find_connection.random_main_group_word(wordnet_data)
     target = find_connection.random_main_group_word(wordnet_data)
     destination = url_for('connect', source=source, target=target)
-    admin_alert_thread('Web App - Log', f'Connect page random button click.\n'
-                                        f'Request: {request.url}\nRedirect to: {request.url_root}{destination[1:]}\n'
-                                        f'START: {source}\nTARGET: {target}')
+    admin_alert('Web App - Log', f'Connect page random button click.\n'
+                                 f'Request: {request.url}\nRedirect to: {request.url_root}{destination[1:]}\n'
+                                 f'START: {source}\nTARGET: {target}')
     return redirect(destination)
 
 
 @app.route('/connect/query')
 def connect_result():
 
-    global wordnet_index_thread
+    global database_state
     global wordnet_index
-    global wordnet_data_thread
     global wordnet_data
-    global group_map_thread
-    global group_map
 
     if 'source' in request.args:
         source = request.args['source']
@@ -262,23 +515,116 @@ def connect_result():
     else:
         target = ''
 
-    join_thread(group_map_thread)
-    join_thread(wordnet_index_thread)
-    join_thread(wordnet_data_thread)
-    data = find_connection.web_app_inquiry(wordnet_data, wordnet_index, group_map, source, target)
+    limit, cursor = get_page_args()
+
+    unavailable_message = database_unavailable_message()
+    if unavailable_message is not None:
+        return unavailable_page('connect', unavailable_message, source=source, target=target)
+
+    data = find_connection.web_app_inquiry(wordnet_data, wordnet_index, source, target,
+                                           BALANCED_CONNECT_SEARCH, connect_cache, connect_budget,
+                                           STREAM_CONNECT_RESULTS, limit, cursor, search_pool, search_engine)
+    record_query_metrics('connect', data)
 
     if data['status'] == 'error':
-        admin_alert_thread('Web App - ERROR',
-                           f'{request.url}\nSTART: {source}\nTARGET: {target}\n{data["message"]}')
+        admin_alert('Web App - ERROR',
+                    f'{request.url}\nSTART: {source}\nTARGET: {target}\n{data["message"]}')
         tab_class = tab_classes('connect')
         return render_template('connect.html', source=source, target=target,
                                error=data['message'], tab_classes=tab_class)
     else:
-        admin_alert_thread('Web App - Log',
-                           f'{request.url}\nRendered connect result page.\nSTART: {source}\nTARGET: {target}')
+        admin_alert('Web App - Log',
+                    f'{request.url}\nRendered connect result page.\nSTART: {source}\nTARGET: {target}')
         tab_class = tab_classes()
-        return render_template('connect_result.html', source=source, target=target,
-                               info=data['message'], paths=data['data'], tab_classes=tab_class)
+        next_page = ''
+        if data['next_cursor'] is not None:
+            next_page = url_for('connect_result', source=source, target=target, limit=limit, cursor=data['next_cursor'])
+        paths = data['data']
+        if not STREAM_CONNECT_RESULTS:
+            paths = paths.items()
+        return render_result('connect', 'connect_result.html', STREAM_CONNECT_RESULTS, source=source, target=target,
+                             info=data['message'], paths=paths, next_page=next_page, tab_classes=tab_class)
+
+
+@app.route('/api/connect')
+def api_connect():
+    # Same search as connect_result(), without rendering or admin alerts, for scripts and load tests.
+
+    global database_state
+    global wordnet_index
+    global wordnet_data
+
+    source = request.args.get('source', '')
+    target = request.args.get('target', '')
+    limit, cursor = get_page_args()
+
+    unavailable_message = database_unavailable_message()
+    if unavailable_message is not None:
+        return unavailable_json({'status': 'error', 'message': unavailable_message})
+
+    data = find_connection.web_app_inquiry(wordnet_data, wordnet_index, source, target,
+                                           BALANCED_CONNECT_SEARCH, connect_cache, connect_budget,
+                                           False, limit, cursor, search_pool, search_engine)
+    record_query_metrics('connect', data)
+    return json_response(api_result(data))
+
+
+@app.route('/api/opposite')
+def api_opposite():
+    # Same search as opposite_result(), without rendering or admin alerts, for scripts and load tests.
+
+    global database_state
+    global wordnet_index
+    global wordnet_data
+
+    word = request.args.get('word', '')
+    synset = request.args.get('synset', '')
+
+    unavailable_message = database_unavailable_message()
+    if unavailable_message is not None:
+        return unavailable_json({'status': 'error', 'message': unavailable_message})
+
+    data = find_opposite.web_app_inquiry(wordnet_data, wordnet_index, word, synset, opposite_cache, opposite_budget,
+                                         search_pool, search_engine)
+    record_query_metrics('opposite', data)
+    return json_response(api_result(data))
+
+
+@app.route('/api/complete')
+def api_complete():
+    # Words of the index starting with prefix, for the suggestions of the query pages. See query_page.js.
+
+    global database_state
+    global wordnet_index
+
+    prefix = request.args.get('prefix', '')
+    limit = min(max(0, request.args.get('limit', COMPLETE_LIMIT, type=int)), COMPLETE_LIMIT)
+
+    unavailable_message = database_unavailable_message()
+    if unavailable_message is not None:
+        return unavailable_json({'status': 'error', 'message': unavailable_message})
+
+    response = json_response({'status': 'ok', 'prefix': prefix,
+                              'words': find_connection.complete_word(wordnet_index, prefix, limit)})
+    response.headers['Cache-Control'] = f'public, max-age={COMPLETE_CACHE_SECONDS}'
+    return response
+
+
+@app.route('/healthz')
+def healthz():
+    # Readiness check: 200 once the database is loaded, 503 while it is loading or if it failed to load.
+    health = {'status': database_state}
+    if database_state == 'ready':
+        health['load_seconds'] = database_load_seconds
+        return json_response(health)
+    if database_state == 'failed':
+        health['error'] = database_error
+    return unavailable_json(health)
+
+
+@app.route('/metrics')
+def metrics_page():
+    return app.response_class(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
 
 
 if __name__ == '__main__':
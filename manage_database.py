@@ -1,5 +1,10 @@
 import csv
-import pickle
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
 
 
 # part of speech
@@ -49,12 +54,63 @@ POINTER_SYMBOL_KEY = {
     '>x': {'name': 'cause reflex', 'phrase': 'which can cause'},  # custom reflex pointer
 }
 
+# Pointer type of the pointer pointing back the other way. Also see ('^') pointers have no reflex type.
+POINTER_REFLEXES = {
+    '?p': '?p', '!': '!', '&': '&', '$': '$', '=': '=', '+': '+',
+    '@': '~', '~': '@', '@i': '~i', '~i': '@i',
+    '#m': '%m', '%m': '#m', '#s': '%s', '%s': '#s', '#p': '%p', '%p': '#p',
+    ';c': '-c', '-c': ';c', ';r': '-r', '-r': ';r', ';u': '-u', '-u': ';u',
+    '<': '<x', '<x': '<', '\\': '\\x', '\\x': '\\', '*': '*x', '*x': '*', '>': '>x', '>x': '>',
+}
+
+# Compiled graph columns store pointer types and parts of speech as small integer codes indexing these tuples.
+POINTER_SYMBOLS = tuple(POINTER_SYMBOL_KEY)
+POS_NAMES = tuple(POS_KEY)
+POINTER_CODES = {symbol: code for code, symbol in enumerate(POINTER_SYMBOLS)}
+
+# Searches follow pointers of their search view: the pointer columns of the directions they search, without the pointer
+# types they never follow (see compile_search_views()). The connect search follows neither direction's antonyms
+# if IGNORE_ANTONYMS, and the antonym search follows out pointers except word pivots.
+# The word pivots of add_word_pivots() aren't stored as pointers, but through word nodes, which searches whose view
+# doesn't ignore '?p' follow. See compile_word_nodes().
+SEARCH_VIEWS = {
+    'connect': (('out', 'in'), POINTER_TYPES_TO_IGNORE | ({'!'} if IGNORE_ANTONYMS else set())),
+    'antonym': (('out',), POINTER_TYPES_TO_IGNORE | {'?p'}),
+}
+# POINTER_SEQUENCES_TO_IGNORE as bitmasks: bit child_code of SEQUENCE_MASKS[parent_code] is set if pointers of
+# type code child_code are ignored after a pointer of type code parent_code.
+SEQUENCE_MASKS = tuple(1 << POINTER_CODES[POINTER_SEQUENCES_TO_IGNORE[symbol]] if symbol in POINTER_SEQUENCES_TO_IGNORE
+                       else 0 for symbol in POINTER_SYMBOLS)
+
+# DATABASE FILE LAYOUT: header, section table, then each section's array data aligned to SECTION_ALIGNMENT bytes.
+# Bump DATABASE_FORMAT_VERSION whenever sections are added, removed or change meaning,
+# so that wordnet_graph.open_database() rejects files built by older code.
+DATABASE_MAGIC = b'WORDPLAY'
+DATABASE_FORMAT_VERSION = 11
+DATABASE_HEADER = struct.Struct('<8sHcxIQI')  # magic, version, byte order, section count, payload size, payload crc32
+DATABASE_SECTION = struct.Struct('<24scxxxQQ')  # name, array typecode, offset, size in bytes
+SECTION_ALIGNMENT = 8
+
+# The WordNet files the database is built from, relative to the working directory. The build records their checksums,
+# in this order, so that prepare_outdated_database() rebuilds the database when they change.
+WORDNET_FILES = tuple(f'wordnet-db/{kind}.{pos}' for pos in POS_NAMES for kind in ('index', 'data'))
+
+UNREACHABLE_DISTANCE = 0xFFFF  # Antonym distance of synsets that cannot reach an antonym. Fits the 'H' column.
+UNTAGGED_SENSE_RANK = 0xFFFF  # Sense rank of synsets with no tagged word senses. Fits the 'H' column.
+
 
 def parse_index_files():
     """Creates a dictionary from WordNet index.pos files with words/collocations as the keys.
-Each key-value is a list of synset ids connected to the word/collocation in the key."""
+Each key-value is a list of synset ids connected to the word/collocation in the key.
+
+Also creates a dictionary of sense ranks with synset ids as the keys. Index files list the senses of each word
+most frequent first, and count how many of them were tagged in the semantic concordances. The sense rank of a synset
+is the lowest position of a tagged sense it is among its words' senses, 0 for a most frequent sense,
+or UNTAGGED_SENSE_RANK if none of its senses were tagged.
+Returns [index_dict, sense_ranks]."""
 
     index_dict = {}
+    sense_ranks = {}
 
     for pos in POS_KEY:
 
@@ -74,13 +130,18 @@ Each key-value is a list of synset ids connected to the word/collocation in the
 
             num_synsets = int(line_data_as_list[2])
             num_diff_pointers = int(line_data_as_list[3])
+            num_tagged_senses = int(line_data_as_list[5 + num_diff_pointers])
             for synset_index in range(num_synsets):
                 synset_num = line_data_as_list[6 + num_diff_pointers + synset_index]
                 synset_id = POS_KEY[pos] + synset_num
                 index_dict[word].append(synset_id)
+                sense_rank = UNTAGGED_SENSE_RANK
+                if synset_index < num_tagged_senses:
+                    sense_rank = synset_index
+                sense_ranks[synset_id] = min(sense_rank, sense_ranks.get(synset_id, UNTAGGED_SENSE_RANK))
 
     print('Parsed WordNet index files.')
-    return index_dict
+    return [index_dict, sense_ranks]
 
 
 def parse_data_files():
@@ -143,6 +204,41 @@ def parse_data_files():
     return data_dict
 
 
+def locate_glosses(wordnet_data):
+    """Adds the byte position and length of its gloss in its WordNet data.pos file to each synset, as 'gloss_location',
+so the database can leave glosses out and wordnet_graph.GlossStore can read them from the data files instead.
+Positions are measured, since the synset offsets don't match the byte offsets of every line of the data files.
+Returns [wordnet_data, file_sizes], with the size of each data file in POS_NAMES order, so that files changed since
+the build are detected."""
+
+    file_sizes = []
+    for pos in POS_NAMES:
+        path = 'wordnet-db/data.' + pos
+        position = 0
+        with open(path, 'rb') as file:
+            for line in file:
+                if line[:2] != b'  ':
+                    synset = wordnet_data[POS_KEY[pos] + line[:8].decode()]
+                    # Where parse_data_files() takes the gloss from: after '| ', up to the two spaces ending the line.
+                    gloss_start = line.index(b'|') + 2
+                    gloss_end = len(line.rstrip(b'\n')) - 2
+                    if line[gloss_start:gloss_end].decode() != synset['gloss']:
+                        raise ValueError(f'Gloss of {path} line at byte {position} does not match its parsed gloss.')
+                    synset['gloss_location'] = (position + gloss_start, gloss_end - gloss_start)
+                position += len(line)
+        file_sizes.append(position)
+
+    print('Located glosses in WordNet data files.')
+    return [wordnet_data, file_sizes]
+
+
+def add_sense_ranks(wordnet_data, sense_ranks):
+    for synset_id in wordnet_data:
+        wordnet_data[synset_id]['sense_rank'] = sense_ranks.get(synset_id, UNTAGGED_SENSE_RANK)
+    print('Added sense ranks.')
+    return wordnet_data
+
+
 def synset_ids_to_integers(wordnet_data, wordnet_index):
 
     new_wordnet_data = []
@@ -172,48 +268,65 @@ def synset_ids_to_integers(wordnet_data, wordnet_index):
     return [new_wordnet_data, new_wordnet_index]
 
 
-def add_word_pivots(wordnet_data, wordnet_index):
+def collect_word_senses(wordnet_data, wordnet_index):
+    """Returns a dictionary of each word of wordnet_index, in index order, to its senses: a tuple of
+(synset_id, word_num) for each of its synsets, in index order, where word_num is the position of the word
+in the synset's words. See format_index_word()."""
+
+    word_senses = {}
     for word in wordnet_index:
-        synset_list = wordnet_index[word]
-        if len(synset_list) < 2:
+        senses = []
+        for synset_id in wordnet_index[word]:
+            synset_words = [format_index_word(original_word) for original_word in wordnet_data[synset_id]['words']]
+            senses.append((synset_id, synset_words.index(word)))
+        word_senses[word] = tuple(senses)
+    print('Collected word senses.')
+    return word_senses
+
+
+def add_word_pivots(wordnet_data, word_senses):
+    """Adds a '?p' pointer each way between every two synsets of a word that aren't already joined by a pointer,
+after the pointers each synset already has, and records where they are in each synset's pointers as its
+'word_pivot_ranges', a dictionary of direction to (start, end).
+Only the build uses them, so that add_missing_pointers() and calculate_groups() treat synsets of one word as joined.
+The compiled database stores word nodes instead (see collect_word_nodes() and compile_graph())."""
+    pivot_starts = [{direction: len(synset[direction]) for direction in ('out', 'in')} for synset in wordnet_data]
+    for senses in word_senses.values():
+        if len(senses) < 2:
             continue
-        for synset_id in synset_list:
-            source_words = []
-            for original_word in wordnet_data[synset_id]['words']:
-                syntax_marker_removed = original_word.split('(', 1)[0]
-                lower_case = syntax_marker_removed.lower()
-                source_words.append(lower_case)
-            source_word_num = source_words.index(word)
-            synset_list_minus_self = list(synset_list)
-            synset_list_minus_self.remove(synset_id)
+        for synset_id, source_word_num in senses:
             existing_out_pointers = [pointer[1] for pointer in wordnet_data[synset_id]['out']]
             existing_in_pointers = [pointer[1] for pointer in wordnet_data[synset_id]['in']]
-            for pointer_id in synset_list_minus_self:
-                target_words = []
-                for original_word in wordnet_data[pointer_id]['words']:
-                    syntax_marker_removed = original_word.split('(', 1)[0]
-                    lower_case = syntax_marker_removed.lower()
-                    target_words.append(lower_case)
-                target_word_num = target_words.index(word)
+            for pointer_id, target_word_num in senses:
+                if pointer_id == synset_id:
+                    continue
                 if pointer_id not in existing_out_pointers:
                     out_pointer = ['?p', pointer_id, source_word_num, target_word_num]
                     wordnet_data[synset_id]['out'].append(out_pointer)
                 if pointer_id not in existing_in_pointers:
                     in_pointer = ['?p', pointer_id, target_word_num, source_word_num]
                     wordnet_data[synset_id]['in'].append(in_pointer)
+    for synset_id, synset in enumerate(wordnet_data):
+        synset['word_pivot_ranges'] = {direction: (pivot_starts[synset_id][direction], len(synset[direction]))
+                                       for direction in ('out', 'in')}
     print('Added word pivots.')
     return wordnet_data
 
 
+def collect_word_nodes(word_senses):
+    """Returns the word nodes that stand in for the word pivots of add_word_pivots() in the compiled database:
+the senses of each word of more than one synset, in index order (see collect_word_senses()).
+A word pivot from one synset of a word to another is the path synset -> word node -> synset, so a word of n synsets
+takes n entries instead of n * (n - 1) pointers each way."""
+
+    word_nodes = [senses for senses in word_senses.values() if len(senses) >= 2]
+    print(f'Collected {len(word_nodes)} word nodes.')
+    return word_nodes
+
+
 def add_missing_pointers(wordnet_data):
 
-    pointer_reflexes = {
-        '?p': '?p', '!': '!', '&': '&', '$': '$', '=': '=', '+': '+',
-        '@': '~', '~': '@', '@i': '~i', '~i': '@i',
-        '#m': '%m', '%m': '#m', '#s': '%s', '%s': '#s', '#p': '%p', '%p': '#p',
-        ';c': '-c', '-c': ';c', ';r': '-r', '-r': ';r', ';u': '-u', '-u': ';u',
-        '<': '<x', '<x': '<', '\\': '\\x', '\\x': '\\', '*': '*x', '*x': '*', '>': '>x', '>x': '>',
-    }
+    pointer_reflexes = POINTER_REFLEXES
 
     missing_reflex_pointer_count = {}
 
@@ -365,95 +478,153 @@ def calculate_groups(wordnet_data):
     return wordnet_data
 
 
-def create_group_map(wordnet_data):
+def calculate_components(wordnet_data):
+    """Labels every synset with a component id, so that reachability between synsets is a comparison of ints.
 
-    # INITIALIZE GROUP MAP
+Pointers that have a pointer back (most do, after add_missing_pointers) are merged with union-find into components
+whose synsets can all reach each other. The few one-way pointers left (some 'also see' pointers) are recorded
+as reach between components instead. Pointer types are filtered the same way find_connection.get_tree() filters them.
 
-    group_map = {}
-    for synset in wordnet_data:
+Returns [components, component_reach]. Components is a list of component ids indexed by synset_id, numbered from 0.
+Component_reach is a dictionary of component id to the set of other components reachable through one-way pointers;
+components without one-way pointers out of them are left out."""
 
-        group_id = synset[0]
-        if group_id not in group_map:
-            group_map[group_id] = [set(), set()]  # First list is direct connections; second is distant connections.
+    def find(synset_id):
+        while union_parents[synset_id] != synset_id:
+            union_parents[synset_id] = union_parents[union_parents[synset_id]]  # Path halving.
+            synset_id = union_parents[synset_id]
+        return synset_id
 
+    pointer_ids = []
+    for synset in wordnet_data:
+        synset_pointer_ids = set()
         for pointer in synset[4]:
-
-            pointer_type = pointer[0]
-            pointer_id = pointer[1]
-            pointer_group_id = wordnet_data[pointer_id][0]
-
-            if pointer_group_id == group_id or pointer_type in POINTER_TYPES_TO_IGNORE:
+            if pointer[0] in POINTER_TYPES_TO_IGNORE:
                 continue
-            if IGNORE_ANTONYMS and pointer_type == '!':
+            if IGNORE_ANTONYMS and pointer[0] == '!':
                 continue
+            synset_pointer_ids.add(pointer[1])
+        pointer_ids.append(synset_pointer_ids)
 
-            group_map[group_id][0].add(pointer_group_id)
-
-    # ADD CONNECTIONS AT ALL DEPTHS
+    union_parents = list(range(len(wordnet_data)))
+    one_way_pointers = []
+    for synset_id in range(len(wordnet_data)):
+        for pointer_id in pointer_ids[synset_id]:
+            if synset_id in pointer_ids[pointer_id]:
+                root_a = find(synset_id)
+                root_b = find(pointer_id)
+                if root_a != root_b:
+                    union_parents[root_a] = root_b
+            else:
+                one_way_pointers.append((synset_id, pointer_id))
 
-    for group_id in group_map:
-        vanguard = group_map[group_id][0]
-        while True:
+    component_ids_by_root = {}
+    components = []
+    for synset_id in range(len(wordnet_data)):
+        root = find(synset_id)
+        if root not in component_ids_by_root:
+            component_ids_by_root[root] = len(component_ids_by_root)
+        components.append(component_ids_by_root[root])
+
+    adjacent_components = {}
+    for synset_id, pointer_id in one_way_pointers:
+        if components[synset_id] != components[pointer_id]:
+            adjacent_components.setdefault(components[synset_id], set()).add(components[pointer_id])
+
+    component_reach = {}
+    for component_id in adjacent_components:
+        reach = set()
+        vanguard = [component_id]
+        while len(vanguard) > 0:
             new_vanguard = []
-            for vanguard_group_id in vanguard:
-                for pointer in group_map[vanguard_group_id][0]:
-                    if pointer not in group_map[group_id][0] and pointer not in group_map[group_id][1]:
-                        group_map[group_id][1].add(pointer)
-                        new_vanguard.append(pointer)
-            if len(new_vanguard) != 0:
-                vanguard = new_vanguard
-            else:
+            for vanguard_component_id in vanguard:
+                for adjacent_component_id in adjacent_components.get(vanguard_component_id, ()):
+                    if adjacent_component_id not in reach:
+                        reach.add(adjacent_component_id)
+                        new_vanguard.append(adjacent_component_id)
+            vanguard = new_vanguard
+        reach.discard(component_id)
+        component_reach[component_id] = reach
+
+    component_sizes = {}
+    for component_id in components:
+        component_sizes[component_id] = component_sizes.get(component_id, 0) + 1
+    sizes = sorted(component_sizes.values(), reverse=True)
+    print(f'Calculated {len(sizes)} components.')
+    print('Largest component sizes:', sizes[:5])
+    print('Single-synset components:', sizes.count(1))
+    print(f'One-way pointers: {len(one_way_pointers)}, giving {len(component_reach)} components '
+          f'reach into {sum(len(reach) for reach in component_reach.values())} others.')
+
+    return [components, component_reach]
+
+
+def find_components_with_opposites(wordnet_data, components, component_reach):
+    """Returns a list indexed by component id of booleans for if the component can reach a synset with an antonym."""
+
+    antonym_in_component = [False] * (max(components) + 1)
+    for synset_id in range(len(wordnet_data)):
+        synset = wordnet_data[synset_id]
+        if len(synset[4]) > 0:
+            if synset[4][0][0] == '!':
+                antonym_in_component[components[synset_id]] = True
+
+    antonym_reachable_from_component = []
+    for component_id in range(len(antonym_in_component)):
+        reachable = antonym_in_component[component_id]
+        for reachable_component_id in component_reach.get(component_id, ()):
+            if antonym_in_component[reachable_component_id]:
+                reachable = True
                 break
+        antonym_reachable_from_component.append(reachable)
 
-    return group_map
+    return antonym_reachable_from_component
 
 
-def group_map_to_tuples(group_map):
-    tuple_group_map = {}
-    for group_id in group_map:
-        adjacent_groups = group_map[group_id][0]
-        distant_groups = group_map[group_id][1]
-        tuple_group_map[group_id] = (adjacent_groups, distant_groups)
-    return tuple_group_map
+def calculate_antonym_distances(wordnet_data):
+    """Returns a list indexed by synset_id of the number of pointers find_opposite needs to follow from the synset
+to reach an antonym: 1 for synsets with an antonym pointer, 2 for synsets pointing to those, and so on.
+Synsets that cannot reach an antonym get UNREACHABLE_DISTANCE.
 
+Calculated with a breadth-first search backwards from every synset with an antonym at once,
+over the pointer types find_opposite.get_tree_to_nearest_antonyms() follows. Pointer sequences it ignores are
+still followed here, so a distance is never more than the search really needs, which is what lets the search
+skip synsets that are too far from an antonym."""
 
-def find_groups_without_opposites(wordnet_data, group_map):
+    distances = [UNREACHABLE_DISTANCE] * len(wordnet_data)
+    pointing_synset_ids = [[] for _ in range(len(wordnet_data))]
+    vanguard = []
 
-    antonym_in_group = {}  # Each key-value is a boolean for if group has an antonym.
-    for synset in wordnet_data:
-        group_num = synset[0]
-        if group_num not in antonym_in_group:
-            antonym_in_group[group_num] = False
-        if len(synset[4]) > 0:
-            if synset[4][0][0] == '!':
-                antonym_in_group[group_num] = True
+    for synset_id in range(len(wordnet_data)):
+        for pointer in wordnet_data[synset_id][4]:
+            if pointer[0] in POINTER_TYPES_TO_IGNORE or pointer[0] == '?p':
+                continue
+            if pointer[0] == '!':
+                if distances[synset_id] != 1:
+                    distances[synset_id] = 1
+                    vanguard.append(synset_id)
+            else:
+                pointing_synset_ids[pointer[1]].append(synset_id)
 
-    antonym_reachable_from_group = {}  # Each key-value is a boolean for if group can reach an antonym.
-    for group_num in antonym_in_group:
-        if not antonym_in_group[group_num]:
-            if group_num not in antonym_reachable_from_group:
-                antonym_reachable_from_group[group_num] = False
-        else:
-            antonym_reachable_from_group[group_num] = True
-            continue
-        if not antonym_reachable_from_group[group_num]:
-            for adjacent_group in group_map[group_num][0]:
-                if antonym_in_group[adjacent_group]:
-                    antonym_reachable_from_group[group_num] = True
-                    break
-        if not antonym_reachable_from_group[group_num]:
-            for distant_group in group_map[group_num][1]:
-                if antonym_in_group[distant_group]:
-                    antonym_reachable_from_group[group_num] = True
-                    break
-
-    groups_without_opposites = set()
-    for group_num in antonym_reachable_from_group:
-        if not antonym_reachable_from_group[group_num]:
-            groups_without_opposites.add(group_num)
-
-    with open("groups-without-opposites.pkl", "wb") as file:
-        pickle.dump(tuple(groups_without_opposites), file)
+    distance = 1
+    while len(vanguard) > 0:
+        distance = min(distance + 1, UNREACHABLE_DISTANCE - 1)
+        new_vanguard = []
+        for synset_id in vanguard:
+            for pointing_synset_id in pointing_synset_ids[synset_id]:
+                if distances[pointing_synset_id] == UNREACHABLE_DISTANCE:
+                    distances[pointing_synset_id] = distance
+                    new_vanguard.append(pointing_synset_id)
+        vanguard = new_vanguard
+
+    distance_counts = {}
+    for distance in distances:
+        distance_counts[distance] = distance_counts.get(distance, 0) + 1
+    print('Calculated antonym distances.')
+    print('Synsets at each antonym distance:',
+          {distance: distance_counts[distance] for distance in sorted(distance_counts)})
+
+    return distances
 
 
 def pointers_to_tuples(data_db):
@@ -469,63 +640,347 @@ def pointers_to_tuples(data_db):
 def synset_dict_to_tuple(data_db):
     new_data_db = []
     for synset in data_db:
-        synset_tuple = (synset['group'], synset['pos'], synset['gloss'], synset['words'], synset['out'], synset['in'])
+        synset_tuple = (synset['group'], synset['pos'], synset['gloss'], synset['words'], synset['out'], synset['in'],
+                        synset['sense_rank'], synset['gloss_location'], synset['word_pivot_ranges'])
         new_data_db.append(synset_tuple)
     print('Converted dictionary to tuples.')
     return tuple(new_data_db)
 
 
-def write_data_files(data_db, num_synsets_each_file=200000):
+def format_display_word(word):
+    """Returns word as shown on result pages, with spaces for underscores and without any syntactic marker,
+e.g. 'galore(ip)' becomes 'galore'."""
+    return word.replace('_', ' ').split('(')[0]
 
-    file_num = 0
-    need_another_file = True
 
-    while need_another_file:
-        start_index = file_num * num_synsets_each_file
-        end_index = start_index + num_synsets_each_file
-        if end_index > len(data_db):
-            end_index = len(data_db)
-            need_another_file = False
-        data_db_slice = data_db[start_index:end_index]
-        with open(f"wordnet-data-{file_num}.pkl", "wb") as file:
-            pickle.dump(data_db_slice, file)
-        file_num += 1
+def format_index_word(word):
+    """Returns word as the index lists it, and as searches look it up: lower case and without any syntactic marker,
+e.g. 'Galore(ip)' becomes 'galore'."""
+    return word.split('(', 1)[0].lower()
 
 
-def prepare_database():
+def compile_strings(strings):
+    """Encodes a sequence of strings as one UTF-8 byte array plus an array of offsets into it.
+String number i is text[offsets[i]:offsets[i + 1]]."""
+    offsets = array('I', [0])
+    text = bytearray()
+    for string in strings:
+        text += string.encode()
+        offsets.append(len(text))
+    return offsets, array('B', text)
 
-    print('Started prepare_database().')
 
-    index_db = parse_index_files()
-    data_db = parse_data_files()
+def compile_graph(data_db):
+    """Packs the tuple database into flat array columns, one entry per synset or per pointer.
+Pointers of each direction are stored in CSR form: the pointers of synset_id are the entries
+from offsets[synset_id] up to offsets[synset_id + 1] of the targets, types, source_words and target_words columns.
+The word pivots add_word_pivots() added are left out, since the word nodes of compile_word_nodes() stand in for them.
+Searches follow the word pivots of synset_id just before entry pivot_starts[synset_id], after the pointers it had
+before them, and add_missing_pointers() added later ones, '?p' pointers included, after them. Glosses are left out too:
+gloss_starts and gloss_lengths locate each synset's gloss in the data file of its part of speech (see locate_glosses()).
+Returns the columns as a dictionary of database file sections, read back by wordnet_graph.WordnetGraph."""
 
-    data_index_new_ids = synset_ids_to_integers(data_db, index_db)  # Index converted from lists to tuples here.
-    data_db_new_ids = data_index_new_ids[0]
-    index_db_new_ids = data_index_new_ids[1]
+    pos_codes = {pos: code for code, pos in enumerate(POS_NAMES)}
 
-    data_db_plus_word_pivots = add_word_pivots(data_db_new_ids, index_db_new_ids)
-    data_db_plus_missing_pointers = add_missing_pointers(data_db_plus_word_pivots)
-    data_db_plus_groups = calculate_groups(data_db_plus_missing_pointers)
-    data_db_all_tuples = tuple(pointers_to_tuples(data_db_plus_groups))
-    data_db_no_dict = synset_dict_to_tuple(data_db_all_tuples)
+    graph = {
+        'group': array('i'),
+        'pos': array('B'),
+        'sense_rank': array('H'),
+        'gloss_starts': array('I'),
+        'gloss_lengths': array('H'),
+    }
+    for direction in ('out', 'in'):
+        graph[f'{direction}_offsets'] = array('I', [0])
+        graph[f'{direction}_targets'] = array('I')
+        graph[f'{direction}_types'] = array('B')
+        graph[f'{direction}_source_words'] = array('b')
+        graph[f'{direction}_target_words'] = array('b')
+        graph[f'{direction}_pivot_starts'] = array('I')
 
-    with open('wordnet-index.pkl', 'wb') as file:
-        pickle.dump(index_db_new_ids, file)
-    print('Created wordnet-index.pkl')
+    for synset in data_db:
+        graph['group'].append(synset[0])
+        graph['pos'].append(pos_codes[synset[1]])
+        graph['sense_rank'].append(synset[6])
+        graph['gloss_starts'].append(synset[7][0])
+        graph['gloss_lengths'].append(synset[7][1])
+        for direction, pointers in (('out', synset[4]), ('in', synset[5])):
+            pivot_start, pivot_end = synset[8][direction]
+            graph[f'{direction}_pivot_starts'].append(len(graph[f'{direction}_targets']) + pivot_start)
+            for pointer_num, pointer in enumerate(pointers):
+                if pivot_start <= pointer_num < pivot_end:
+                    continue
+                graph[f'{direction}_types'].append(POINTER_CODES[pointer[0]])
+                graph[f'{direction}_targets'].append(pointer[1])
+                graph[f'{direction}_source_words'].append(pointer[2])
+                graph[f'{direction}_target_words'].append(pointer[3])
+            graph[f'{direction}_offsets'].append(len(graph[f'{direction}_targets']))
+
+    # Words never contain spaces (collocations are joined with underscores), so a space separates them.
+    graph['words_offsets'], graph['words_text'] = compile_strings(' '.join(synset[3]) for synset in data_db)
+    graph['lower_words_offsets'], graph['lower_words_text'] = compile_strings(
+        ' '.join(format_index_word(word) for word in synset[3]) for synset in data_db)
+    # Display words can contain spaces, so a newline separates them.
+    graph['display_words_offsets'], graph['display_words_text'] = compile_strings(
+        '\n'.join(format_display_word(word) for word in synset[3]) for synset in data_db)
+
+    print('Compiled graph columns.')
+    return graph
+
+
+def compile_word_nodes(word_nodes, data_db):
+    """Packs the word nodes of collect_word_nodes() into sections in CSR form, both ways:
+the synsets of word node i are the entries from word_node_offsets[i] up to word_node_offsets[i + 1]
+of word_node_synsets, with the position of the word in each in word_node_word_nums, and the word nodes of synset_id
+are the entries from pivot_offsets[synset_id] up to pivot_offsets[synset_id + 1] of pivot_word_nodes, in word node
+order, with the position of each word in the synset in pivot_word_nums.
+A synset has no word pivot to a synset it had a pointer to before add_word_pivots() added its word pivots.
+The entries of word_node_synsets pivot entry i skips for that reason in each direction are the entries
+from {direction}_pivot_skip_offsets[i] up to {direction}_pivot_skip_offsets[i + 1] of {direction}_pivot_skips."""
+
+    compiled = {
+        'word_node_offsets': array('I', [0]),
+        'word_node_synsets': array('I'),
+        'word_node_word_nums': array('b'),
+        'pivot_offsets': array('I', [0]),
+        'pivot_word_nodes': array('I'),
+        'pivot_word_nums': array('b'),
+    }
+    for direction in ('out', 'in'):
+        compiled[f'{direction}_pivot_skip_offsets'] = array('I', [0])
+        compiled[f'{direction}_pivot_skips'] = array('I')
+    synset_pivots = [[] for _ in range(len(data_db))]
+    for word_node_num, word_node in enumerate(word_nodes):
+        for synset_id, word_num in word_node:
+            compiled['word_node_synsets'].append(synset_id)
+            compiled['word_node_word_nums'].append(word_num)
+            synset_pivots[synset_id].append((word_node_num, word_num))
+        compiled['word_node_offsets'].append(len(compiled['word_node_synsets']))
+    for synset_id, pivots in enumerate(synset_pivots):
+        synset = data_db[synset_id]
+        earlier_pointer_ids = {}
+        for direction, pointers in (('out', synset[4]), ('in', synset[5])):
+            earlier_pointer_ids[direction] = {pointer[1] for pointer in pointers[:synset[8][direction][0]]}
+        for word_node_num, word_num in pivots:
+            compiled['pivot_word_nodes'].append(word_node_num)
+            compiled['pivot_word_nums'].append(word_num)
+            for direction in ('out', 'in'):
+                sense_indexes = range(compiled['word_node_offsets'][word_node_num],
+                                      compiled['word_node_offsets'][word_node_num + 1])
+                for sense_index in sense_indexes:
+                    pivot_synset_id = compiled['word_node_synsets'][sense_index]
+                    if pivot_synset_id != synset_id and pivot_synset_id in earlier_pointer_ids[direction]:
+                        compiled[f'{direction}_pivot_skips'].append(sense_index)
+                compiled[f'{direction}_pivot_skip_offsets'].append(len(compiled[f'{direction}_pivot_skips']))
+        compiled['pivot_offsets'].append(len(compiled['pivot_word_nodes']))
+    print('Compiled word node columns.')
+    return compiled
+
+
+def compile_search_views(graph):
+    """Copies the pointer columns of the graph columns built by compile_graph() into the columns of each search view
+of SEARCH_VIEWS, leaving out the pointers of the types the view's search never follows.
+The columns of each view and direction are in the same CSR form as the graph's, with section names prefixed
+by the view name, e.g. connect_out_offsets, so a search never has to check those types. Each view has pivot_starts
+too, the entries its synsets' word pivots come before (see compile_graph())."""
+
+    views = {}
+    column_names = ('targets', 'types', 'source_words', 'target_words')
+    for view, (directions, types_to_ignore) in SEARCH_VIEWS.items():
+        codes_to_ignore = {POINTER_CODES[symbol] for symbol in types_to_ignore}
+        for direction in directions:
+            offsets = graph[f'{direction}_offsets']
+            types = graph[f'{direction}_types']
+            pivot_starts = graph[f'{direction}_pivot_starts']
+            view_columns = {'offsets': array('I', [0]), 'pivot_starts': array('I')}
+            for column_name in column_names:
+                view_columns[column_name] = array(graph[f'{direction}_{column_name}'].typecode)
+            for synset_id in range(len(offsets) - 1):
+                for index in range(offsets[synset_id], offsets[synset_id + 1]):
+                    if index == pivot_starts[synset_id]:
+                        view_columns['pivot_starts'].append(len(view_columns['targets']))
+                    if types[index] in codes_to_ignore:
+                        continue
+                    for column_name in column_names:
+                        view_columns[column_name].append(graph[f'{direction}_{column_name}'][index])
+                if pivot_starts[synset_id] == offsets[synset_id + 1]:
+                    view_columns['pivot_starts'].append(len(view_columns['targets']))
+                view_columns['offsets'].append(len(view_columns['targets']))
+            for column_name, values in view_columns.items():
+                views[f'{view}_{direction}_{column_name}'] = values
+    print('Compiled search views.')
+    return views
+
+
+def compile_index(word_senses):
+    """Packs the word senses of collect_word_senses() into sections sorted by UTF-8 encoded word, so words can be found
+by binary search. The senses of word number i are the entries from synset_offsets[i] up to synset_offsets[i + 1]
+of index_synsets, with the position of the word in each synset in index_word_nums."""
+
+    words = sorted(word_senses, key=str.encode)
+    index = {'index_synset_offsets': array('I', [0]), 'index_synsets': array('I'), 'index_word_nums': array('b')}
+    index['index_word_offsets'], index['index_words'] = compile_strings(words)
+    for word in words:
+        for synset_id, word_num in word_senses[word]:
+            index['index_synsets'].append(synset_id)
+            index['index_word_nums'].append(word_num)
+        index['index_synset_offsets'].append(len(index['index_synsets']))
+    print('Compiled index columns.')
+    return index
+
+
+def compile_components(components, component_reach, components_with_opposites):
+    """Packs component labels into a column indexed by synset_id, with each component's one-way reach
+stored in CSR form as sorted component ids, and a column of flags for components that can reach an antonym."""
+
+    compiled = {
+        'component': array('I', components),
+        'component_reach_offsets': array('I', [0]),
+        'component_reach': array('I'),
+        'component_opposites': array('B', components_with_opposites),
+    }
+    for component_id in range(max(components) + 1):
+        compiled['component_reach'].extend(sorted(component_reach.get(component_id, ())))
+        compiled['component_reach_offsets'].append(len(compiled['component_reach']))
+    print('Compiled component columns.')
+    return compiled
+
+
+def write_database_file(sections, path):
+    """Writes array sections to a single binary file that wordnet_graph.open_database() memory-maps.
+Sections is a dictionary of section name to array.array. The header records the format version,
+the byte order the arrays were written in, and a CRC32 checksum of everything after the header.
+The file is written next to path and then moved over it, so processes that have the old file mapped keep reading it."""
+
+    table_size = DATABASE_SECTION.size * len(sections)
+    data_start = DATABASE_HEADER.size + table_size
+    section_table = bytearray()
+    data = bytearray()
+    for name, values in sections.items():
+        data += bytes(-(data_start + len(data)) % SECTION_ALIGNMENT)  # Pad so every section is aligned.
+        section_table += DATABASE_SECTION.pack(
+            name.encode(), values.typecode.encode(), data_start + len(data), len(values) * values.itemsize)
+        data += values.tobytes()
+
+    payload = section_table + data
+    byte_order = {'little': b'<', 'big': b'>'}[sys.byteorder]
+    header = DATABASE_HEADER.pack(
+        DATABASE_MAGIC, DATABASE_FORMAT_VERSION, byte_order, len(sections), len(payload), zlib.crc32(payload))
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'wb') as file:
+        file.write(header)
+        file.write(payload)
+    os.replace(temporary_path, path)
+
+
+def check_wordnet_files():
+    """Raises FileNotFoundError naming every file of WORDNET_FILES that is missing, since the database can't be built
+without them, and the web app reads glosses from the data files."""
+
+    missing_files = [path for path in WORDNET_FILES if not os.path.isfile(path)]
+    if len(missing_files) > 0:
+        raise FileNotFoundError(f'Missing WordNet files: {", ".join(missing_files)}. Copy them from the dict directory '
+                                f'of the WordNet 3.0 database files into wordnet-db before building the database.')
+
+
+def calculate_wordnet_file_checksums():
+    """Returns the CRC32 checksum of each file of WORDNET_FILES, in order."""
+
+    checksums = []
+    for path in WORDNET_FILES:
+        with open(path, 'rb') as file:
+            checksums.append(zlib.crc32(file.read()))
+    return checksums
+
+
+def run_stage(stage_timings, stage, function, *args):
+    """Returns function(*args), recording the seconds it took as stage_timings[stage] if stage_timings is a dict."""
+    start_time = time.perf_counter()
+    result = function(*args)
+    if stage_timings is not None:
+        stage_timings[stage] = time.perf_counter() - start_time
+    return result
+
+
+def prepare_database(path='wordnet-graph.bin', stage_timings=None):
+    """Builds the database file at path from the WordNet files in wordnet-db.
+If stage_timings is a dict, the seconds each stage of the build took are recorded in it by function name.
+Raises FileNotFoundError if any of them is missing (see check_wordnet_files())."""
+
+    print('Started prepare_database().')
+    check_wordnet_files()
 
-    write_data_files(data_db_no_dict)
-    print('Created wordnet-data-X.pkl')
+    index_db_sense_ranks = run_stage(stage_timings, 'parse_index_files', parse_index_files)
+    index_db = index_db_sense_ranks[0]
+    data_db = run_stage(stage_timings, 'parse_data_files', parse_data_files)
+    data_db_file_sizes = run_stage(stage_timings, 'locate_glosses', locate_glosses, data_db)
+    data_db = data_db_file_sizes[0]
+    data_db = run_stage(stage_timings, 'add_sense_ranks', add_sense_ranks, data_db, index_db_sense_ranks[1])
 
-    group_map = create_group_map(data_db_no_dict)
-    group_map_all_tuples = group_map_to_tuples(group_map)
-    with open("group-map.pkl", "wb") as file:
-        pickle.dump(group_map_all_tuples, file)
-    print('Created group-map.pkl')
+    # Index converted from lists to tuples here.
+    data_index_new_ids = run_stage(stage_timings, 'synset_ids_to_integers', synset_ids_to_integers, data_db, index_db)
+    data_db_new_ids = data_index_new_ids[0]
+    index_db_new_ids = data_index_new_ids[1]
 
-    find_groups_without_opposites(data_db_no_dict, group_map_all_tuples)
-    print('Created groups-without-opposites.pkl')
+    word_senses = run_stage(
+        stage_timings, 'collect_word_senses', collect_word_senses, data_db_new_ids, index_db_new_ids)
+    data_db_plus_word_pivots = run_stage(
+        stage_timings, 'add_word_pivots', add_word_pivots, data_db_new_ids, word_senses)
+    data_db_plus_missing_pointers = run_stage(
+        stage_timings, 'add_missing_pointers', add_missing_pointers, data_db_plus_word_pivots)
+    data_db_plus_groups = run_stage(stage_timings, 'calculate_groups', calculate_groups, data_db_plus_missing_pointers)
+    data_db_all_tuples = tuple(run_stage(stage_timings, 'pointers_to_tuples', pointers_to_tuples, data_db_plus_groups))
+    data_db_no_dict = run_stage(stage_timings, 'synset_dict_to_tuple', synset_dict_to_tuple, data_db_all_tuples)
+
+    word_nodes = run_stage(stage_timings, 'collect_word_nodes', collect_word_nodes, word_senses)
+
+    components, component_reach = run_stage(
+        stage_timings, 'calculate_components', calculate_components, data_db_no_dict)
+    components_with_opposites = run_stage(stage_timings, 'find_components_with_opposites',
+                                          find_components_with_opposites, data_db_no_dict, components, component_reach)
+    antonym_distances = run_stage(stage_timings, 'calculate_antonym_distances', calculate_antonym_distances,
+                                  data_db_no_dict)
+
+    sections = run_stage(stage_timings, 'compile_graph', compile_graph, data_db_no_dict)
+    sections.update(run_stage(stage_timings, 'compile_search_views', compile_search_views, sections))
+    sections.update(run_stage(stage_timings, 'compile_word_nodes', compile_word_nodes, word_nodes, data_db_no_dict))
+    sections.update(run_stage(stage_timings, 'compile_index', compile_index, word_senses))
+    sections.update(run_stage(stage_timings, 'compile_components', compile_components,
+                              components, component_reach, components_with_opposites))
+    sections['antonym_distance'] = array('H', antonym_distances)
+    sections['data_file_sizes'] = array('Q', data_db_file_sizes[1])
+    sections['wordnet_file_checksums'] = array('I', run_stage(
+        stage_timings, 'calculate_wordnet_file_checksums', calculate_wordnet_file_checksums))
+    run_stage(stage_timings, 'write_database_file', write_database_file, sections, path)
+    print(f'Created {path}')
 
     print('Completed prepare_database().')
 
 
-# prepare_database()
+def prepare_outdated_database(path='wordnet-graph.bin'):
+    """Builds the database file at path with prepare_database() unless wordnet_graph.open_database() accepts the file
+already there and it was built from the WordNet files as they are now. A missing file is built, and so is one with
+an older DATABASE_FORMAT_VERSION, a bad checksum, or WordNet file checksums that differ from the current files'.
+Raises FileNotFoundError if any WordNet file is missing, even if the database file is up to date."""
+
+    import wordnet_graph  # Imported here, since wordnet_graph imports this module.
+
+    check_wordnet_files()
+    try:
+        sections = wordnet_graph.open_database(path)
+    except (OSError, ValueError, wordnet_graph.DatabaseFileError) as error:
+        print(f'Rebuilding the database: {error}')
+        prepare_database(path)
+        return
+    if list(sections['wordnet_file_checksums']) != calculate_wordnet_file_checksums():
+        print(f'Rebuilding the database: the WordNet files changed since {path} was built.')
+        prepare_database(path)
+    else:
+        print(f'{path} is up to date.')
+
+
+if __name__ == '__main__':
+    # Deploys build the database file before starting, since it isn't committed (see bin/post_compile).
+    try:
+        prepare_outdated_database()
+    except FileNotFoundError as error:
+        sys.exit(str(error))
@@ -0,0 +1,165 @@
+import json
+import os
+import time
+from bisect import bisect_left
+from threading import Lock
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SYNSETS_VISITED_BUCKETS = (10, 30, 100, 300, 1000, 3000, 10000, 30000, 100000)
+PATH_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class MetricsRegistry:
+    """In-process counters, gauges and histograms, rendered in the Prometheus text format by render().
+
+Metrics are registered by name with counter(), gauge() or histogram(), then updated with labels given as a tuple
+of (label_name, label_value) pairs. Collectors added with add_collector() are called when a snapshot is taken,
+and return (name, labels, value) samples that replace the values of their counters or gauges, e.g. totals kept by
+other objects.
+
+If directory is set, each process writes its snapshot to its own file in it, at most every write_seconds when
+maybe_write() is called, and render() merges the snapshots of every process: counters and histograms are summed
+and gauges take the largest value. Clear the directory when the server starts.
+Counts from before a fork are left to the parent process, so workers forked from it don't count them again."""
+
+    def __init__(self, directory=None, write_seconds=5.0):
+        self.directory = directory
+        self.write_seconds = write_seconds
+        self.lock = Lock()
+        self.metrics = {}
+        self.values = {}
+        self.collectors = []
+        self.snapshot_path = None
+        self.snapshot_pid = None
+        self.last_write = 0.0
+        os.register_at_fork(after_in_child=self.forget_inherited_counts)
+
+    def forget_inherited_counts(self):
+        self.lock = Lock()  # A thread of the parent process may have held the lock when it forked.
+        self.values = {key: value for key, value in self.values.items() if self.metrics[key[0]]['type'] == 'gauge'}
+        self.last_write = 0.0
+
+    def register(self, name, metric_type, help_text, buckets=()):
+        self.metrics[name] = {'type': metric_type, 'help': help_text, 'buckets': tuple(buckets)}
+
+    def counter(self, name, help_text):
+        self.register(name, 'counter', help_text)
+
+    def gauge(self, name, help_text):
+        self.register(name, 'gauge', help_text)
+
+    def histogram(self, name, help_text, buckets):
+        self.register(name, 'histogram', help_text, buckets)
+
+    def add_collector(self, collect):
+        self.collectors.append(collect)
+
+    def inc(self, name, labels=(), amount=1):
+        with self.lock:
+            self.values[(name, labels)] = self.values.get((name, labels), 0) + amount
+
+    def set(self, name, value, labels=()):
+        with self.lock:
+            self.values[(name, labels)] = value
+
+    def observe(self, name, value, labels=()):
+        buckets = self.metrics[name]['buckets']
+        bucket_num = bisect_left(buckets, value)  # Buckets are upper bounds, and the last count is for +Inf.
+        with self.lock:
+            histogram = self.values.get((name, labels))
+            if histogram is None:
+                histogram = [[0] * (len(buckets) + 1), 0.0]
+                self.values[(name, labels)] = histogram
+            histogram[0][bucket_num] += 1
+            histogram[1] += value
+
+    def snapshot(self):
+        """Returns the values of this process as a list of [name, labels, value], which can be written as JSON."""
+        with self.lock:
+            values = {key: [list(value[0]), value[1]] if isinstance(value, list) else value
+                      for key, value in self.values.items()}
+        for collect in self.collectors:
+            for name, labels, value in collect():
+                values[(name, labels)] = value
+        return [[name, [list(label) for label in labels], value] for (name, labels), value in values.items()]
+
+    def maybe_write(self):
+        """Writes this process's snapshot file if write_seconds have passed since it was last written."""
+        if self.directory is not None and time.monotonic() - self.last_write >= self.write_seconds:
+            self.write_snapshot()
+
+    def write_snapshot(self):
+        if self.snapshot_pid != os.getpid():
+            # A new file per process, even if the pid was used by an earlier worker whose counts are still wanted.
+            self.snapshot_pid = os.getpid()
+            self.snapshot_path = os.path.join(self.directory, f'metrics-{self.snapshot_pid}-{time.time_ns()}.json')
+        self.last_write = time.monotonic()
+        temporary_path = self.snapshot_path + '.tmp'
+        with open(temporary_path, 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(temporary_path, self.snapshot_path)  # Readers never see a partly written file.
+
+    def read_snapshots(self):
+        if self.directory is None:
+            return [self.snapshot()]
+        self.write_snapshot()
+        snapshots = []
+        for file_name in os.listdir(self.directory):
+            if file_name.startswith('metrics-') and file_name.endswith('.json'):
+                try:
+                    with open(os.path.join(self.directory, file_name)) as file:
+                        snapshots.append(json.load(file))
+                except (OSError, ValueError):
+                    continue
+        return snapshots
+
+    def merged_values(self):
+        values = {}
+        for snapshot in self.read_snapshots():
+            for name, labels, value in snapshot:
+                if name not in self.metrics:
+                    continue
+                key = (name, tuple(tuple(label) for label in labels))
+                metric_type = self.metrics[name]['type']
+                if key not in values:
+                    values[key] = [list(value[0]), value[1]] if metric_type == 'histogram' else value
+                elif metric_type == 'histogram':
+                    values[key][0] = [count + added for count, added in zip(values[key][0], value[0])]
+                    values[key][1] += value[1]
+                elif metric_type == 'counter':
+                    values[key] += value
+                else:
+                    values[key] = max(values[key], value)
+        return values
+
+    def render(self):
+        """Returns the merged metrics of every process in the Prometheus text exposition format."""
+        values = self.merged_values()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric["help"]}')
+            lines.append(f'# TYPE {name} {metric["type"]}')
+            for (value_name, labels), value in sorted(values.items()):
+                if value_name != name:
+                    continue
+                if metric['type'] != 'histogram':
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+                    continue
+                cumulative_count = 0
+                for bound, count in zip(metric['buckets'] + ('+Inf',), value[0]):
+                    cumulative_count += count
+                    lines.append(f'{name}_bucket{format_labels(labels + (("le", str(bound)),))} {cumulative_count}')
+                lines.append(f'{name}_sum{format_labels(labels)} {value[1]}')
+                lines.append(f'{name}_count{format_labels(labels)} {cumulative_count}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if len(labels) == 0:
+        return ''
+    label_texts = []
+    for label_name, label_value in labels:
+        escaped_value = str(label_value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        label_texts.append(f'{label_name}="{escaped_value}"')
+    return '{' + ','.join(label_texts) + '}'
@@ -0,0 +1,307 @@
+import numpy
+import manage_database
+import search_budget
+
+
+POINTER_SYMBOLS = manage_database.POINTER_SYMBOLS
+POINTER_CODES = manage_database.POINTER_CODES
+ANTONYM_CODE = POINTER_CODES['!']
+WORD_PIVOT_CODE = POINTER_CODES['?p']
+FOLLOW_WORD_PIVOTS = '?p' not in manage_database.SEARCH_VIEWS['connect'][1]
+
+
+class NumpySearchEngine:
+    """Runs the breadth-first searches of find_connection.get_tree() and find_opposite.get_tree_to_nearest_antonyms()
+a whole generation at a time with NumPy, instead of a pointer at a time. Pass it to them as engine.
+
+The search views of wordnet_data (see manage_database.compile_search_views()) are wrapped as NumPy arrays without
+copying, when the engine is created. Each generation gathers the pointers of every synset in the last generation
+at once, drops pointer type sequences with one lookup in a table of parent and child type codes, and keeps the first
+pointer to each synset not yet marked in a boolean visited array. Word pivots are gathered the same way through
+the word nodes, less the senses each pivot skips, and each word node once per direction through pivots that skip
+none. Generations are kept as arrays of synset ids, pointer type codes, word indexes and parent indexes, and only the
+nodes left after pruning are turned into the pointer tuples of the tree.
+
+Pointers are kept in the order the pointer-at-a-time search visits them, so the trees are identical, and searches
+stopped by a synset or generation limit report the same counts. The seconds limit is checked once per generation."""
+
+    def __init__(self, wordnet_data):
+        self.wordnet_data = wordnet_data
+        self.synset_count = len(wordnet_data)
+        self.views = {key: tuple(numpy.asarray(column) for column in columns)
+                      for key, columns in wordnet_data.search_views.items()}
+        self.out_offsets = numpy.asarray(wordnet_data.offsets[0])
+        self.out_targets = numpy.asarray(wordnet_data.targets[0])
+        self.out_types = numpy.asarray(wordnet_data.types[0])
+        self.antonym_distances = numpy.asarray(wordnet_data.antonym_distances)
+        self.pivot_offsets, self.pivot_word_nodes, self.pivot_word_nums, self.word_node_offsets, \
+            self.word_node_synsets, self.word_node_word_nums = map(numpy.asarray, wordnet_data.word_pivot_columns())
+        self.pivot_skip_columns = tuple(tuple(map(numpy.asarray, wordnet_data.pivot_skip_columns(direction)))
+                                        for direction in range(2))
+        self.word_node_count = len(self.word_node_offsets) - 1
+        # excluded_sequences[parent_code, child_code] is True if the child type is ignored after the parent type.
+        self.excluded_sequences = numpy.array(
+            [[sequence_mask >> child_code & 1 for child_code in range(len(POINTER_SYMBOLS))]
+             for sequence_mask in manage_database.SEQUENCE_MASKS], dtype=bool)
+
+    def expand(self, columns, generation, expanded_word_nodes=None, direction=0):
+        """Returns the arrays (parents, codes, synsets, source_words, target_words) of the pointers followed from
+the synsets of generation, in the order the pointer-at-a-time search visits them.
+If expanded_word_nodes is a boolean array, also follows the word pivots of direction through the word nodes
+not marked in it, in their place among the other pointers of each synset, and marks the word nodes expanded
+through a pivot that skips none of their synsets, since all of them are visited then."""
+
+        offsets, targets, types, view_source_words, view_target_words, pivot_starts = columns
+        synsets, codes = generation[0], generation[1]
+        parents, pointer_indexes = gather(offsets, synsets)
+        child_codes = types[pointer_indexes]
+        followed = ~self.excluded_sequences[codes[parents], child_codes]
+        parents, pointer_indexes = parents[followed], pointer_indexes[followed]
+        expanded = (parents, child_codes[followed], targets[pointer_indexes], view_source_words[pointer_indexes],
+                    view_target_words[pointer_indexes])
+        if expanded_word_nodes is None:
+            return expanded
+
+        pivot_parents, pivot_indexes = gather(self.pivot_offsets, synsets)
+        followed = ~self.excluded_sequences[codes[pivot_parents], WORD_PIVOT_CODE]
+        pivot_parents, pivot_indexes = pivot_parents[followed], pivot_indexes[followed]
+        word_nodes = self.pivot_word_nodes[pivot_indexes]
+        # A word node expanded through a pivot that skips none of its synsets has all of them visited, so only
+        # the first such pivot to each word node not marked counts. Other pivots to word nodes not marked count too.
+        # Pivots the pointer-at-a-time search leaves out on top of those find only visited synsets.
+        skip_offsets, skips = self.pivot_skip_columns[direction]
+        skipping = skip_offsets[pivot_indexes + 1] > skip_offsets[pivot_indexes]
+        whole_positions = numpy.flatnonzero(~skipping)
+        new_pivots = whole_positions[self.first_visits(expanded_word_nodes, word_nodes[whole_positions])]
+        followed = skipping & ~expanded_word_nodes[word_nodes]
+        followed[new_pivots] = True
+        expanded_word_nodes[word_nodes[new_pivots]] = True
+        pivot_parents, pivot_indexes = pivot_parents[followed], pivot_indexes[followed]
+        word_nodes = word_nodes[followed]
+        sense_owners, sense_indexes = gather(self.word_node_offsets, word_nodes)
+        pivot_parents = pivot_parents[sense_owners]
+        parent_word_nums = self.pivot_word_nums[pivot_indexes][sense_owners]
+        pivot_synsets = self.word_node_synsets[sense_indexes]
+
+        # No pivots from a synset to itself, or to the senses a pivot skips. The senses of each pivot are
+        # consecutive, so a skipped sense is at the position of the pivot's first sense plus its place in the word node.
+        followed = pivot_synsets != synsets[pivot_parents]
+        sense_counts = self.word_node_offsets[word_nodes + 1] - self.word_node_offsets[word_nodes]
+        first_sense_positions = numpy.cumsum(sense_counts) - sense_counts
+        skip_owners, skip_indexes = gather(skip_offsets, pivot_indexes)
+        followed[first_sense_positions[skip_owners] + skips[skip_indexes]
+                 - self.word_node_offsets[word_nodes[skip_owners]]] = False
+        pivot_parents, pivot_synsets = pivot_parents[followed], pivot_synsets[followed]
+        parent_word_nums = parent_word_nums[followed]
+        child_word_nums = self.word_node_word_nums[sense_indexes][followed]
+        if direction == 1:
+            parent_word_nums, child_word_nums = child_word_nums, parent_word_nums
+        pivots = (pivot_parents, numpy.full(len(pivot_parents), WORD_PIVOT_CODE, dtype=numpy.uint8), pivot_synsets,
+                  parent_word_nums, child_word_nums)
+
+        # Each parent's pointers from before its word pivots, its word pivots, then its pointers after them,
+        # with the parents in order.
+        after_pivots = pointer_indexes >= pivot_starts[synsets[parents]]
+        order = numpy.argsort(numpy.concatenate((parents * 3 + after_pivots * 2, pivot_parents * 3 + 1)), kind='stable')
+        return tuple(numpy.concatenate(columns_pair)[order] for columns_pair in zip(expanded, pivots))
+
+    def first_visits(self, visited, synsets):
+        """Returns the positions of the first pointer to each synset in synsets not marked in visited."""
+        unvisited = numpy.flatnonzero(~visited[synsets])
+        first_positions = numpy.unique(synsets[unvisited], return_index=True)[1]
+        first_positions.sort()
+        return unvisited[first_positions]
+
+    def check_budget(self, budget, deadline, synsets_visited, new_visit_parents, parent_count, generations):
+        """Returns the too_large result the pointer-at-a-time search would return for this generation, or None.
+That search checks the budget before expanding each parent, so the synset count at each parent is the count
+before the generation plus the synsets first visited from the parents before it."""
+
+        if budget is None or parent_count == 0:
+            return None
+        exceeded_limit = budget.check(synsets_visited, generations, deadline)
+        if exceeded_limit is not None:
+            return search_budget.too_large_result(exceeded_limit, synsets_visited)
+        if budget.max_synsets > 0:
+            new_visits = numpy.bincount(new_visit_parents, minlength=parent_count)
+            visited_at_parents = synsets_visited + numpy.cumsum(new_visits) - new_visits
+            over_budget = numpy.flatnonzero(visited_at_parents > budget.max_synsets)
+            if len(over_budget) > 0:
+                synsets_visited = int(visited_at_parents[over_budget[0]])
+                exceeded_limit = budget.check(synsets_visited, generations, None)
+                return search_budget.too_large_result(exceeded_limit, synsets_visited)
+        return None
+
+    def get_tree(self, start_pointers_list, end_pointers_list, budget=None, deadline=None):
+        """Runs the search loop of find_connection.get_tree() from its start and end pointers,
+and returns its result dictionary."""
+
+        root_pointers = (start_pointers_list, end_pointers_list)
+        generations = ([root_generation(start_pointers_list)], [root_generation(end_pointers_list)])
+        visited = (numpy.zeros(self.synset_count, dtype=bool), numpy.zeros(self.synset_count, dtype=bool))
+        visited_counts = [len(start_pointers_list), len(end_pointers_list)]
+        for direction in range(2):
+            visited[direction][generations[direction][0][0]] = True
+        expanded_word_nodes = (None, None)
+        if FOLLOW_WORD_PIVOTS:
+            expanded_word_nodes = (numpy.zeros(self.word_node_count, dtype=bool),
+                                   numpy.zeros(self.word_node_count, dtype=bool))
+        search_directions = [0, 1]
+
+        while True:  # Each loop is one layer in a breadth-first search.
+
+            for direction in search_directions:
+
+                last_generation = generations[direction][-1]
+                expanded = self.expand(self.views[('connect', direction)], last_generation,
+                                       expanded_word_nodes[direction], direction)
+                parents, synsets = expanded[0], expanded[2]
+                connecting_synsets = synsets[visited[direction * -1 + 1][synsets]]
+                new_positions = self.first_visits(visited[direction], synsets)
+
+                too_large_result = self.check_budget(
+                    budget, deadline, visited_counts[0] + visited_counts[1], parents[new_positions],
+                    len(last_generation[0]), len(generations[0]) + len(generations[1]) - 1)
+                if too_large_result is not None:
+                    return too_large_result
+
+                visited[direction][synsets[new_positions]] = True
+                visited_counts[direction] += len(new_positions)
+                generations[direction].append(new_generation(expanded, new_positions))
+
+                if len(connecting_synsets) > 0:
+                    tree = []
+                    for both_directions in range(2):
+                        prune_generations(generations[both_directions], numpy.unique(connecting_synsets))
+                        tree.append(materialize(generations[both_directions], root_pointers[both_directions]))
+                    return {'status': 'ok', 'data': tree, 'synsets_visited': visited_counts[0] + visited_counts[1]}
+
+                if len(new_positions) == 0:
+                    return {'status': 'error', 'data': 'No connection found.'}
+
+    def search_tree_to_nearest_antonyms(self, start_synset_ids, start_pointers_list, depth_limit, budget=None,
+                                        deadline=None):
+        """Runs the search of find_opposite.search_tree_to_nearest_antonyms() and returns what it returns."""
+
+        columns = self.views[('antonym', 0)]
+        generations = [root_generation(start_pointers_list)]
+        visited = numpy.zeros(self.synset_count, dtype=bool)
+        visited[list(start_synset_ids)] = True
+        visited_count = len(set(start_synset_ids))
+
+        while True:  # Each loop is one layer in a breadth-first search.
+
+            last_generation = generations[-1]
+            expanded = self.expand(columns, last_generation)
+            is_antonym = expanded[1] == ANTONYM_CODE
+            if depth_limit is not None:
+                # Ignore synsets too far from an antonym to reach one within depth_limit.
+                near = is_antonym | (self.antonym_distances[expanded[2]] <= depth_limit - len(generations))
+                expanded = tuple(column[near] for column in expanded)
+                is_antonym = is_antonym[near]
+            parents, synsets = expanded[0], expanded[2]
+            new_positions = self.first_visits(visited, synsets)
+
+            too_large_result = self.check_budget(
+                budget, deadline, visited_count, parents[new_positions], len(last_generation[0]), len(generations))
+            if too_large_result is not None:
+                return too_large_result
+
+            # Pointers join the tree if their synset wasn't visited yet, or if an antonym pointer to their synset
+            # came before them in this generation, or is them.
+            in_tree = numpy.zeros(len(synsets), dtype=bool)
+            in_tree[new_positions] = True
+            antonym_positions = numpy.flatnonzero(is_antonym)
+            if len(antonym_positions) > 0:
+                antonym_synsets, first_antonyms = numpy.unique(synsets[antonym_positions], return_index=True)
+                slots = numpy.minimum(numpy.searchsorted(antonym_synsets, synsets), len(antonym_synsets) - 1)
+                after_antonym = antonym_positions[first_antonyms][slots] <= numpy.arange(len(synsets))
+                in_tree |= (antonym_synsets[slots] == synsets) & after_antonym
+            visited[synsets[new_positions]] = True
+            visited_count += len(new_positions)
+
+            tree_positions = numpy.flatnonzero(in_tree)
+            if len(tree_positions) == 0:
+                if depth_limit is not None:
+                    return None
+                message = 'Reached dead-end in path. Failure in either earlier check for existence ' \
+                          'of reachable antonym, or failure in iterating paths.'
+                return {'status': 'error', 'data': message}
+
+            generations.append(new_generation(expanded, tree_positions))
+
+            if len(antonym_positions) > 0 and self.prune_last_antonyms(generations):
+                prune_generations(generations)
+                tree = [materialize(generations, start_pointers_list)]
+                return {'status': 'ok', 'data': tree, 'synsets_visited': visited_count}
+
+            if depth_limit is not None and len(generations) > depth_limit:
+                return None
+
+    def prune_last_antonyms(self, generations):
+        """Does what prune_last_generation() of find_opposite.search_tree_to_nearest_antonyms() does to the last
+generation: keeps only its antonym pointers, except those to synsets whose own first pointer is an antonym pointer
+to another of them, and returns True. If none would be left, removes its antonym pointers instead and returns False."""
+
+        synsets, codes = generations[-1][0], generations[-1][1]
+        is_antonym = codes == ANTONYM_CODE
+        first_pointers = self.out_offsets[synsets[is_antonym]]
+        antonyms_of_antonyms = self.out_targets[first_pointers[self.out_types[first_pointers] == ANTONYM_CODE]]
+        connecting = is_antonym & ~numpy.isin(synsets, antonyms_of_antonyms)
+        if connecting.any():
+            generations[-1] = tuple(column[connecting] for column in generations[-1])
+            return True
+        generations[-1] = tuple(column[~is_antonym] for column in generations[-1])
+        return False
+
+
+def gather(offsets, nodes):
+    """Returns the arrays (owners, indexes) of the entries of nodes in CSR columns with offsets, in node order:
+the index of each entry, and the position in nodes of the node it belongs to."""
+    starts = offsets[nodes].astype(numpy.int64)
+    counts = offsets[nodes + 1].astype(numpy.int64) - starts
+    owners = numpy.repeat(numpy.arange(len(nodes)), counts)
+    return owners, numpy.arange(len(owners)) + numpy.repeat(starts - (numpy.cumsum(counts) - counts), counts)
+
+
+def root_generation(pointers):
+    """Returns generation 0 of a search from pointers, as arrays (synsets, codes, source_words, target_words, parents)
+like every generation after it. Its source_words are positions in pointers, to find the pointer tuples by."""
+    return (numpy.array([pointer[1] for pointer in pointers], dtype=numpy.int64),
+            numpy.array([POINTER_CODES[pointer[0]] for pointer in pointers], dtype=numpy.uint8),
+            numpy.arange(len(pointers)),
+            numpy.array([pointer[3] for pointer in pointers], dtype=numpy.int64),
+            numpy.full(len(pointers), -1))
+
+
+def new_generation(expanded, positions):
+    """Returns the generation of the pointers at positions of the arrays returned by NumpySearchEngine.expand()."""
+    parents, codes, synsets, source_words, target_words = expanded
+    return synsets[positions], codes[positions], source_words[positions], target_words[positions], parents[positions]
+
+
+def materialize(generations, root_pointers):
+    """Returns generations as the generations of a tree direction, with a pointer tuple for every node."""
+    tree_direction = [[(root_pointers[root_num], -1) for root_num in generations[0][2].tolist()]]
+    for synsets, codes, source_words, target_words, parents in generations[1:]:
+        tree_direction.append([
+            ((POINTER_SYMBOLS[code], synset_id, source_word, target_word), parent_index)
+            for code, synset_id, source_word, target_word, parent_index in zip(
+                codes.tolist(), synsets.tolist(), source_words.tolist(), target_words.tolist(), parents.tolist())])
+    return tree_direction
+
+
+def prune_generations(generations, synset_connectors=None):
+    """Does what find_connection.prune_tree() does to a tree direction, to generations of NumPy arrays."""
+    if synset_connectors is not None:
+        generations[-1] = tuple(column[numpy.isin(generations[-1][0], synset_connectors)] for column in generations[-1])
+
+    for generation_num in range(len(generations) - 1, 0, -1):
+        parents = generations[generation_num][-1]
+        has_children = numpy.zeros(len(generations[generation_num - 1][0]), dtype=bool)
+        has_children[parents] = True
+
+        # Keep parents with children, and renumber children to the kept parents' new node indices.
+        new_parent_indices = numpy.cumsum(has_children) - has_children
+        generations[generation_num] = generations[generation_num][:-1] + (new_parent_indices[parents],)
+        generations[generation_num - 1] = tuple(column[has_children] for column in generations[generation_num - 1])
@@ -0,0 +1,115 @@
+import cProfile
+import hashlib
+import hmac
+import io
+import itertools
+import os
+import pstats
+import re
+import time
+from threading import Lock
+
+
+# Dump file names keep at most this many characters of the request path, and a hash of the rest, so they stay valid.
+PATH_NAME_LIMIT = 64
+
+
+class ProfilingMiddleware:
+    """WSGI middleware that runs requests under cProfile on demand.
+
+A request whose header_name header matches secret is profiled, and its response is replaced with a plain text report:
+the original status line and Server-Timing header, then the top_n functions by cumulative time.
+If sample_every is more than 0, every sample_every-th other request of each process is profiled too, its response is
+sent as usual, and its stats are dumped to directory for offline analysis with pstats. Only the newest keep dumps
+are kept. Either way, a profiled response is buffered whole, so the profile covers streamed pages to the end.
+
+Python runs one profiler at a time, so a sampled request is not profiled while another request is."""
+
+    def __init__(self, app, secret=None, header_name='X-Profile', sample_every=0, directory='profiles', keep=100,
+                 top_n=40):
+        self.app = app
+        self.secret = secret
+        self.environ_key = 'HTTP_' + header_name.upper().replace('-', '_')
+        self.sample_every = sample_every
+        self.directory = directory
+        self.keep = keep
+        self.top_n = top_n
+        self.request_numbers = itertools.count(1)
+        self.profiler_lock = Lock()
+
+    def __call__(self, environ, start_response):
+        requested = self.secret is not None and hmac.compare_digest(
+            environ.get(self.environ_key, '').encode('utf-8'), self.secret.encode('utf-8'))
+        if requested:
+            self.profiler_lock.acquire()
+        elif self.sample_every > 0 and next(self.request_numbers) % self.sample_every == 0:
+            if not self.profiler_lock.acquire(blocking=False):
+                return self.app(environ, start_response)
+        else:
+            return self.app(environ, start_response)
+
+        try:
+            profiler = cProfile.Profile()
+            status, headers, body = self.run_profiled(profiler, environ)
+        finally:
+            self.profiler_lock.release()
+
+        if requested:
+            report = self.format_report(profiler, status, headers)
+            start_response('200 OK', [('Content-Type', 'text/plain; charset=utf-8'),
+                                      ('Content-Length', str(len(report)))])
+            return [report]
+
+        self.dump_stats(profiler, environ)
+        start_response(status, headers)
+        return [body]
+
+    def run_profiled(self, profiler, environ):
+        response_start = []
+        body_chunks = []
+
+        def buffered_start_response(status, headers, exc_info=None):
+            response_start[:] = [status, headers]
+            return body_chunks.append
+
+        profiler.enable()
+        try:
+            app_iter = self.app(environ, buffered_start_response)
+            try:
+                for chunk in app_iter:
+                    body_chunks.append(chunk)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+        finally:
+            profiler.disable()
+        return response_start[0], response_start[1], b''.join(body_chunks)
+
+    def format_report(self, profiler, status, headers):
+        report = io.StringIO()
+        report.write(f'{status}\n')
+        for header_name, header_value in headers:
+            if header_name.lower() == 'server-timing':
+                report.write(f'{header_name}: {header_value}\n')
+        report.write('\n')
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(self.top_n)
+        return report.getvalue().encode()
+
+    def dump_stats(self, profiler, environ):
+        os.makedirs(self.directory, exist_ok=True)
+        path_name = re.sub(r'[^\w.-]', '_', environ.get('PATH_INFO', '').strip('/').replace('/', '.'), flags=re.ASCII)
+        if len(path_name) > PATH_NAME_LIMIT:
+            path_hash = hashlib.sha256(path_name.encode()).hexdigest()[:16]
+            path_name = f'{path_name[:PATH_NAME_LIMIT - len(path_hash) - 1]}-{path_hash}'
+        path_name = path_name or 'index'
+        # Names start with the time, so they sort oldest first.
+        file_name = f'profile-{time.time_ns()}-{os.getpid()}-{path_name}.prof'
+        profiler.dump_stats(os.path.join(self.directory, file_name))
+
+        dump_names = sorted(name for name in os.listdir(self.directory)
+                            if name.startswith('profile-') and name.endswith('.prof'))
+        for dump_name in dump_names[:max(0, len(dump_names) - self.keep)]:
+            try:
+                os.remove(os.path.join(self.directory, dump_name))
+            except OSError:
+                continue  # Another worker removed it first.
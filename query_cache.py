@@ -0,0 +1,59 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+class QueryCache:
+    """Bounded least-recently-used cache of search results, keyed by normalized query.
+Counts hits, misses and evictions. A maxsize of 0 disables the cache, so every lookup is a miss.
+Cached values are shared between requests, so callers must not modify them."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.reverse_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, reverse_key=None, reverse=None):
+        """Returns the value cached for key, or None if there is none.
+If no value is cached for key but one is cached for reverse_key, returns reverse(value) instead,
+unless that is None."""
+
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            if reverse_key is not None and reverse_key in self.entries:
+                reversed_value = reverse(self.entries[reverse_key])
+                if reversed_value is not None:
+                    self.entries.move_to_end(reverse_key)
+                    self.reverse_hits += 1
+                    return reversed_value
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self.lock:
+            if self.maxsize <= 0:
+                return
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        return {
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'reverse_hits': self.reverse_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
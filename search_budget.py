@@ -0,0 +1,59 @@
+import time
+from threading import Lock
+
+
+class SearchBudget:
+    """Limits on the work one search may do: synsets visited, generations added and seconds spent.
+A limit of 0 means no limit. Counts the searches each limit stopped.
+
+Searches call start() once, then check() as they go, and stop when check() returns the name of an exceeded limit."""
+
+    LIMITS = ('synsets', 'generations', 'seconds')
+
+    def __init__(self, max_synsets=0, max_generations=0, max_seconds=0.0):
+        self.max_synsets = max_synsets
+        self.max_generations = max_generations
+        self.max_seconds = max_seconds
+        self.lock = Lock()
+        self.hits = {limit: 0 for limit in self.LIMITS}
+
+    def start(self):
+        """Returns the deadline for a search starting now, to pass to check(), or None if there is no time limit."""
+        if self.max_seconds > 0:
+            return time.monotonic() + self.max_seconds
+        return None
+
+    def check(self, synsets_visited, generations, deadline):
+        """Returns the name of the first limit the search has exceeded, or None if it is within budget."""
+        exceeded_limit = None
+        if 0 < self.max_synsets < synsets_visited:
+            exceeded_limit = 'synsets'
+        elif 0 < self.max_generations < generations:
+            exceeded_limit = 'generations'
+        elif deadline is not None and time.monotonic() > deadline:
+            exceeded_limit = 'seconds'
+        if exceeded_limit is not None:
+            self.record_hit(exceeded_limit)
+        return exceeded_limit
+
+    def record_hit(self, exceeded_limit):
+        """Counts a search stopped by exceeding the limit named exceeded_limit, e.g. in another process."""
+        with self.lock:
+            self.hits[exceeded_limit] += 1
+
+    def stats(self):
+        return {
+            'max_synsets': self.max_synsets,
+            'max_generations': self.max_generations,
+            'max_seconds': self.max_seconds,
+            'hits': dict(self.hits),
+        }
+
+
+def too_large_result(exceeded_limit, synsets_visited):
+    """Returns the result dictionary searches return when they stop for exceeding their budget."""
+    return {
+        'status': 'too_large',
+        'data': f'Search too large. Stopped at the {exceeded_limit} limit after visiting {synsets_visited} synsets.',
+        'synsets_visited': synsets_visited,
+    }
@@ -0,0 +1,185 @@
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from threading import BoundedSemaphore, Lock
+import find_connection
+import find_opposite
+import search_budget
+import wordnet_graph
+
+
+# The database of this process, if it is a search process. Set by load_search_database().
+search_wordnet_data = None
+search_wordnet_index = None
+search_engine = None
+
+# How long after its deadline a search's result is waited for: the time a search takes to notice its deadline,
+# and to send its result back.
+RESULT_GRACE_SECONDS = 1.0
+
+
+def load_search_database(database_path, engine_name):
+    """Initializer of each search process: maps the database once, for every search the process runs,
+and creates the NumPy search engine if engine_name is "numpy"."""
+    global search_wordnet_data
+    global search_wordnet_index
+    global search_engine
+    sections = wordnet_graph.open_database(database_path)
+    search_wordnet_data = wordnet_graph.WordnetGraph(sections)
+    search_wordnet_index = wordnet_graph.WordIndex(sections)
+    if engine_name == 'numpy':
+        import numpy_search  # NumPy is only needed for this engine.
+        search_engine = numpy_search.NumpySearchEngine(search_wordnet_data)
+
+
+def run_search(function_name, args, budget_limits, deadline):
+    """Runs a search function in a search process, stopping it by the time.monotonic() deadline if its budget doesn't
+stop it sooner. Returns its result and the number of searches each budget limit stopped, so the budget of the calling
+process can count them."""
+
+    max_synsets, max_generations, max_seconds = budget_limits
+    seconds_left = deadline - time.monotonic()
+    if seconds_left <= 0:
+        return busy_result(), {}  # It waited in the queue for all its time.
+    if max_seconds <= 0 or seconds_left < max_seconds:
+        max_seconds = seconds_left
+    budget = search_budget.SearchBudget(max_synsets, max_generations, max_seconds)
+    if function_name == 'connect':
+        search_result = find_connection.get_search_result(
+            search_wordnet_data, search_wordnet_index, *args, budget=budget, engine=search_engine)
+    else:
+        search_result = find_opposite.get_antonym_search_result(
+            search_wordnet_data, *args, budget=budget, engine=search_engine)
+    return search_result, budget.hits
+
+
+def busy_result():
+    """Returns the search result dictionary for a search the executor had no room or time for."""
+    return {'status': 'busy'}
+
+
+class SearchExecutor:
+    """Runs connect and opposite searches in a persistent pool of processes, off the request threads, so searches
+in different threads of one web worker run in parallel. Each process maps the database once, when it starts.
+
+At most max_pending searches of this process wait for or run in the pool. Searches beyond that aren't queued:
+they return a "busy" result at once. A search gets task_seconds to finish, counted from when it was submitted,
+and is stopped like a search that exceeded its budget if it runs out of time. A search that waited in the queue for
+all of its time, or whose result doesn't come back, returns a busy result.
+Each process is replaced after tasks_per_process searches (if more than 0, on Python 3.11 and later), so memory
+a search process gains over time is returned, and the whole pool is replaced if one of its processes dies.
+
+Search processes are started by a fork server, never forked from a web worker with threads running.
+The pool starts on the first search of each process, so an executor created before gunicorn forks its workers
+gets a pool in each of them. Use few workers with several threads each, since each has processes of its own.
+If engine_name is "numpy", the processes search with a numpy_search.NumpySearchEngine."""
+
+    def __init__(self, database_path, processes, max_pending=0, task_seconds=30.0, tasks_per_process=0,
+                 engine_name='python'):
+        self.database_path = os.path.abspath(database_path)
+        self.processes = processes
+        self.max_pending = max_pending if max_pending > 0 else 4 * processes
+        self.task_seconds = task_seconds
+        self.tasks_per_process = tasks_per_process
+        self.engine_name = engine_name
+        self.lock = Lock()
+        self.pool = None
+        self.pool_pid = None
+        self.pending = None
+        self.submitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.broken_pools = 0
+
+    def get_pool(self):
+        with self.lock:
+            if self.pool is not None and self.pool_pid == os.getpid():
+                return self.pool
+            if self.pool_pid != os.getpid():
+                # The counts and semaphore of the parent process belong to it.
+                self.pending = BoundedSemaphore(self.max_pending)
+                self.submitted = self.rejected = self.timed_out = self.broken_pools = 0
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['search_executor'])
+            pool_options = {}
+            if self.tasks_per_process > 0 and sys.version_info >= (3, 11):  # Added to ProcessPoolExecutor in 3.11.
+                pool_options['max_tasks_per_child'] = self.tasks_per_process
+            self.pool = ProcessPoolExecutor(self.processes, mp_context=context, initializer=load_search_database,
+                                            initargs=(self.database_path, self.engine_name), **pool_options)
+            self.pool_pid = os.getpid()
+            return self.pool
+
+    def replace_pool(self, pool):
+        with self.lock:
+            if self.pool is not pool:
+                return  # Another thread replaced it already.
+            self.pool = None
+            self.broken_pools += 1
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, function_name, args, budget):
+        pool = self.get_pool()
+        if not self.pending.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            return busy_result()
+
+        budget_limits = (0, 0, 0.0)
+        if budget is not None:
+            budget_limits = (budget.max_synsets, budget.max_generations, budget.max_seconds)
+        # time.monotonic() is the same clock in every process of the machine.
+        deadline = time.monotonic() + self.task_seconds
+        try:
+            with self.lock:
+                self.submitted += 1
+            try:
+                future = pool.submit(run_search, function_name, args, budget_limits, deadline)
+            except RuntimeError:  # The pool is broken, or another thread shut it down to replace it.
+                self.replace_pool(pool)
+                return busy_result()
+            search_result, hits = future.result(timeout=self.task_seconds + RESULT_GRACE_SECONDS)
+        except FutureTimeoutError:
+            future.cancel()  # Only stops it if it is still queued. Otherwise the deadline stops it.
+            with self.lock:
+                self.timed_out += 1
+            return busy_result()
+        except BrokenProcessPool:
+            self.replace_pool(pool)
+            return busy_result()
+        finally:
+            self.pending.release()
+
+        if budget is not None:
+            for exceeded_limit, count in hits.items():
+                for _ in range(count):
+                    budget.record_hit(exceeded_limit)
+        return search_result
+
+    def get_search_result(self, start_word, target_word, balanced=False, budget=None):
+        """Returns what find_connection.get_search_result() would, or a busy result."""
+        return self.run('connect', (start_word, target_word, balanced), budget)
+
+    def get_antonym_search_result(self, start_word, start_synset_ids, budget=None):
+        """Returns what find_opposite.get_antonym_search_result() would, or a busy result."""
+        return self.run('opposite', (start_word, list(start_synset_ids)), budget)
+
+    def shutdown(self):
+        with self.lock:
+            pool = self.pool
+            self.pool = None
+        if pool is not None and self.pool_pid == os.getpid():
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'processes': self.processes,
+                'max_pending': self.max_pending,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'broken_pools': self.broken_pools,
+            }
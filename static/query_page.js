@@ -47,9 +47,13 @@ window.addEventListener('pagehide', () => {  // Don't show animation after back
     stopRandTextAnimation();
 });
 
-for (textarea of formTextareas) {  // Enter key sends form.
+// Word suggestions.
+const completeDelayMsecs = 150;  // Wait for a pause in typing before asking for suggestions.
+for (textarea of formTextareas) { addSuggestions(textarea); };
+
+for (textarea of formTextareas) {  // Enter key sends form, unless it picked a suggestion.
     textarea.addEventListener('keydown', event => {
-        if (event.keyCode === 13) {
+        if (event.keyCode === 13 && !event.defaultPrevented) {
             event.preventDefault();
             calculateButton.click();
         };
@@ -61,6 +65,91 @@ for (textarea of formTextareas) {  // Enter key sends form.
 if (errorMessage.innerText !== '') { errorMessage.scrollIntoView(false); };
 
 
+// Shows a list of index words starting with what has been typed in textarea, from its data-complete-url.
+// Arrow keys move through the list, Enter or a click picks a word, and Escape closes it.
+function addSuggestions(textarea) {
+    const completeUrl = textarea.dataset.completeUrl;
+    if (completeUrl === undefined) { return; };
+
+    const list = document.createElement('ul');
+    list.className = 'suggestions';
+    list.hidden = true;
+    textarea.after(list);
+    let timeoutId = null;
+    let requestNum = 0;
+    let highlightedIndex = -1;
+
+    function showSuggestions(words) {
+        list.replaceChildren();
+        highlightedIndex = -1;
+        for (const word of words) {
+            const item = document.createElement('li');
+            item.textContent = word;
+            item.addEventListener('mousedown', event => {
+                event.preventDefault();  // Keep focus in the textarea.
+                pickSuggestion(item.textContent);
+            });
+            list.append(item);
+        };
+        list.hidden = words.length === 0;
+    };
+
+    function pickSuggestion(word) {
+        textarea.value = word;
+        requestNum += 1;  // Ignore suggestions still on their way.
+        showSuggestions([]);
+    };
+
+    function highlight(index) {
+        const items = list.children;
+        if (highlightedIndex >= 0) { items[highlightedIndex].classList.remove('highlighted'); };
+        highlightedIndex = (index + items.length + 2) % (items.length + 1) - 1;  // -1 is back in the textarea.
+        if (highlightedIndex >= 0) { items[highlightedIndex].classList.add('highlighted'); };
+    };
+
+    function requestSuggestions() {
+        requestNum += 1;
+        const thisRequestNum = requestNum;
+        if (textarea.value.trim() === '') {
+            showSuggestions([]);
+            return;
+        };
+        fetch(`${completeUrl}?prefix=${encodeURIComponent(textarea.value)}`)
+            .then(response => response.ok ? response.json() : {words: []})
+            .then(data => {
+                if (thisRequestNum === requestNum && document.activeElement === textarea) { showSuggestions(data.words); };
+            })
+            .catch(() => {});  // Suggestions are optional.
+    };
+
+    textarea.addEventListener('input', () => {
+        clearTimeout(timeoutId);
+        timeoutId = setTimeout(requestSuggestions, completeDelayMsecs);
+    });
+
+    textarea.addEventListener('keydown', event => {
+        if (list.hidden) { return; };
+        if (event.keyCode === 40) {  // Down arrow
+            event.preventDefault();
+            highlight(highlightedIndex + 1);
+        } else if (event.keyCode === 38) {  // Up arrow
+            event.preventDefault();
+            highlight(highlightedIndex - 1);
+        } else if (event.keyCode === 13 && highlightedIndex >= 0) {  // Enter
+            event.preventDefault();
+            pickSuggestion(list.children[highlightedIndex].textContent);
+        } else if (event.keyCode === 27) {  // Escape
+            showSuggestions([]);
+        };
+    });
+
+    textarea.addEventListener('blur', () => {
+        clearTimeout(timeoutId);
+        requestNum += 1;
+        showSuggestions([]);
+    });
+};
+
 function randChoice(array) {
     index = Math.floor(Math.random() * array.length);
     return array[index];
@@ -0,0 +1,203 @@
+"""Tests admin_alerts.SmtpTransport and admin_alerts.AlertQueue against a fake SMTP server on a local socket.
+
+Run from the repository directory:
+    python -m unittest discover tests"""
+
+import os
+import smtplib
+import socket
+import sys
+import threading
+import time
+import unittest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import admin_alerts
+
+
+class FakeSmtpServer:
+    """Speaks just enough SMTP on a local port for smtplib to send mail, one connection at a time.
+Each message received is appended to messages as (subject, body).
+The server closes a connection after messages_per_connection messages, without waiting for QUIT, and answers
+no connection after the first max_connections. While hold_replies is cleared, it waits before accepting a message,
+with receiving set."""
+
+    def __init__(self, messages_per_connection=0, max_connections=0):
+        self.messages_per_connection = messages_per_connection
+        self.max_connections = max_connections
+        self.messages = []
+        self.connections = 0
+        self.receiving = threading.Event()
+        self.hold_replies = threading.Event()
+        self.hold_replies.set()
+        self.listener = socket.create_server(('127.0.0.1', 0))
+        self.port = self.listener.getsockname()[1]
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while True:
+            try:
+                connection, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            with connection:
+                if 0 < self.max_connections < self.connections:
+                    continue
+                self.serve_connection(connection.makefile('rb'), connection)
+
+    def serve_connection(self, lines, connection):
+        connection.sendall(b'220 fake ESMTP\r\n')
+        messages_received = 0
+        for line in lines:
+            command = line[:4].upper()
+            if command in (b'EHLO', b'HELO'):
+                connection.sendall(b'250 fake\r\n')
+            elif command in (b'MAIL', b'RCPT', b'RSET', b'NOOP'):
+                connection.sendall(b'250 OK\r\n')
+            elif command == b'DATA':
+                connection.sendall(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+                data_lines = []
+                for data_line in lines:
+                    if data_line == b'.\r\n':
+                        break
+                    data_lines.append(data_line)
+                self.receiving.set()
+                self.hold_replies.wait()
+                subject_line, body = b''.join(data_lines).decode().split('\r\n\r\n', 1)
+                self.messages.append((subject_line.removeprefix('Subject: '), body.removesuffix('\r\n')))
+                connection.sendall(b'250 OK\r\n')
+                messages_received += 1
+                if messages_received == self.messages_per_connection:
+                    return
+            elif command == b'QUIT':
+                connection.sendall(b'221 Bye\r\n')
+                return
+            else:
+                connection.sendall(b'502 Command not implemented\r\n')
+
+    def close(self):
+        try:
+            self.listener.shutdown(socket.SHUT_RDWR)  # Wakes accept(), which close() alone doesn't on Linux.
+        except OSError:
+            pass
+        self.listener.close()
+        self.thread.join(timeout=5)
+
+
+class SmtpTransportTest(unittest.TestCase):
+
+    def make_transport(self, server):
+        transport = admin_alerts.SmtpTransport('127.0.0.1', server.port, 'sender@example.com', None,
+                                               'admin@example.com', starttls=False, timeout=5)
+        self.addCleanup(transport.close)
+        return transport
+
+    def test_reuses_connection(self):
+        server = FakeSmtpServer()
+        self.addCleanup(server.close)
+        transport = self.make_transport(server)
+        transport.send('First', 'one')
+        transport.send('Second', 'two')
+        self.assertEqual(server.messages, [('First', 'one'), ('Second', 'two')])
+        self.assertEqual(server.connections, 1)
+
+    def test_reconnects_after_server_drops_connection(self):
+        server = FakeSmtpServer(messages_per_connection=1)
+        self.addCleanup(server.close)
+        transport = self.make_transport(server)
+        transport.send('First', 'one')
+        transport.send('Second', 'two')
+        self.assertEqual(server.messages, [('First', 'one'), ('Second', 'two')])
+        self.assertEqual(server.connections, 2)
+
+    def test_reconnects_only_once(self):
+        server = FakeSmtpServer(messages_per_connection=1, max_connections=1)
+        self.addCleanup(server.close)
+        transport = self.make_transport(server)
+        transport.send('First', 'one')
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            transport.send('Second', 'two')
+        self.assertEqual(server.messages, [('First', 'one')])
+        self.assertEqual(server.connections, 2)
+
+
+class AlertQueueTest(unittest.TestCase):
+
+    def make_queue(self, server, **settings):
+        transport = admin_alerts.SmtpTransport('127.0.0.1', server.port, 'sender@example.com', None,
+                                               'admin@example.com', starttls=False, timeout=5)
+        alert_queue = admin_alerts.AlertQueue(transport, **settings)
+        self.addCleanup(alert_queue.stop)
+        return alert_queue
+
+    def test_batches_alerts_into_digest(self):
+        server = FakeSmtpServer()
+        self.addCleanup(server.close)
+        alert_queue = self.make_queue(server, digest_size=3, digest_seconds=5.0)
+        for alert_num in range(3):
+            alert_queue.send('Web App - Log', f'alert {alert_num}')
+        alert_queue.stop()
+        self.assertEqual(len(server.messages), 1)
+        subject, body = server.messages[0]
+        self.assertEqual(subject, 'Web App - Log (3 alerts)')
+        self.assertEqual(body.count('----------'), 2)
+        self.assertEqual(alert_queue.stats()['sent_alerts'], 3)
+
+    def test_counts_dropped_alerts_in_next_digest(self):
+        server = FakeSmtpServer()
+        self.addCleanup(server.close)
+        alert_queue = self.make_queue(server, max_queue=2, digest_size=1, digest_seconds=5.0)
+        server.hold_replies.clear()
+        self.assertTrue(alert_queue.send('Web App - ERROR', 'first'))
+        self.assertTrue(server.receiving.wait(timeout=5))  # The worker is sending the first digest.
+        sent = [alert_queue.send('Web App - ERROR', f'queued {alert_num}') for alert_num in range(3)]
+        server.hold_replies.set()
+        alert_queue.stop()
+
+        self.assertEqual(sent, [True, True, False])
+        self.assertEqual([body.split('\r\n')[0] for _, body in server.messages], ['first', 'queued 0', 'queued 1'])
+        self.assertIn('1 alerts were dropped because the alert queue was full.', server.messages[1][1])
+        self.assertNotIn('dropped', server.messages[2][1])
+        self.assertEqual(alert_queue.stats()['dropped'], 1)
+        self.assertEqual(alert_queue.stats()['sent_digests'], 3)
+
+    def test_failed_digest_is_counted(self):
+        server = FakeSmtpServer()
+        server.close()  # Connections are refused.
+        alert_queue = self.make_queue(server, digest_size=1)
+        alert_queue.send('Web App - ERROR', 'lost')
+        alert_queue.stop()
+        self.assertEqual(alert_queue.stats()['failed_digests'], 1)
+        self.assertEqual(alert_queue.stats()['sent_digests'], 0)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs os.fork()')
+    def test_forked_process_starts_its_own_worker(self):
+        # The server closes the parent's connection after its alert, so the child doesn't write to the same socket.
+        server = FakeSmtpServer(messages_per_connection=1)
+        self.addCleanup(server.close)
+        alert_queue = self.make_queue(server, digest_size=1)
+        alert_queue.send('Web App - Log', 'from parent')
+        while alert_queue.stats()['sent_digests'] < 1:
+            time.sleep(0.01)
+        pid = os.fork()
+        if pid == 0:
+            # The parent's worker thread doesn't exist here, so only a new one can send this alert.
+            exit_code = 1
+            try:
+                alert_queue.send('Web App - Log', 'from child')
+                alert_queue.stop()
+                exit_code = 0 if alert_queue.stats()['sent_digests'] == 2 else 1
+            finally:
+                os._exit(exit_code)
+        _, status = os.waitpid(pid, 0)
+        alert_queue.stop()
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertEqual(sorted(body for _, body in server.messages), ['from child', 'from parent'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+"""Builds a database from the small WordNet-format files in tests/fixture/wordnet-db and checks its header,
+and the trees find_connection and find_opposite search in it, against paths worked out by hand from those files.
+
+Run from the repository directory:
+    python -m unittest discover tests"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+import zlib
+from array import array
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import find_connection
+import find_opposite
+import manage_database
+import wordnet_graph
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixture')
+
+
+@contextlib.contextmanager
+def fixture_directory():
+    """Runs the block in FIXTURE_DIR, since manage_database reads the WordNet files from the working directory,
+with the build's progress messages captured."""
+    working_directory = os.getcwd()
+    os.chdir(FIXTURE_DIR)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            yield output
+    finally:
+        os.chdir(working_directory)
+
+
+class DatabaseTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, 'wordnet-graph.bin')
+        with fixture_directory():
+            manage_database.prepare_database(cls.path)
+        cls.sections = wordnet_graph.open_database(cls.path)
+        cls.wordnet_data = wordnet_graph.WordnetGraph(cls.sections, os.path.join(FIXTURE_DIR, 'wordnet-db'))
+        cls.wordnet_index = wordnet_graph.WordIndex(cls.sections)
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.sections, cls.wordnet_data, cls.wordnet_index  # Releases the views of the mapped file.
+        cls.directory.cleanup()
+
+    def describe_chain(self, path_chain):
+        """Returns the pointer symbol and first word of each synset along path_chain, None for the '__end' pointer."""
+        return [(pointer[0], self.wordnet_data.words(pointer[1])[0] if pointer[1] != -1 else None)
+                for pointer in path_chain]
+
+
+class DatabaseFileTest(DatabaseTestCase):
+
+    def test_header_matches_payload(self):
+        with open(self.path, 'rb') as file:
+            contents = file.read()
+        magic, version, byte_order, section_count, payload_size, payload_crc = \
+            manage_database.DATABASE_HEADER.unpack_from(contents)
+        payload = contents[manage_database.DATABASE_HEADER.size:]
+        self.assertEqual(magic, manage_database.DATABASE_MAGIC)
+        self.assertEqual(version, manage_database.DATABASE_FORMAT_VERSION)
+        self.assertEqual(byte_order, {'little': b'<', 'big': b'>'}[sys.byteorder])
+        self.assertEqual(section_count, len(self.sections))
+        self.assertEqual(payload_size, len(payload))
+        self.assertEqual(payload_crc, zlib.crc32(payload))
+
+    def test_sections_round_trip(self):
+        sections = {'numbers': array('I', [3, 1, 4, 1, 5]), 'short': array('H', [9]), 'empty': array('Q')}
+        path = os.path.join(self.directory.name, 'round-trip.bin')
+        manage_database.write_database_file(sections, path)
+        opened_sections = wordnet_graph.open_database(path)
+        self.assertEqual({name: list(values) for name, values in opened_sections.items()},
+                         {name: list(values) for name, values in sections.items()})
+
+    def test_rejects_corrupt_and_outdated_files(self):
+        with open(self.path, 'rb') as file:
+            contents = bytearray(file.read())
+        path = os.path.join(self.directory.name, 'damaged.bin')
+
+        corrupt_contents = contents.copy()
+        corrupt_contents[-1] ^= 0xFF
+        with open(path, 'wb') as file:
+            file.write(corrupt_contents)
+        with self.assertRaisesRegex(wordnet_graph.DatabaseFileError, 'corrupt'):
+            wordnet_graph.open_database(path)
+
+        outdated_contents = contents.copy()
+        outdated_contents[8:10] = (manage_database.DATABASE_FORMAT_VERSION - 1).to_bytes(2, 'little')
+        with open(path, 'wb') as file:
+            file.write(outdated_contents)
+        with self.assertRaisesRegex(wordnet_graph.DatabaseFileError, 'format version'):
+            wordnet_graph.open_database(path)
+
+    def test_records_wordnet_file_checksums(self):
+        with fixture_directory() as output:
+            checksums = manage_database.calculate_wordnet_file_checksums()
+            manage_database.prepare_outdated_database(self.path)
+        self.assertEqual(list(self.sections['wordnet_file_checksums']), checksums)
+        self.assertIn('is up to date', output.getvalue())
+
+
+class ConnectSearchTest(DatabaseTestCase):
+
+    # Each pair's paths, in the order get_path_chains() returns them.
+    KNOWN_PATHS = {
+        ('dog', 'cat'): [
+            [('__start', 'dog'), ('@', 'canine'), ('@', 'animal'), ('~', 'feline'), ('~', 'cat'), ('__end', None)],
+        ],
+        # Through a word pivot from the synset of "animal" to the other sense of "beast".
+        ('dog', 'person'): [
+            [('__start', 'dog'), ('@', 'canine'), ('@', 'animal'), ('?p', 'brute'), ('@', 'person'), ('__end', None)],
+        ],
+        ('walk', 'person'): [
+            [('__start', 'walk'), ('@', 'move'), ('~', 'run'), ('+', 'runner'), ('@', 'person'), ('__end', None)],
+        ],
+        # The antonym pointers between "hot" and "cold" aren't followed.
+        ('hot', 'cold'): [
+            [('__start', 'hot'), ('=', 'temperature'), ('=', 'cold'), ('__end', None)],
+        ],
+        ('hotly', 'icy'): [
+            [('__start', 'hotly'), ('\\', 'hot'), ('=', 'temperature'), ('=', 'cold'), ('&', 'icy'), ('__end', None)],
+        ],
+    }
+
+    def test_known_paths(self):
+        for (start_word, target_word), known_paths in self.KNOWN_PATHS.items():
+            with self.subTest(start_word=start_word, target_word=target_word):
+                tree_result = find_connection.get_tree(self.wordnet_data, self.wordnet_index, start_word, target_word)
+                self.assertEqual(tree_result['status'], 'ok')
+                path_chains = find_connection.get_path_chains(tree_result['data'])
+                self.assertEqual([self.describe_chain(path_chain) for path_chain in path_chains.values()], known_paths)
+
+    def test_balanced_search_returns_same_trees(self):
+        for start_word, target_word in list(self.KNOWN_PATHS) + [('beast', 'person'), ('dog', 'quickly')]:
+            with self.subTest(start_word=start_word, target_word=target_word):
+                tree_result = find_connection.get_tree(self.wordnet_data, self.wordnet_index, start_word, target_word)
+                balanced_result = find_connection.get_tree(
+                    self.wordnet_data, self.wordnet_index, start_word, target_word, balanced=True)
+                self.assertEqual(balanced_result['status'], tree_result['status'])
+                self.assertEqual(balanced_result['data'], tree_result['data'])
+
+    def test_cursor_past_last_path(self):
+        for cursor, status in ((0, 'ok'), (1, 'error'), (5, 'error')):
+            with self.subTest(cursor=cursor):
+                result = find_connection.web_app_inquiry(
+                    self.wordnet_data, self.wordnet_index, 'dog', 'cat', limit=1, cursor=cursor)
+                self.assertEqual(result['status'], status)
+
+    def test_unconnected_words(self):
+        tree_result = find_connection.get_tree(self.wordnet_data, self.wordnet_index, 'dog', 'quickly')
+        self.assertEqual(tree_result, {'status': 'error', 'data': 'No connection found.'})
+
+
+class OppositeSearchTest(DatabaseTestCase):
+
+    def find_antonym_paths(self, word):
+        tree_result = find_opposite.get_tree_to_nearest_antonyms(self.wordnet_data, word, self.wordnet_index[word])
+        self.assertEqual(tree_result['status'], 'ok')
+        path_chains = find_opposite.get_antonym_path_chains(tree_result['data'])
+        return [self.describe_chain(path_chain) for path_chain in path_chains.values()]
+
+    def test_known_paths(self):
+        self.assertEqual(self.find_antonym_paths('scorching'),
+                         [[('__start', 'scorching'), ('&', 'hot'), ('!', 'cold'), ('__end', None)]])
+        self.assertEqual(self.find_antonym_paths('icy'),
+                         [[('__start', 'icy'), ('&', 'cold'), ('!', 'hot'), ('__end', None)]])
+
+    def test_word_without_antonyms(self):
+        tree_result = find_opposite.get_tree_to_nearest_antonyms(self.wordnet_data, 'dog', self.wordnet_index['dog'])
+        self.assertEqual(tree_result, {'status': 'error', 'data': 'No reachable antonyms exist.'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,329 @@
+import mmap
+import os
+import sys
+import zlib
+from bisect import bisect_left
+from collections import OrderedDict
+from threading import Lock
+import manage_database
+
+
+POINTER_SYMBOLS = manage_database.POINTER_SYMBOLS
+POS_NAMES = manage_database.POS_NAMES
+DIRECTION_NUMS = {'out': 0, 'in': 1}
+# The WordNet data files glosses are read from. The database is built from the ones next to this module.
+WORDNET_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wordnet-db')
+# Glosses kept decoded by each GlossStore. A result page shows the glosses of a few dozen synsets.
+GLOSS_CACHE_SIZE = 2048
+
+
+class DatabaseFileError(Exception):
+    """Raised when a database file is missing sections, corrupt, or was built by a different format version."""
+
+
+def open_database(path):
+    """Memory-maps a database file written by manage_database.write_database_file() read-only.
+Returns a dictionary of section name to memoryview, each cast to the typecode of the array it was written from.
+The views share the page cache with every other process that maps the same file, so nothing is copied.
+Raises DatabaseFileError if the header, version, byte order or checksum does not match."""
+
+    with open(path, 'rb') as file:
+        mapped_file = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    buffer = memoryview(mapped_file)
+
+    if len(buffer) < manage_database.DATABASE_HEADER.size:
+        raise DatabaseFileError(f'{path} is too short to be a database file.')
+    magic, version, byte_order, section_count, payload_size, payload_crc = \
+        manage_database.DATABASE_HEADER.unpack_from(buffer)
+    if magic != manage_database.DATABASE_MAGIC:
+        raise DatabaseFileError(f'{path} is not a database file.')
+    if version != manage_database.DATABASE_FORMAT_VERSION:
+        raise DatabaseFileError(f'{path} has format version {version}, expected '
+                                f'{manage_database.DATABASE_FORMAT_VERSION}. '
+                                f'Rebuild it with python manage_database.py.')
+    if byte_order != {'little': b'<', 'big': b'>'}[sys.byteorder]:
+        raise DatabaseFileError(f'{path} was built on a machine with a different byte order.')
+    payload = buffer[manage_database.DATABASE_HEADER.size:]
+    if len(payload) != payload_size or zlib.crc32(payload) != payload_crc:
+        raise DatabaseFileError(f'{path} is truncated or corrupt. Rebuild it with python manage_database.py.')
+
+    sections = {}
+    for section_num in range(section_count):
+        table_position = manage_database.DATABASE_HEADER.size + section_num * manage_database.DATABASE_SECTION.size
+        name, typecode, offset, size = manage_database.DATABASE_SECTION.unpack_from(buffer, table_position)
+        sections[name.rstrip(b'\0').decode()] = buffer[offset:offset + size].cast(typecode.decode())
+    return sections
+
+
+def decode_string(offsets, text, string_num):
+    return str(text[offsets[string_num]:offsets[string_num + 1]], 'utf-8')
+
+
+class GlossStore:
+    """Reads glosses from the WordNet data files by their byte position, located by manage_database.locate_glosses(),
+instead of keeping every gloss in memory. The last cache_size glosses read are kept decoded.
+Glosses are read with os.pread() rather than from a memory map of the files: a page fault maps the pages around
+the one it reads too, so a mapping would soon hold most of the data files, which are much larger than their glosses.
+Raises DatabaseFileError if a data file's size differs from when the database was built."""
+
+    def __init__(self, starts, lengths, pos_codes, file_sizes, directory=WORDNET_DIRECTORY,
+                 cache_size=GLOSS_CACHE_SIZE):
+        self.starts = starts
+        self.lengths = lengths
+        self.pos_codes = pos_codes
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = Lock()
+        self.data_files = []
+        for pos, file_size in zip(POS_NAMES, file_sizes):
+            path = os.path.join(directory, 'data.' + pos)
+            data_file = os.open(path, os.O_RDONLY)
+            self.data_files.append(data_file)  # Left open: pread() reads are safe from any thread or forked process.
+            if os.fstat(data_file).st_size != file_size:
+                raise DatabaseFileError(f'{path} changed since the database was built. '
+                                        f'Rebuild it with python manage_database.py.')
+
+    def gloss(self, synset_id):
+        with self.lock:
+            if synset_id in self.cache:
+                self.cache.move_to_end(synset_id)
+                return self.cache[synset_id]
+        data_file = self.data_files[self.pos_codes[synset_id]]
+        gloss = str(os.pread(data_file, self.lengths[synset_id], self.starts[synset_id]), 'utf-8')
+        with self.lock:
+            self.cache[synset_id] = gloss
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return gloss
+
+
+class WordnetGraph:
+    """Read-only accessor over the graph sections built by manage_database.compile_graph().
+
+Synsets are addressed by their integer synset_id. Direction 0 refers to 'out' pointers and direction 1 to 'in'
+pointers, matching the direction numbering used by the search trees in find_connection and find_opposite.
+Pointers are returned as tuples of the form (pointer_symbol, pointer_id, source_word_index, target_word_index),
+the same form they had in the nested-tuple database.
+Glosses are read from the WordNet data files in wordnet_directory by a GlossStore."""
+
+    def __init__(self, sections, wordnet_directory=WORDNET_DIRECTORY):
+        self.groups = sections['group']
+        self.pos_codes = sections['pos']
+        self.sense_ranks = sections['sense_rank']
+        self.glosses = GlossStore(sections['gloss_starts'], sections['gloss_lengths'], self.pos_codes,
+                                  sections['data_file_sizes'], wordnet_directory)
+        self.words_offsets = sections['words_offsets']
+        self.words_text = sections['words_text']
+        self.lower_words_offsets = sections['lower_words_offsets']
+        self.lower_words_text = sections['lower_words_text']
+        self.display_words_offsets = sections['display_words_offsets']
+        self.display_words_text = sections['display_words_text']
+        self.offsets = (sections['out_offsets'], sections['in_offsets'])
+        self.targets = (sections['out_targets'], sections['in_targets'])
+        self.types = (sections['out_types'], sections['in_types'])
+        self.source_words = (sections['out_source_words'], sections['in_source_words'])
+        self.target_words = (sections['out_target_words'], sections['in_target_words'])
+        self.pivot_starts = (sections['out_pivot_starts'], sections['in_pivot_starts'])
+        self.components = sections['component']
+        self.component_reach_offsets = sections['component_reach_offsets']
+        self.component_reach = sections['component_reach']
+        self.component_opposites = sections['component_opposites']
+        self.antonym_distances = sections['antonym_distance']
+        self.pivot_offsets = sections['pivot_offsets']
+        self.pivot_word_nodes = sections['pivot_word_nodes']
+        self.pivot_word_nums = sections['pivot_word_nums']
+        self.pivot_skip_offsets = (sections['out_pivot_skip_offsets'], sections['in_pivot_skip_offsets'])
+        self.pivot_skips = (sections['out_pivot_skips'], sections['in_pivot_skips'])
+        self.word_node_offsets = sections['word_node_offsets']
+        self.word_node_synsets = sections['word_node_synsets']
+        self.word_node_word_nums = sections['word_node_word_nums']
+        self.search_views = {}
+        for view, (directions, _) in manage_database.SEARCH_VIEWS.items():
+            for direction in directions:
+                self.search_views[(view, DIRECTION_NUMS[direction])] = tuple(
+                    sections[f'{view}_{direction}_{column_name}']
+                    for column_name in ('offsets', 'targets', 'types', 'source_words', 'target_words', 'pivot_starts'))
+
+    def __len__(self):
+        return len(self.groups)
+
+    def group(self, synset_id):
+        return self.groups[synset_id]
+
+    def pos(self, synset_id):
+        return POS_NAMES[self.pos_codes[synset_id]]
+
+    def sense_rank(self, synset_id):
+        """Returns how common the most common tagged sense of synset_id is, 0 for the most common sense of a word,
+or manage_database.UNTAGGED_SENSE_RANK. See manage_database.parse_index_files()."""
+        return self.sense_ranks[synset_id]
+
+    def gloss(self, synset_id):
+        return self.glosses.gloss(synset_id)
+
+    def words(self, synset_id):
+        return tuple(decode_string(self.words_offsets, self.words_text, synset_id).split(' '))
+
+    def word_num(self, synset_id, word):
+        """Returns the position of word in the words of synset_id, as the index lists the word.
+See manage_database.format_index_word()."""
+        return decode_string(self.lower_words_offsets, self.lower_words_text, synset_id).split(' ').index(word)
+
+    def display_words(self, synset_id):
+        """Returns the words of synset_id as shown on result pages. See manage_database.format_display_word()."""
+        return decode_string(self.display_words_offsets, self.display_words_text, synset_id).split('\n')
+
+    def reaches(self, start_synset_id, target_synset_id):
+        """Returns True if target_synset_id can be reached from start_synset_id through pointers get_tree() follows.
+See manage_database.calculate_components()."""
+        start_component = self.components[start_synset_id]
+        target_component = self.components[target_synset_id]
+        if start_component == target_component:
+            return True
+        start = self.component_reach_offsets[start_component]
+        end = self.component_reach_offsets[start_component + 1]
+        reach_num = bisect_left(self.component_reach, target_component, start, end)
+        return reach_num < end and self.component_reach[reach_num] == target_component
+
+    def reaches_antonym(self, synset_id):
+        """Returns True if a synset with an antonym can be reached from synset_id through pointers get_tree() follows.
+See manage_database.find_components_with_opposites()."""
+        return self.component_opposites[self.components[synset_id]] == 1
+
+    def antonym_distance(self, synset_id):
+        """Returns the fewest pointers get_tree_to_nearest_antonyms() could follow from synset_id to an antonym,
+or manage_database.UNREACHABLE_DISTANCE. See manage_database.calculate_antonym_distances()."""
+        return self.antonym_distances[synset_id]
+
+    def search_view(self, view, direction):
+        """Returns the columns (offsets, targets, types, source_words, target_words, pivot_starts) of the pointers
+of direction the search of view follows, in the same CSR form as the graph's. Types are codes indexing POINTER_SYMBOLS.
+The word pivots of synset_id come before entry pivot_starts[synset_id]. See manage_database.compile_search_views()."""
+        return self.search_views[(view, direction)]
+
+    def word_pivot_columns(self):
+        """Returns the columns (pivot_offsets, pivot_word_nodes, pivot_word_nums, word_node_offsets, word_node_synsets,
+word_node_word_nums) searches follow word pivots through. See manage_database.compile_word_nodes()."""
+        return (self.pivot_offsets, self.pivot_word_nodes, self.pivot_word_nums,
+                self.word_node_offsets, self.word_node_synsets, self.word_node_word_nums)
+
+    def pivot_skip_columns(self, direction):
+        """Returns the columns (pivot_skip_offsets, pivot_skips) of the word node entries each word pivot entry skips
+in direction, to synsets its synset already had a pointer to. See manage_database.compile_word_nodes()."""
+        return self.pivot_skip_offsets[direction], self.pivot_skips[direction]
+
+    def word_pivots(self, synset_id, direction):
+        """Returns the word pivot pointers of synset_id, the ones manage_database.add_word_pivots() added: one to each
+other synset of its words, through its word nodes in order, unless synset_id already had a pointer to it.
+In direction 1 the pointers point from the other synsets, so their word indexes swap."""
+        skip_offsets, skips = self.pivot_skip_columns(direction)
+        pivot_ids = {synset_id}
+        pivots = []
+        for pivot_index in range(self.pivot_offsets[synset_id], self.pivot_offsets[synset_id + 1]):
+            word_node = self.pivot_word_nodes[pivot_index]
+            word_num = self.pivot_word_nums[pivot_index]
+            skipped_senses = skips[skip_offsets[pivot_index]:skip_offsets[pivot_index + 1]]
+            for sense_index in range(self.word_node_offsets[word_node], self.word_node_offsets[word_node + 1]):
+                pivot_synset_id = self.word_node_synsets[sense_index]
+                if pivot_synset_id in pivot_ids or sense_index in skipped_senses:
+                    continue
+                pivot_ids.add(pivot_synset_id)
+                pivot_word_num = self.word_node_word_nums[sense_index]
+                if direction == 0:
+                    pivots.append(('?p', pivot_synset_id, word_num, pivot_word_num))
+                else:
+                    pivots.append(('?p', pivot_synset_id, pivot_word_num, word_num))
+        return pivots
+
+    def pointers(self, synset_id, direction, word_pivots=True):
+        """Returns the pointers of synset_id in direction, with its word pivots (see word_pivots()) where
+manage_database.add_word_pivots() added them, unless word_pivots is False."""
+        offsets = self.offsets[direction]
+        targets = self.targets[direction]
+        types = self.types[direction]
+        source_words = self.source_words[direction]
+        target_words = self.target_words[direction]
+        pointers = [(POINTER_SYMBOLS[types[index]], targets[index], source_words[index], target_words[index])
+                    for index in range(offsets[synset_id], offsets[synset_id + 1])]
+        if not word_pivots:
+            return pointers
+        pivot_position = self.pivot_starts[direction][synset_id] - offsets[synset_id]
+        return pointers[:pivot_position] + self.word_pivots(synset_id, direction) + pointers[pivot_position:]
+
+
+class WordIndex:
+    """Read-only mapping of word to a tuple of synset ids, over the sections built by manage_database.compile_index().
+Words are sorted by their UTF-8 encoding, so lookups are a binary search over the word sections."""
+
+    def __init__(self, sections):
+        self.word_offsets = sections['index_word_offsets']
+        self.word_text = sections['index_words']
+        self.synset_offsets = sections['index_synset_offsets']
+        self.synsets = sections['index_synsets']
+        self.word_nums = sections['index_word_nums']
+
+    def __len__(self):
+        return len(self.word_offsets) - 1
+
+    def __iter__(self):
+        for word_num in range(len(self)):
+            yield self.word(word_num)
+
+    def __contains__(self, word):
+        return self.find(word) != -1
+
+    def __getitem__(self, word):
+        word_num = self.find(word)
+        if word_num == -1:
+            raise KeyError(word)
+        return tuple(self.synsets[self.synset_offsets[word_num]:self.synset_offsets[word_num + 1]])
+
+    def senses(self, word):
+        """Returns a tuple of (synset_id, word_num) for each synset of word, in the order of wordnet_index[word],
+where word_num is the position of word in the synset's words."""
+        word_num = self.find(word)
+        if word_num == -1:
+            raise KeyError(word)
+        start, end = self.synset_offsets[word_num], self.synset_offsets[word_num + 1]
+        return tuple(zip(self.synsets[start:end], self.word_nums[start:end]))
+
+    def word(self, word_num):
+        return decode_string(self.word_offsets, self.word_text, word_num)
+
+    def encoded_word(self, word_num):
+        return self.word_text[self.word_offsets[word_num]:self.word_offsets[word_num + 1]].tobytes()
+
+    def lower_bound(self, encoded_word):
+        """Returns the position of the first word in the sorted index whose encoding is not less than encoded_word."""
+        low = 0
+        high = len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.encoded_word(middle) < encoded_word:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, word):
+        """Returns the position of word in the sorted index, or -1 if it is not in the index."""
+        encoded_word = word.encode()
+        word_num = self.lower_bound(encoded_word)
+        if word_num < len(self) and self.encoded_word(word_num) == encoded_word:
+            return word_num
+        return -1
+
+    def complete(self, prefix, limit):
+        """Returns up to limit words of the index that start with prefix, in index order.
+Words starting with a prefix are next to each other in UTF-8 order, so they follow the binary search for the prefix."""
+        encoded_prefix = prefix.encode()
+        words = []
+        word_num = self.lower_bound(encoded_prefix)
+        while word_num < len(self) and len(words) < limit:
+            encoded_word = self.encoded_word(word_num)
+            if not encoded_word.startswith(encoded_prefix):
+                break
+            words.append(encoded_word.decode())
+            word_num += 1
+        return words
+